@@ -0,0 +1,61 @@
+import sqlite3
+import tempfile
+from contextlib import closing
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from databases.models import DatabaseConnection, Workspace
+
+
+OPTIMIZE_URL = "/api/v1/ai/optimize/"
+EXPLAIN_URL = "/api/v1/ai/explain/"
+
+
+class ConnectionScopeTests(TestCase):
+    """Optimize and explain only reach connections in the caller's own workspaces."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        path = Path(cls.directory.name) / "orders.sqlite3"
+        with closing(sqlite3.connect(path)) as db:
+            db.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer_id INTEGER, total REAL)")
+            db.commit()
+        users = get_user_model().objects
+        cls.owner = users.create_user("owner", password="unused")
+        cls.stranger = users.create_user("stranger", password="unused")
+        workspace = Workspace.objects.create(name="Orders", owner=cls.owner)
+        cls.connection = DatabaseConnection.objects.create(
+            workspace=workspace, name="Orders", engine="SQLITE", database_name="orders", file_path=str(path)
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.directory.cleanup()
+
+    def post(self, url, user, connection_id):
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {"sql": "SELECT * FROM orders WHERE customer_id = 3", "connection_id": connection_id}
+        return client.post(url, payload, format="json")
+
+    def test_owner_reaches_their_connection(self):
+        for url in (OPTIMIZE_URL, EXPLAIN_URL):
+            with self.subTest(url=url):
+                self.assertEqual(self.post(url, self.owner, str(self.connection.pk)).status_code, 200)
+
+    def test_other_users_connections_are_not_found(self):
+        for url in (OPTIMIZE_URL, EXPLAIN_URL):
+            with self.subTest(url=url):
+                response = self.post(url, self.stranger, str(self.connection.pk))
+                self.assertEqual(response.status_code, 404)
+
+    def test_malformed_connection_ids_are_not_found(self):
+        for connection_id in ("not-a-uuid", 42, ["a"], {"id": 1}):
+            for url in (OPTIMIZE_URL, EXPLAIN_URL):
+                with self.subTest(url=url, connection_id=connection_id):
+                    self.assertEqual(self.post(url, self.owner, connection_id).status_code, 404)
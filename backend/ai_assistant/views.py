@@ -1,15 +1,27 @@
 import re
+from pathlib import Path
 
+from django.core.exceptions import ValidationError
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from databases.models import DatabaseConnection
+from databases.services import ConsoleBootstrapService
+from query_engine.optimizer import QueryOptimizerService
 from query_engine.services import QueryExecutionError, QueryExecutionService
 
 
-LIMIT_PATTERN = re.compile(r"\bLIMIT\s+\d+\b", re.IGNORECASE)
-SELECT_ALL_PATTERN = re.compile(r"^\s*SELECT\s+\*\s+FROM\s+", re.IGNORECASE)
+bootstrap = ConsoleBootstrapService(Path(__file__).resolve().parent.parent)
+
+
+def _actor_connection(request, connection_id):
+    """The requested connection if it belongs to one of the caller's workspaces, else None."""
+    actor = bootstrap.get_actor(getattr(request, "user", None))
+    try:
+        return DatabaseConnection.objects.get(pk=connection_id, workspace__owner=actor)
+    except (DatabaseConnection.DoesNotExist, ValidationError, ValueError, TypeError):
+        return None
 
 
 class QueryOptimizeView(APIView):
@@ -17,36 +29,23 @@ class QueryOptimizeView(APIView):
 
     def post(self, request):
         sql = (request.data.get('sql') or '').strip()
+        connection_id = request.data.get("connection_id")
         if not sql:
             return Response({"error": "No SQL provided"}, status=status.HTTP_400_BAD_REQUEST)
+        if not connection_id:
+            return Response({"error": "connection_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        optimized_sql = sql
-        recommendations = []
-
-        if SELECT_ALL_PATTERN.search(sql):
-            recommendations.append("Replace SELECT * with explicit columns on hot paths to reduce row materialization cost.")
-
-        if sql.upper().startswith("SELECT") and not LIMIT_PATTERN.search(sql):
-            optimized_sql = f"{sql.rstrip(';')} LIMIT 200;"
-            recommendations.append("Added a LIMIT guard to keep interactive console execution bounded.")
-
-        if " ORDER BY " in sql.upper():
-            recommendations.append("Review the ORDER BY columns and back them with an index when cardinality is high.")
-
-        if " WHERE " not in sql.upper() and sql.upper().startswith("SELECT"):
-            recommendations.append("Unfiltered full scans should be reserved for analytics workloads or background jobs.")
+        connection = _actor_connection(request, connection_id)
+        if connection is None:
+            return Response({"error": "Connection not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        if not recommendations:
-            recommendations.append("The statement is already compact. Primary optimization opportunity is index design and data layout.")
+        verify = str(request.data.get("verify", "")).lower() in {"1", "true", "yes"}
+        try:
+            payload = QueryOptimizerService().optimize(connection=connection, sql=sql, verify=verify)
+        except QueryExecutionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(
-            {
-                "original_sql": sql,
-                "optimized_sql": optimized_sql,
-                "explanation": "Applied deterministic SQL console heuristics for low-latency interactive execution.",
-                "recommendations": recommendations,
-            }
-        )
+        return Response(payload)
 
 
 class QueryExplainView(APIView):
@@ -60,9 +59,8 @@ class QueryExplainView(APIView):
         if not connection_id:
             return Response({"error": "connection_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            connection = DatabaseConnection.objects.get(pk=connection_id)
-        except DatabaseConnection.DoesNotExist:
+        connection = _actor_connection(request, connection_id)
+        if connection is None:
             return Response({"error": "Connection not found."}, status=status.HTTP_404_NOT_FOUND)
 
         service = QueryExecutionService()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
@@ -25,6 +26,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'query_engine.tracing.ServerTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -76,3 +78,53 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Startup warm-up: comma-separated stages out of native, connections, schema and analytics; empty disables it.
+INFRADB_WARMUP = os.environ.get('INFRADB_WARMUP', 'native,connections,schema,analytics')
+INFRADB_WARMUP_BLOCKING = os.environ.get('INFRADB_WARMUP_BLOCKING', 'False') == 'True'
+INFRADB_WARMUP_MAX_CONNECTIONS = int(os.environ.get('INFRADB_WARMUP_MAX_CONNECTIONS', '16'))
+
+# Compiled statements cached per pooled SQLite connection; bound-parameter templates reuse them across calls.
+INFRADB_SQLITE_CACHED_STATEMENTS = int(os.environ.get('INFRADB_SQLITE_CACHED_STATEMENTS', '256'))
+
+# Worker processes serving requests (gunicorn reads the same variable). Admission control and group commit
+# keep their state in each process, so per-host limits below are split across this many workers.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+# Admission control: concurrent statements allowed per connection and per workspace on this host, divided
+# evenly between the workers (each gets at least one slot). Queue depths and timeouts apply per worker.
+INFRADB_ADMISSION_CONNECTION_CONCURRENCY = int(os.environ.get('INFRADB_ADMISSION_CONNECTION_CONCURRENCY', '4'))
+INFRADB_ADMISSION_WORKSPACE_CONCURRENCY = int(os.environ.get('INFRADB_ADMISSION_WORKSPACE_CONCURRENCY', '8'))
+
+# Group commit: concurrent writes to one SQLite file within this window share a transaction; 0 disables it.
+# Batches only form inside one worker process: writes arriving in different workers never share a commit.
+INFRADB_GROUP_COMMIT_WINDOW_MS = float(os.environ.get('INFRADB_GROUP_COMMIT_WINDOW_MS', '0'))
+INFRADB_GROUP_COMMIT_MAX_BATCH = int(os.environ.get('INFRADB_GROUP_COMMIT_MAX_BATCH', '128'))
+
+# Native engine: 'inprocess' imports infradb_core in every worker; 'sidecar' sends scans to run_native_sidecar.
+INFRADB_NATIVE_MODE = os.environ.get('INFRADB_NATIVE_MODE', 'inprocess')
+INFRADB_NATIVE_SIDECAR_SOCKET = os.environ.get('INFRADB_NATIVE_SIDECAR_SOCKET', '/tmp/infradb-native.sock')
+
+# Request tracing: per-phase Server-Timing headers on API responses, optionally exported as OTLP/JSON lines.
+INFRADB_TRACING = os.environ.get('INFRADB_TRACING', 'True') == 'True'
+INFRADB_TRACE_FILE = os.environ.get('INFRADB_TRACE_FILE', '')
+
+# Connection snapshots: where the snapshot action writes online-backup copies of SQLite files.
+INFRADB_SNAPSHOT_DIR = os.environ.get('INFRADB_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'user_databases', 'snapshots'))
+
+# Maintenance: checkpoint, incremental-vacuum and PRAGMA optimize SQLite files once the server has been
+# idle for INFRADB_MAINTENANCE_IDLE_SECONDS, spending at most the budget per file and pass; 0 disables it.
+INFRADB_MAINTENANCE_INTERVAL_SECONDS = float(os.environ.get('INFRADB_MAINTENANCE_INTERVAL_SECONDS', '60'))
+INFRADB_MAINTENANCE_IDLE_SECONDS = float(os.environ.get('INFRADB_MAINTENANCE_IDLE_SECONDS', '2'))
+INFRADB_MAINTENANCE_BUDGET_MS = float(os.environ.get('INFRADB_MAINTENANCE_BUDGET_MS', '250'))
+# Every worker starts a scheduler, but only the one holding this host-wide lock runs passes. Idleness
+# counts statements in all workers through busy markers in INFRADB_ACTIVITY_DIR. Both are per host:
+# several hosts sharing the same SQLite files would each still run their own scheduler. They live in
+# a runtime directory outside the source tree, so serving never leaves files in the checkout.
+INFRADB_RUNTIME_DIR = os.environ.get(
+    'INFRADB_RUNTIME_DIR', os.path.join(os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir(), 'infradb')
+)
+INFRADB_MAINTENANCE_LOCK_FILE = os.environ.get(
+    'INFRADB_MAINTENANCE_LOCK_FILE', os.path.join(INFRADB_RUNTIME_DIR, 'maintenance.lock')
+)
+INFRADB_ACTIVITY_DIR = os.environ.get('INFRADB_ACTIVITY_DIR', os.path.join(INFRADB_RUNTIME_DIR, 'activity'))
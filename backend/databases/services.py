@@ -1,15 +1,65 @@
 from __future__ import annotations
 
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import transaction
 
+from query_engine.pool import sqlite_pool
+
 from .models import DatabaseConnection, Workspace
 
 
 User = get_user_model()
+SCHEMA_CACHE_PREFIX = "infradb:schema"
+SCHEMA_CACHE_TIMEOUT = 60 * 60
+
+
+def sqlite_schema(file_path: str, *, cache_key: str | None = None):
+    """Tables and columns of a SQLite file; ``cache_key`` should change whenever the schema can."""
+    if not file_path:
+        return []
+
+    db_path = Path(file_path)
+    if not db_path.exists():
+        raise FileNotFoundError(f"SQLite database not found: {db_path}")
+
+    if cache_key:
+        schema = cache.get(f"{SCHEMA_CACHE_PREFIX}:{cache_key}")
+        if schema is not None:
+            return schema
+
+    with sqlite_pool.connection(db_path) as connection:
+        tables = connection.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ).fetchall()
+
+        schema = []
+        for (table_name,) in tables:
+            columns = connection.execute(f"PRAGMA table_info('{table_name}')").fetchall()
+            schema.append(
+                {
+                    "table": table_name,
+                    "columns": [
+                        {
+                            "name": column[1],
+                            "type": column[2],
+                            "nullable": not bool(column[3]),
+                            "default": column[4],
+                            "primary_key": bool(column[5]),
+                        }
+                        for column in columns
+                    ],
+                }
+            )
+
+    if cache_key:
+        cache.set(f"{SCHEMA_CACHE_PREFIX}:{cache_key}", schema, timeout=SCHEMA_CACHE_TIMEOUT)
+    return schema
 
 
 @dataclass(frozen=True)
@@ -23,6 +73,14 @@ class SeedConnection:
 class ConsoleBootstrapService:
     DEFAULT_WORKSPACE_NAME = "InfraDB Control Plane"
     DEFAULT_USERNAME = "console"
+    CACHE_PREFIX = "infradb:bootstrap"
+    CACHE_TIMEOUT = 60 * 60
+
+    # Shared by every instance so an invalidation from one view is seen by all of them. Entries also
+    # expire, so a process never keeps a value past MEMO_TIMEOUT even if the generation key is evicted.
+    MEMO_TIMEOUT = 60
+    _memo = {}
+    _memo_lock = threading.Lock()
 
     def __init__(self, base_dir: Path):
         self.base_dir = Path(base_dir)
@@ -30,11 +88,52 @@ class ConsoleBootstrapService:
     def get_actor(self, request_user=None):
         if request_user and getattr(request_user, "is_authenticated", False):
             return request_user
-        return self._ensure_console_user()
+        return self._memoized("console-user", self._ensure_console_user)
 
-    @transaction.atomic
     def ensure_default_workspace(self, actor=None):
-        actor = actor or self._ensure_console_user()
+        actor = actor or self.get_actor()
+        return self._memoized(f"workspace:{actor.pk}", lambda: self._seed_default_workspace(actor))
+
+    def invalidate(self):
+        """Drop memoized bootstrap state in this process and bump the shared generation key.
+
+        Other processes only see the new generation through a shared cache backend (Redis, Memcached,
+        database). With the default per-process LocMemCache each worker keeps its own copy until
+        CACHE_TIMEOUT expires it.
+        """
+        generation_key = f"{self.CACHE_PREFIX}:generation"
+        cache.add(generation_key, 0, timeout=None)
+        try:
+            cache.incr(generation_key)
+        except ValueError:
+            cache.set(generation_key, 1, timeout=None)
+        with self._memo_lock:
+            self._memo.clear()
+
+    def _memoized(self, name, factory):
+        generation = cache.get(f"{self.CACHE_PREFIX}:generation", 0)
+        key = f"{self.CACHE_PREFIX}:{generation}:{self.base_dir}:{name}"
+        now = time.monotonic()
+
+        entry = self._memo.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        value = cache.get(key)
+        if value is None:
+            value = factory()
+            cache.set(key, value, timeout=self.CACHE_TIMEOUT)
+
+        with self._memo_lock:
+            # Entries from earlier generations can never be read again.
+            prefix = f"{self.CACHE_PREFIX}:{generation}:"
+            for stale in [item for item in self._memo if not item.startswith(prefix)]:
+                del self._memo[stale]
+            self._memo[key] = (value, now + self.MEMO_TIMEOUT)
+        return value
+
+    @transaction.atomic
+    def _seed_default_workspace(self, actor):
         workspace, _ = Workspace.objects.get_or_create(
             owner=actor,
             name=self.DEFAULT_WORKSPACE_NAME,
@@ -1,50 +1,30 @@
 from pathlib import Path
 import sqlite3
 
+from django.core.cache import cache
+from django.db.models import Count, Max
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from query_engine.advisor import IndexAdvisorService
+from query_engine.autocomplete import autocomplete_service
+from query_engine.conditional import not_modified, version_etag, with_validators
+from query_engine.maintenance import maintenance_scheduler
+from query_engine.models import IndexRecommendation, MaterializedView
+from query_engine.profiling import PROFILE_SAMPLE_ROWS, profile_table
+from query_engine.services import QueryExecutionError, QueryExecutionService
+from query_engine.snapshots import SnapshotError, snapshot_service
+
 from .models import DatabaseConnection, Workspace
 from .serializers import DatabaseConnectionSerializer, WorkspaceSerializer
-from .services import ConsoleBootstrapService
+from .services import ConsoleBootstrapService, sqlite_schema
 
 
 bootstrap = ConsoleBootstrapService(Path(__file__).resolve().parent.parent)
-
-
-def _sqlite_schema(file_path: str):
-    if not file_path:
-        return []
-
-    db_path = Path(file_path)
-    if not db_path.exists():
-        raise FileNotFoundError(f"SQLite database not found: {db_path}")
-
-    with sqlite3.connect(db_path) as connection:
-        tables = connection.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
-        ).fetchall()
-
-        schema = []
-        for (table_name,) in tables:
-            columns = connection.execute(f"PRAGMA table_info('{table_name}')").fetchall()
-            schema.append(
-                {
-                    "table": table_name,
-                    "columns": [
-                        {
-                            "name": column[1],
-                            "type": column[2],
-                            "nullable": not bool(column[3]),
-                            "default": column[4],
-                            "primary_key": bool(column[5]),
-                        }
-                        for column in columns
-                    ],
-                }
-            )
-        return schema
+PROFILE_CACHE_TIMEOUT = 60 * 60
+execution_service = QueryExecutionService()
+index_advisor = IndexAdvisorService(execution_service)
 
 
 class WorkspaceViewSet(viewsets.ModelViewSet):
@@ -56,9 +36,34 @@ class WorkspaceViewSet(viewsets.ModelViewSet):
         bootstrap.ensure_default_workspace(actor)
         return Workspace.objects.filter(owner=actor).prefetch_related("connections")
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        summary = queryset.aggregate(
+            workspace_count=Count("id", distinct=True),
+            workspace_updated=Max("updated_at"),
+            connection_count=Count("connections", distinct=True),
+            connection_updated=Max("connections__updated_at"),
+        )
+        stamps = [stamp for stamp in (summary["workspace_updated"], summary["connection_updated"]) if stamp]
+        last_modified = max(stamps) if stamps else None
+        etag = version_etag("workspaces", *summary.values())
+
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+        return with_validators(super().list(request, *args, **kwargs), etag, last_modified)
+
     def perform_create(self, serializer):
         serializer.save(owner=bootstrap.get_actor(getattr(self.request, "user", None)))
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        bootstrap.invalidate()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        bootstrap.invalidate()
+
 
 class ConnectionViewSet(viewsets.ModelViewSet):
     serializer_class = DatabaseConnectionSerializer
@@ -69,6 +74,16 @@ class ConnectionViewSet(viewsets.ModelViewSet):
         bootstrap.ensure_default_workspace(actor)
         return DatabaseConnection.objects.filter(workspace__owner=actor).select_related("workspace")
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        bootstrap.invalidate()
+
+    def perform_destroy(self, instance):
+        connection_id = instance.pk
+        super().perform_destroy(instance)
+        autocomplete_service.invalidate(connection_id)
+        bootstrap.invalidate()
+
     @action(detail=False, methods=["post"], url_path="test")
     def test_connection(self, request):
         payload = request.data
@@ -110,16 +125,228 @@ class ConnectionViewSet(viewsets.ModelViewSet):
             )
 
         try:
-            tables = _sqlite_schema(connection.file_path)
+            schema_version = execution_service.schema_version(connection=connection)
+        except (OSError, QueryExecutionError):
+            schema_version = None
+        if schema_version is not None:
+            etag = version_etag("schema", connection.pk, connection.updated_at.isoformat(), schema_version)
+            cached = not_modified(request, etag)
+            if cached is not None:
+                return cached
+
+        try:
+            cache_key = f"{connection.pk}:{schema_version}" if schema_version is not None else None
+            tables = sqlite_schema(connection.file_path, cache_key=cache_key)
         except FileNotFoundError as exc:
             return Response({"tables": [], "error": str(exc)}, status=status.HTTP_404_NOT_FOUND)
         except sqlite3.Error as exc:
             return Response({"tables": [], "error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response(
+        response = Response(
             {
                 "connection_id": str(connection.id),
                 "database_name": connection.database_name,
                 "tables": tables,
             }
         )
+        return with_validators(response, etag) if schema_version is not None else response
+
+    @action(detail=True, methods=["get"])
+    def autocomplete(self, request, pk=None):
+        connection = self.get_object()
+        if connection.engine != "SQLITE":
+            return Response(
+                {"items": [], "error": f"Autocomplete is not configured for {connection.engine}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            schema_version = execution_service.schema_version(connection=connection)
+            payload = autocomplete_service.complete(
+                connection,
+                f"{connection.updated_at.isoformat()}:{schema_version}",
+                request.query_params.get("prefix", ""),
+                table=request.query_params.get("table") or None,
+                limit=request.query_params.get("limit"),
+            )
+        except FileNotFoundError as exc:
+            return Response({"items": [], "error": str(exc)}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError:
+            return Response({"items": [], "error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        except (sqlite3.Error, QueryExecutionError) as exc:
+            return Response({"items": [], "error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload)
+
+    @action(detail=True, methods=["get", "post"], url_path="index-advice")
+    def index_advice(self, request, pk=None):
+        connection = self.get_object()
+        if connection.engine != "SQLITE":
+            return Response(
+                {"items": [], "error": f"Index advice is not configured for {connection.engine}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        payload = index_advisor.recommendations(connection=connection, refresh=request.method == "POST")
+        return Response(payload, status=status.HTTP_202_ACCEPTED if request.method == "POST" else status.HTTP_200_OK)
+
+    @action(detail=True, methods=["post"], url_path="apply-index")
+    def apply_index(self, request, pk=None):
+        connection = self.get_object()
+        try:
+            recommendation = connection.index_recommendations.get(pk=request.data.get("recommendation_id"))
+        except (IndexRecommendation.DoesNotExist, ValueError, TypeError):
+            return Response({"error": "Recommendation not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            payload = index_advisor.apply(recommendation=recommendation)
+        except QueryExecutionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(payload)
+
+    @action(detail=True, methods=["get", "post", "delete"], url_path="materialized-views")
+    def materialized_views(self, request, pk=None):
+        connection = self.get_object()
+        if request.method == "GET":
+            items = [execution_service.describe_materialized_view(view=view) for view in connection.materialized_views.all()]
+            return Response({"connection_id": str(connection.id), "items": items})
+
+        if request.method == "DELETE":
+            try:
+                view = connection.materialized_views.get(pk=request.query_params.get("view_id"))
+            except (MaterializedView.DoesNotExist, ValueError, TypeError):
+                return Response({"error": "Materialized view not found."}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                execution_service.drop_materialized_view(view=view)
+            except QueryExecutionError as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        name = request.data.get("name")
+        sql_query = request.data.get("sql")
+        if not name or not sql_query:
+            return Response({"error": "Missing name or sql"}, status=status.HTTP_400_BAD_REQUEST)
+        if connection.materialized_views.filter(name=name).exists():
+            return Response({"error": f"Materialized view {name} already exists."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            payload = execution_service.create_materialized_view(
+                connection=connection,
+                name=name,
+                sql=sql_query,
+                refresh_interval_seconds=request.data.get("refresh_interval_seconds"),
+            )
+        except QueryExecutionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(payload, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["post"], url_path="refresh-materialized-view")
+    def refresh_materialized_view(self, request, pk=None):
+        connection = self.get_object()
+        try:
+            view = connection.materialized_views.get(pk=request.data.get("view_id"))
+        except (MaterializedView.DoesNotExist, ValueError, TypeError):
+            return Response({"error": "Materialized view not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            payload = execution_service.refresh_materialized_view(view=view)
+        except QueryExecutionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(payload)
+
+    @action(detail=True, methods=["post"])
+    def analyze(self, request, pk=None):
+        connection = self.get_object()
+        tables = request.data.get("tables") or None
+        if isinstance(tables, str):
+            tables = [item.strip() for item in tables.split(",") if item.strip()] or None
+        if tables is not None and not (isinstance(tables, list) and all(isinstance(item, str) for item in tables)):
+            return Response(
+                {"error": "tables must be a list of table names or a comma-separated string."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            report = execution_service.refresh_statistics(connection=connection, tables=tables)
+        except QueryExecutionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"connection_id": str(connection.id), **report})
+
+    @action(detail=True, methods=["get", "post"])
+    def maintenance(self, request, pk=None):
+        connection = self.get_object()
+        if connection.engine != "SQLITE":
+            return Response(
+                {"error": f"Maintenance is not configured for {connection.engine}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            if request.method == "GET":
+                return Response(maintenance_scheduler.status(connection=connection))
+            actions = request.data.get("actions")
+            if isinstance(actions, str):
+                actions = [item.strip() for item in actions.split(",") if item.strip()]
+            payload = maintenance_scheduler.maintain(connection=connection, actions=actions)
+        except FileNotFoundError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_404_NOT_FOUND)
+        except (ValueError, sqlite3.Error) as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload)
+
+    @action(detail=True, methods=["get", "post"])
+    def snapshot(self, request, pk=None):
+        connection = self.get_object()
+        if request.method == "GET":
+            return Response(snapshot_service.status(connection=connection))
+
+        wait = str(request.data.get("wait", "")).lower() in {"1", "true", "yes"}
+        try:
+            payload = snapshot_service.start(
+                connection=connection,
+                compress=str(request.data.get("compress", "")).lower() in {"1", "true", "yes", "gzip"},
+                pages_per_step=request.data.get("pages_per_step"),
+                wait=wait,
+            )
+        except SnapshotError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload, status=status.HTTP_201_CREATED if wait else status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def profile(self, request, pk=None):
+        connection = self.get_object()
+        table = request.query_params.get("table")
+        if connection.engine != "SQLITE":
+            return Response(
+                {"error": f"Column profiling is not configured for {connection.engine}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not table:
+            return Response({"error": "Missing table"}, status=status.HTTP_400_BAD_REQUEST)
+
+        columns = [item for item in request.query_params.get("columns", "").split(",") if item] or None
+        try:
+            sample_rows = min(int(request.query_params.get("sample_rows", PROFILE_SAMPLE_ROWS)), 1_000_000)
+        except ValueError:
+            return Response({"error": "sample_rows must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        if not Path(connection.file_path).exists():
+            return Response({"error": f"SQLite database not found: {connection.file_path}"}, status=status.HTTP_404_NOT_FOUND)
+
+        data_version = execution_service.data_version(connection=connection)
+        cache_key = f"infradb:profile:{connection.pk}:{table}:{','.join(columns or [])}:{sample_rows}:{data_version}"
+        payload = cache.get(cache_key)
+        if payload is None:
+            try:
+                payload = profile_table(connection.file_path, table, columns=columns, sample_rows=sample_rows)
+            except ValueError as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            except sqlite3.Error as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            cache.set(cache_key, payload, timeout=PROFILE_CACHE_TIMEOUT)
+            cached = False
+        else:
+            cached = True
+
+        return Response({"connection_id": str(connection.id), "data_version": data_version, "cached": cached, **payload})
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import itertools
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import suppress
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import monotonic
+
+from django.conf import settings
+
+
+PRIORITIES = ("interactive", "batch")
+CONNECTION_CONCURRENCY = 4
+WORKSPACE_CONCURRENCY = 8
+# Waiting statements allowed per connection and priority before new arrivals are turned away.
+QUEUE_DEPTH = {"interactive": 16, "batch": 32}
+QUEUE_TIMEOUT_SECONDS = {"interactive": 10.0, "batch": 60.0}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, *, ticket: "AdmissionTicket", retry_after: int = 1):
+        super().__init__(message)
+        self.ticket = ticket
+        self.retry_after = retry_after
+        self.job_id = None
+
+
+@dataclass
+class AdmissionTicket:
+    connection_key: str
+    workspace_key: str
+    priority: str
+    sequence: int
+    queued_at: float = field(default_factory=monotonic)
+    queue_position: int = 0
+    queue_time_ms: float = 0.0
+    decision: str = "ADMITTED"
+
+    def as_dict(self):
+        return {
+            "decision": self.decision,
+            "priority": self.priority,
+            "queue_position": self.queue_position,
+            "queue_time_ms": self.queue_time_ms,
+        }
+
+
+class HostActivity:
+    """Marks, in files every worker process on the host can see, whether this process is running statements.
+
+    Each process keeps a ``<pid>.busy`` marker while it has statements in flight and touches
+    ``last_release`` when its last one finishes. Only those transitions touch the filesystem, so a
+    steadily busy worker costs nothing per statement.
+    """
+
+    @property
+    def directory(self):
+        return Path(getattr(settings, "INFRADB_ACTIVITY_DIR", Path(tempfile.gettempdir()) / "infradb" / "activity"))
+
+    def busy(self):
+        with suppress(OSError):
+            self.directory.mkdir(parents=True, exist_ok=True)
+            (self.directory / f"{os.getpid()}.busy").touch()
+
+    def idle(self):
+        with suppress(OSError):
+            (self.directory / f"{os.getpid()}.busy").unlink(missing_ok=True)
+            (self.directory / "last_release").touch()
+
+    def idle_seconds(self):
+        """Seconds since any process on the host last finished a statement; 0 while any is running one.
+
+        None when the directory cannot be read, so callers fall back to their own process's view.
+        """
+        try:
+            for marker in self.directory.glob("*.busy"):
+                if self._alive(marker):
+                    return 0.0
+            last = (self.directory / "last_release").stat().st_mtime
+        except FileNotFoundError:
+            return float("inf")
+        except OSError:
+            return None
+        return max(time.time() - last, 0.0)
+
+    @staticmethod
+    def _alive(marker: Path):
+        try:
+            os.kill(int(marker.stem), 0)
+        except ValueError:
+            return False
+        except ProcessLookupError:
+            # Left behind by a worker that died mid-statement.
+            marker.unlink(missing_ok=True)
+            return False
+        except PermissionError:
+            return True
+        return True
+
+
+class AdmissionController:
+    """Caps concurrent statements per connection and per workspace; interactive waiters go before batch ones.
+
+    The counters are per process, so the configured per-host limits are split across WEB_CONCURRENCY workers.
+    """
+
+    def __init__(
+        self,
+        connection_limit: int | None = None,
+        workspace_limit: int | None = None,
+        queue_depth: dict = QUEUE_DEPTH,
+        queue_timeout: dict = QUEUE_TIMEOUT_SECONDS,
+    ):
+        self._connection_limit = connection_limit
+        self._workspace_limit = workspace_limit
+        self.queue_depth = dict(queue_depth)
+        self.queue_timeout = dict(queue_timeout)
+        self._running_connections = Counter()
+        self._running_workspaces = Counter()
+        self._waiting = {priority: [] for priority in PRIORITIES}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._last_release = monotonic()
+        self.activity = HostActivity()
+
+    @property
+    def connection_limit(self):
+        if self._connection_limit is not None:
+            return self._connection_limit
+        return self._per_worker(getattr(settings, "INFRADB_ADMISSION_CONNECTION_CONCURRENCY", CONNECTION_CONCURRENCY))
+
+    @property
+    def workspace_limit(self):
+        if self._workspace_limit is not None:
+            return self._workspace_limit
+        return self._per_worker(getattr(settings, "INFRADB_ADMISSION_WORKSPACE_CONCURRENCY", WORKSPACE_CONCURRENCY))
+
+    @staticmethod
+    def _per_worker(host_limit: int):
+        """This process's share of a per-host limit; counters live in each worker, not across them."""
+        workers = max(int(getattr(settings, "WEB_CONCURRENCY", 1)), 1)
+        return max(int(host_limit) // workers, 1)
+
+    def acquire(self, connection_key, workspace_key, priority: str = "interactive"):
+        """Wait for a slot and return its ticket; raises AdmissionRejected when the queue is full or times out."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        with self._condition:
+            ticket = AdmissionTicket(str(connection_key), str(workspace_key), priority, next(self._sequence))
+            if not self._has_capacity(ticket) or self._blocked(ticket):
+                queued = sum(1 for waiter in self._waiting[priority] if waiter.connection_key == ticket.connection_key)
+                if queued >= self.queue_depth[priority]:
+                    ticket.decision = "REJECTED"
+                    raise AdmissionRejected(
+                        f"Too many {priority} statements are queued for this connection.", ticket=ticket
+                    )
+                self._wait(ticket)
+            if not self._running_connections:
+                self.activity.busy()
+            self._running_connections[ticket.connection_key] += 1
+            self._running_workspaces[ticket.workspace_key] += 1
+        return ticket
+
+    def release(self, ticket: AdmissionTicket):
+        with self._condition:
+            for counter, key in (
+                (self._running_connections, ticket.connection_key),
+                (self._running_workspaces, ticket.workspace_key),
+            ):
+                counter[key] -= 1
+                if counter[key] <= 0:
+                    del counter[key]
+            self._last_release = monotonic()
+            if not self._running_connections:
+                self.activity.idle()
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "running": sum(self._running_connections.values()),
+                "queued": {priority: len(waiters) for priority, waiters in self._waiting.items()},
+                "idle_seconds": round(self._idle_seconds(), 3),
+                "limits": {"connection": self.connection_limit, "workspace": self.workspace_limit},
+            }
+
+    def idle_seconds(self):
+        """Seconds since the last statement finished; 0 while any statement is running or queued."""
+        with self._condition:
+            return self._idle_seconds()
+
+    def host_idle_seconds(self):
+        """Like ``idle_seconds``, but also counting statements in the host's other worker processes."""
+        local = self.idle_seconds()
+        shared = self.activity.idle_seconds()
+        return local if shared is None else min(local, shared)
+
+    def _idle_seconds(self):
+        if self._running_connections or any(self._waiting.values()):
+            return 0.0
+        return monotonic() - self._last_release
+
+    def _wait(self, ticket: AdmissionTicket):
+        waiters = self._waiting[ticket.priority]
+        waiters.append(ticket)
+        ticket.decision = "QUEUED"
+        for waiter in self._queue_order():
+            if waiter is ticket:
+                break
+            ticket.queue_position += self._shares_slot(waiter, ticket)
+        deadline = ticket.queued_at + self.queue_timeout[ticket.priority]
+        try:
+            while not (self._has_capacity(ticket) and not self._blocked(ticket)):
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    ticket.decision = "REJECTED"
+                    raise AdmissionRejected(
+                        f"Timed out after {self.queue_timeout[ticket.priority]:g}s waiting for a query slot.",
+                        ticket=ticket,
+                        retry_after=max(int(self.queue_timeout[ticket.priority] // 4), 1),
+                    )
+                self._condition.wait(remaining)
+        finally:
+            waiters.remove(ticket)
+            ticket.queue_time_ms = round((monotonic() - ticket.queued_at) * 1000, 3)
+            # A departing waiter may have been the one holding others back.
+            self._condition.notify_all()
+
+    def _has_capacity(self, ticket: AdmissionTicket):
+        return (
+            self._running_connections[ticket.connection_key] < self.connection_limit
+            and self._running_workspaces[ticket.workspace_key] < self.workspace_limit
+        )
+
+    def _blocked(self, ticket: AdmissionTicket):
+        """True while an earlier waiter competing for the same connection or workspace should go first."""
+        for waiter in self._queue_order():
+            if waiter is ticket:
+                return False
+            if self._shares_slot(waiter, ticket) and self._has_capacity(waiter):
+                return True
+        # A new arrival only yields to waiters that could run now.
+        return False
+
+    def _queue_order(self):
+        return itertools.chain.from_iterable(self._waiting[priority] for priority in PRIORITIES)
+
+    @staticmethod
+    def _shares_slot(first: AdmissionTicket, second: AdmissionTicket):
+        return first.connection_key == second.connection_key or first.workspace_key == second.workspace_key
+
+
+admission_controller = AdmissionController()
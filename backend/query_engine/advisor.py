@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import sqlite3
+from collections import Counter
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import timedelta
+from time import perf_counter_ns
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from databases.models import DatabaseConnection
+
+from .background import background_runner
+from .models import IndexRecommendation, QueryJob
+from .optimizer import load_table_metadata, plan_findings, suggest_indexes
+from .services import QueryExecutionError, QueryExecutionService
+from .sql_analysis import extract_shape, fingerprint
+
+
+ADVISOR_LOOKBACK = timedelta(days=7)
+ADVISOR_MAX_JOBS = 5000
+ADVISOR_MAX_STATEMENTS = 200
+ADVISOR_MAX_RECOMMENDATIONS = 20
+ADVISOR_REFRESH_INTERVAL = timedelta(minutes=30)
+
+SLOW_STATEMENT_MS = 100
+MIN_SUPPORTING_CALLS = 5
+WRITE_STATEMENT_TYPES = {"INSERT", "REPLACE", "UPDATE", "DELETE"}
+
+# Fraction of a statement's measured time an index is expected to remove.
+SEEK_SAVING_FRACTION = 0.9
+SORT_SAVING_FRACTION = 0.5
+# Maintenance cost of one extra index per modified row.
+WRITE_COST_MS_PER_ROW = 0.02
+
+
+@dataclass
+class CandidateEvidence:
+    table: str
+    columns: tuple
+    index_name: str
+    statement: str
+    calls: int = 0
+    workload_ms: float = 0.0
+    saving_ms: float = 0.0
+    sample_sql: str = ""
+
+
+class IndexAdvisorService:
+    def __init__(self, execution_service: QueryExecutionService | None = None):
+        self.execution_service = execution_service or QueryExecutionService()
+
+    def recommendations(self, *, connection: DatabaseConnection, refresh: bool = False):
+        analyzed_at = cache.get(self._analyzed_at_key(connection))
+        stale = analyzed_at is None or timezone.now() - analyzed_at > ADVISOR_REFRESH_INTERVAL
+        if refresh or stale:
+            self.schedule_analysis(connection=connection)
+
+        items = IndexRecommendation.objects.filter(connection=connection).order_by("status", "-score")
+        return {
+            "connection_id": str(connection.id),
+            "analyzed_at": analyzed_at.isoformat() if analyzed_at else None,
+            "analyzing": background_runner.is_running(self._job_key(connection)),
+            "items": [self._serialize(item) for item in items],
+        }
+
+    def schedule_analysis(self, *, connection: DatabaseConnection):
+        return background_runner.submit(self._job_key(connection), self.analyze, connection=connection)
+
+    def analyze(self, *, connection: DatabaseConnection):
+        jobs = (
+            QueryJob.objects.filter(
+                connection=connection,
+                status="COMPLETED",
+                created_at__gte=timezone.now() - ADVISOR_LOOKBACK,
+            )
+            .order_by("-created_at")
+            .values_list("sql_query", "parameters", "execution_time_ms", "rows_affected")[:ADVISOR_MAX_JOBS]
+        )
+
+        shapes = {}
+        workload = {}
+        rows_written = Counter()
+        for sql, parameters, duration_ms, rows_affected in jobs:
+            statement = fingerprint(sql)
+            if statement.query_type in WRITE_STATEMENT_TYPES:
+                shape = shapes.setdefault(sql, extract_shape(sql))
+                for table in set(shape.tables.values()):
+                    rows_written[table] += max(rows_affected or 0, 1)
+                if statement.query_type in {"INSERT", "REPLACE"}:
+                    continue
+
+            # Literal variants share a fingerprint; the most recent text (and its bound values, which a
+            # placeholder needs to be explained at all) stands in for all of them.
+            sample, sample_parameters, calls, total_ms = workload.get(statement.id, (sql, parameters, 0, 0.0))
+            workload[statement.id] = (sample, sample_parameters, calls + 1, total_ms + (duration_ms or 0.0))
+
+        try:
+            with closing(self.execution_service._connect_sqlite(connection)) as db:
+                columns_by_table, indexes_by_table = load_table_metadata(db)
+        except sqlite3.Error as exc:
+            raise QueryExecutionError(str(exc)) from exc
+
+        # Slow statements qualify on their own; fast ones only in aggregate, summed over their
+        # fingerprint and merged with other statements whose candidates hit the same columns.
+        heaviest = sorted(workload.values(), key=lambda item: item[3], reverse=True)[:ADVISOR_MAX_STATEMENTS]
+        candidates = {}
+        for sql, parameters, calls, total_ms in heaviest:
+            if isinstance(parameters, list) and parameters and isinstance(parameters[0], (list, dict)):
+                # A batch stored every parameter set; any one of them gives the statement's plan.
+                parameters = parameters[0]
+            try:
+                plan = self.execution_service.explain(connection=connection, sql=sql, parameters=parameters)["plan"]
+            except QueryExecutionError:
+                continue
+
+            shape = shapes.setdefault(sql, extract_shape(sql))
+            suggestions, _ = suggest_indexes(plan_findings(plan, shape), shape, columns_by_table, indexes_by_table)
+            for suggestion in suggestions:
+                fraction = SEEK_SAVING_FRACTION if suggestion.source == "full_scan" else SORT_SAVING_FRACTION
+                evidence = candidates.setdefault(
+                    (suggestion.table, suggestion.columns),
+                    CandidateEvidence(
+                        table=suggestion.table,
+                        columns=suggestion.columns,
+                        index_name=suggestion.name,
+                        statement=suggestion.statement,
+                        sample_sql=sql,
+                    ),
+                )
+                evidence.calls += calls
+                evidence.workload_ms += total_ms
+                evidence.saving_ms += total_ms * fraction
+
+        ranked = []
+        for evidence in candidates.values():
+            if evidence.calls < MIN_SUPPORTING_CALLS and evidence.workload_ms / evidence.calls < SLOW_STATEMENT_MS:
+                continue
+            write_cost_ms = rows_written[evidence.table] * WRITE_COST_MS_PER_ROW
+            score = evidence.saving_ms - write_cost_ms
+            if score > 0:
+                ranked.append((score, write_cost_ms, evidence))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+
+        with transaction.atomic():
+            IndexRecommendation.objects.filter(connection=connection, status="PENDING").delete()
+            IndexRecommendation.objects.bulk_create(
+                IndexRecommendation(
+                    connection=connection,
+                    table_name=evidence.table,
+                    index_name=evidence.index_name,
+                    columns=list(evidence.columns),
+                    statement=evidence.statement,
+                    supporting_calls=evidence.calls,
+                    workload_time_ms=round(evidence.workload_ms, 3),
+                    estimated_saving_ms=round(evidence.saving_ms, 3),
+                    estimated_write_cost_ms=round(write_cost_ms, 3),
+                    score=round(score, 3),
+                    sample_sql=evidence.sample_sql,
+                )
+                for score, write_cost_ms, evidence in ranked[:ADVISOR_MAX_RECOMMENDATIONS]
+            )
+
+        cache.set(self._analyzed_at_key(connection), timezone.now(), timeout=None)
+        return len(ranked[:ADVISOR_MAX_RECOMMENDATIONS])
+
+    def apply(self, *, recommendation: IndexRecommendation):
+        """Build (or rebuild) the index; in WAL mode readers keep running while it is written."""
+        started_ns = perf_counter_ns()
+        try:
+            with closing(self.execution_service._connect_sqlite(recommendation.connection)) as db:
+                db.execute("PRAGMA busy_timeout = 5000;")
+                exists = db.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (recommendation.index_name,)
+                ).fetchone()
+                db.execute(f'REINDEX "{recommendation.index_name}"' if exists else recommendation.statement)
+                db.execute(f'ANALYZE "{recommendation.index_name}"')
+                db.commit()
+        except sqlite3.Error as exc:
+            recommendation.status = "FAILED"
+            recommendation.error_message = str(exc)
+            recommendation.save(update_fields=["status", "error_message"])
+            raise QueryExecutionError(str(exc)) from exc
+
+        recommendation.status = "APPLIED"
+        recommendation.error_message = None
+        recommendation.build_time_ms = round((perf_counter_ns() - started_ns) / 1_000_000, 3)
+        recommendation.applied_at = timezone.now()
+        recommendation.save(update_fields=["status", "error_message", "build_time_ms", "applied_at"])
+        return self._serialize(recommendation)
+
+    def _serialize(self, item: IndexRecommendation):
+        return {
+            "id": item.id,
+            "table": item.table_name,
+            "index_name": item.index_name,
+            "columns": item.columns,
+            "sql": item.statement,
+            "supporting_calls": item.supporting_calls,
+            "workload_time_ms": item.workload_time_ms,
+            "estimated_saving_ms": item.estimated_saving_ms,
+            "estimated_write_cost_ms": item.estimated_write_cost_ms,
+            "score": item.score,
+            "sample_sql": item.sample_sql,
+            "status": item.status,
+            "build_time_ms": item.build_time_ms,
+            "error_message": item.error_message,
+            "applied_at": item.applied_at.isoformat() if item.applied_at else None,
+        }
+
+    def _job_key(self, connection: DatabaseConnection):
+        return f"index-advisor:{connection.pk}"
+
+    def _analyzed_at_key(self, connection: DatabaseConnection):
+        return f"infradb:index-advisor:{connection.pk}:analyzed_at"
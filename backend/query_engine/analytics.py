@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from dataclasses import dataclass
+
+from .background import background_runner
+from .sql_analysis import extract_shape, tokenize
+from .statistics import ACCESS_PATTERN, load_statistics
+
+
+DUCKDB_MIN_SCAN_ROWS = 250_000
+DUCKDB_POOL_SIZE = 8
+DUCKDB_THREADS = max(os.cpu_count() or 1, 1)
+DUCKDB_PREPARE_JOB = "duckdb-sqlite-extension"
+
+AGGREGATE_FUNCTIONS = {"COUNT", "SUM", "AVG", "MIN", "MAX", "STDDEV", "VARIANCE", "MEDIAN"}
+# Functions and operators whose SQLite behaviour DuckDB does not reproduce (argument order,
+# case-insensitive LIKE, type names, rowid access), so those statements always stay on SQLite.
+SQLITE_ONLY_FUNCTIONS = {
+    "STRFTIME", "DATE", "TIME", "DATETIME", "JULIANDAY", "UNIXEPOCH", "TYPEOF", "TOTAL", "GROUP_CONCAT",
+    "RANDOM", "RANDOMBLOB", "CHANGES", "TOTAL_CHANGES", "LAST_INSERT_ROWID", "SQLITE_VERSION", "PRINTF",
+    "LIKELIHOOD", "LIKELY", "UNLIKELY", "ZEROBLOB",
+}
+SQLITE_ONLY_KEYWORDS = {"LIKE", "GLOB", "REGEXP", "MATCH", "COLLATE", "INDEXED"}
+ROWID_ALIASES = {"ROWID", "OID", "_ROWID_"}
+
+
+class AnalyticsEngineError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    engine: str
+    reason: str
+    scanned_rows: int = 0
+
+    def as_dict(self):
+        return {"engine": self.engine, "reason": self.reason, "scanned_rows": self.scanned_rows}
+
+
+def route_statement(db: sqlite3.Connection, statement: str):
+    """Pick DuckDB for read queries whose SQLite plan full-scans large tables to aggregate, sort or join."""
+    tokens = tokenize(statement)
+    if not tokens or not tokens[0].is_keyword("SELECT", "WITH"):
+        return RouteDecision("sqlite", "Only read queries run on the analytics engine.")
+
+    aggregates = False
+    for index, token in enumerate(tokens):
+        calls = index + 1 < len(tokens) and tokens[index + 1].value == "("
+        if token.is_keyword(*SQLITE_ONLY_KEYWORDS) or (token.kind == "identifier" and token.upper in ROWID_ALIASES):
+            return RouteDecision("sqlite", f"{token.upper} has SQLite-specific semantics.")
+        if token.kind == "param":
+            return RouteDecision("sqlite", "Bound parameters run on SQLite.")
+        if calls and token.upper in SQLITE_ONLY_FUNCTIONS:
+            return RouteDecision("sqlite", f"{token.upper}() has SQLite-specific semantics.")
+        if (calls and token.upper in AGGREGATE_FUNCTIONS) or token.is_keyword("GROUP", "DISTINCT"):
+            aggregates = True
+
+    plan = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()]
+    stats = load_statistics(db)
+    tables = extract_shape(statement).tables
+    scanned_rows = 0
+    full_scans = 0
+    sorts = False
+    automatic_index = False
+    for detail in plan:
+        access = ACCESS_PATTERN.match(detail)
+        if access and access.group("op") == "SCAN" and access.group("kind") != "INDEX":
+            table = tables.get(access.group("table").lower(), access.group("table").lower())
+            scanned_rows += stats.rows_for(table)
+            full_scans += 1
+        elif access and (access.group("covering") or "").startswith("AUTOMATIC"):
+            # SQLite builds a throwaway index per query for this join; DuckDB hash-joins instead.
+            automatic_index = True
+        elif detail.startswith("USE TEMP B-TREE"):
+            sorts = True
+
+    if scanned_rows < DUCKDB_MIN_SCAN_ROWS:
+        return RouteDecision("sqlite", "The plan does not full-scan enough rows to benefit.", scanned_rows)
+    if not (aggregates or sorts or automatic_index or full_scans > 1):
+        return RouteDecision("sqlite", "Plain scans stream rows faster from SQLite.", scanned_rows)
+    return RouteDecision("duckdb", "Full scan feeding an aggregate, sort or join.", scanned_rows)
+
+
+@dataclass
+class _Attachment:
+    instance: object
+    users: int = 0
+    retired: bool = False
+    closed: bool = False
+
+
+class DuckDBAttachmentPool:
+    """Keeps embedded DuckDB instances with SQLite files attached read-only, one per file, LRU-evicted."""
+
+    def __init__(self, max_attachments: int = DUCKDB_POOL_SIZE, threads: int = DUCKDB_THREADS):
+        self.max_attachments = max_attachments
+        self.threads = threads
+        self._module = None
+        self._unavailable_reason = None
+        self._ready = False
+        self._attachments = OrderedDict()
+        self._lock = threading.Lock()
+        self._prepare_lock = threading.Lock()
+
+    @property
+    def available(self):
+        """True once the sqlite extension is loaded; the first check before then starts loading it in the background.
+
+        Installing the extension may download it, so a request never waits for that and stays on SQLite meanwhile.
+        """
+        if self._ready:
+            return True
+        if self._load() is not None:
+            background_runner.submit(DUCKDB_PREPARE_JOB, self.prepare)
+        return False
+
+    @property
+    def unavailable_reason(self):
+        if self._ready:
+            return None
+        self._load()
+        return self._unavailable_reason or "DuckDB's sqlite extension is still loading."
+
+    def prepare(self):
+        """Install and load DuckDB's sqlite extension; called from warm-up or a background job."""
+        module = self._load()
+        if module is None:
+            return {"available": False, "error": self._unavailable_reason}
+        with self._prepare_lock:
+            if not self._ready and self._module is not None:
+                try:
+                    with closing(module.connect()) as instance:
+                        instance.execute("INSTALL sqlite")
+                        instance.execute("LOAD sqlite")
+                except module.Error as exc:
+                    with self._lock:
+                        # Stop routing to DuckDB in this process rather than retrying on every request.
+                        self._unavailable_reason = f"DuckDB sqlite extension unavailable: {str(exc).splitlines()[0]}"
+                        self._module = None
+                else:
+                    self._ready = True
+        return {"available": self._ready, "error": self._unavailable_reason}
+
+    def execute(self, file_path: str, statement: str, limit: int):
+        """Run ``statement`` and return up to ``limit + 1`` rows so callers can detect truncation."""
+        module = self._load()
+        if module is None or not self._ready:
+            raise AnalyticsEngineError(self.unavailable_reason)
+
+        # Cursors are independent connections to the shared instance, so queries can run concurrently.
+        attachment = self._checkout(file_path)
+        try:
+            cursor = attachment.instance.cursor()
+            try:
+                cursor.execute("USE source")
+                cursor.execute(statement)
+                return cursor.fetchmany(limit + 1)
+            finally:
+                cursor.close()
+        except module.Error as exc:
+            raise AnalyticsEngineError(str(exc)) from exc
+        finally:
+            self._checkin(attachment)
+
+    def release(self, file_path: str):
+        with self._lock:
+            attachment = self._attachments.pop(str(file_path), None)
+            if attachment is not None:
+                attachment.retired = True
+        self._close_if_unused(attachment)
+
+    def _checkout(self, file_path: str):
+        key = str(file_path)
+        with self._lock:
+            attachment = self._attachments.get(key)
+            if attachment is not None:
+                self._attachments.move_to_end(key)
+                attachment.users += 1
+                return attachment
+
+            module = self._module
+            if module is None:
+                # Another thread found the sqlite extension missing after this caller checked.
+                raise AnalyticsEngineError(self._unavailable_reason)
+            instance = module.connect(config={"threads": self.threads})
+            try:
+                # Match SQLite: integer division truncates and NULLs sort first ascending, last descending.
+                instance.execute("SET GLOBAL integer_division = true")
+                instance.execute("SET GLOBAL default_null_order = 'nulls_first_on_asc_last_on_desc'")
+                escaped = key.replace("'", "''")
+                instance.execute(f"ATTACH '{escaped}' AS source (TYPE sqlite, READ_ONLY)")
+            except module.Error as exc:
+                instance.close()
+                if "extension" in str(exc).lower():
+                    # The sqlite scanner could not be loaded; stop routing to DuckDB in this process.
+                    self._unavailable_reason = f"DuckDB sqlite extension unavailable: {str(exc).splitlines()[0]}"
+                    self._module = None
+                raise AnalyticsEngineError(str(exc)) from exc
+
+            attachment = _Attachment(instance, users=1)
+            self._attachments[key] = attachment
+            evicted = []
+            while len(self._attachments) > self.max_attachments:
+                _, item = self._attachments.popitem(last=False)
+                item.retired = True
+                evicted.append(item)
+        for item in evicted:
+            self._close_if_unused(item)
+        return attachment
+
+    def _checkin(self, attachment: _Attachment):
+        with self._lock:
+            attachment.users -= 1
+        self._close_if_unused(attachment)
+
+    def _close_if_unused(self, attachment):
+        """Close an evicted or released instance once no other thread's cursor is still using it."""
+        if attachment is None:
+            return
+        with self._lock:
+            closing = attachment.retired and not attachment.users and not attachment.closed
+            attachment.closed = attachment.closed or closing
+        if closing:
+            attachment.instance.close()
+
+    def _load(self):
+        if self._module is not None or self._unavailable_reason is not None:
+            return self._module
+
+        try:
+            import duckdb  # type: ignore
+        except ImportError:
+            self._unavailable_reason = "duckdb is not installed."
+        else:
+            self._module = duckdb
+        return self._module
+
+
+analytics_pool = DuckDBAttachmentPool()
@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass, field
+from statistics import NormalDist
+from time import perf_counter_ns
+
+import numpy as np
+
+from .sql_analysis import tokenize
+
+
+APPROX_MIN_POPULATION_ROWS = 100_000
+APPROX_FIRST_STEP_PROBES = 2_000
+APPROX_STEP_GROWTH = 4
+APPROX_MAX_PROBES = 512_000
+APPROX_TIME_BUDGET_MS = 800
+APPROX_TARGET_RELATIVE_ERROR = 0.01
+APPROX_DEFAULT_CONFIDENCE = 0.95
+
+SUPPORTED_AGGREGATES = {"COUNT", "SUM", "TOTAL", "AVG"}
+EXTREMA_AGGREGATES = {"MIN", "MAX"}
+UNSUPPORTED_KEYWORDS = {"JOIN", "UNION", "EXCEPT", "INTERSECT", "HAVING", "ORDER", "LIMIT", "DISTINCT", "WINDOW", "OVER"}
+WHITESPACE_PATTERN = re.compile(r"\s+")
+PLACEHOLDERS = "{placeholders}"
+
+
+class ApproximationUnsupported(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class SelectItem:
+    kind: str
+    expression: str
+    name: str
+    argument: str | None = None
+
+
+@dataclass
+class AggregatePlan:
+    table: str
+    alias: str | None
+    where: str | None
+    group_by: list = field(default_factory=list)
+    items: list = field(default_factory=list)
+
+    @property
+    def aggregates(self):
+        return [item for item in self.items if item.kind != "group"]
+
+
+def plan_aggregate(sql: str, *, extrema: bool = False):
+    """Split a single-table COUNT/SUM/AVG query into its group keys, aggregate arguments and filter.
+
+    ``extrema`` also accepts MIN/MAX, for callers that compute aggregates exactly rather than by sampling.
+    """
+    statement = sql.strip().rstrip(";")
+    tokens = tokenize(statement)
+    if not tokens or not tokens[0].is_keyword("SELECT"):
+        raise ApproximationUnsupported("Only SELECT aggregates are supported.")
+
+    depth = 0
+    clauses = {}
+    for index, token in enumerate(tokens):
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+        elif token.is_keyword("SELECT") and index > 0:
+            raise ApproximationUnsupported("Subqueries are not supported.")
+        elif token.is_keyword(*UNSUPPORTED_KEYWORDS):
+            raise ApproximationUnsupported(f"{token.upper} is not supported in a single-table aggregate.")
+        elif depth == 0 and token.is_keyword("FROM", "WHERE", "GROUP"):
+            clauses.setdefault(token.upper, index)
+
+    if "FROM" not in clauses:
+        raise ApproximationUnsupported("A FROM clause is required.")
+
+    from_end = clauses.get("WHERE", clauses.get("GROUP", len(tokens)))
+    table_tokens = tokens[clauses["FROM"] + 1 : from_end]
+    if not table_tokens or table_tokens[0].kind != "identifier" or any(token.value in {",", "("} for token in table_tokens):
+        raise ApproximationUnsupported("Only a single base table is supported.")
+    alias = table_tokens[-1].value if len(table_tokens) > 1 else None
+
+    where = None
+    if "WHERE" in clauses:
+        where_end = clauses.get("GROUP", len(tokens))
+        where = _slice(statement, tokens[clauses["WHERE"] + 1 : where_end])
+
+    group_by = []
+    if "GROUP" in clauses:
+        group_by = [_slice(statement, part) for part in _split_commas(tokens[clauses["GROUP"] + 2 :])]
+
+    items = [_select_item(statement, part, extrema) for part in _split_commas(tokens[1 : clauses["FROM"]])]
+    if not any(item.kind != "group" for item in items):
+        raise ApproximationUnsupported("At least one aggregate function is required.")
+
+    normalized_groups = {_normalize(expression) for expression in group_by}
+    for item in items:
+        if item.kind == "group" and _normalize(item.expression) not in normalized_groups:
+            raise ApproximationUnsupported(f"{item.expression} must appear in GROUP BY.")
+
+    return AggregatePlan(table=table_tokens[0].value, alias=alias, where=where, group_by=group_by, items=items)
+
+
+def _slice(statement, tokens):
+    return statement[tokens[0].start : tokens[-1].end].strip() if tokens else ""
+
+
+def _normalize(expression):
+    return WHITESPACE_PATTERN.sub(" ", expression).strip().lower()
+
+
+def _split_commas(tokens):
+    parts, current, depth = [], [], 0
+    for token in tokens:
+        if token.value == "(":
+            depth += 1
+        elif token.value == ")":
+            depth -= 1
+        if token.value == "," and depth == 0:
+            parts.append(current)
+            current = []
+        else:
+            current.append(token)
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _select_item(statement, tokens, extrema=False):
+    name = None
+    if len(tokens) >= 3 and tokens[-2].is_keyword("AS"):
+        name, tokens = tokens[-1].value, tokens[:-2]
+    elif len(tokens) >= 2 and tokens[-1].kind == "identifier" and tokens[-2].value == ")":
+        name, tokens = tokens[-1].value, tokens[:-1]
+
+    expression = _slice(statement, tokens)
+    head = tokens[0].value.upper()
+    is_call = len(tokens) >= 3 and tokens[1].value == "(" and tokens[-1].value == ")"
+    if is_call and (head in SUPPORTED_AGGREGATES or (extrema and head in EXTREMA_AGGREGATES)):
+        argument = _slice(statement, tokens[2:-1])
+        if head in EXTREMA_AGGREGATES and len(_split_commas(tokens[2:-1])) > 1:
+            raise ApproximationUnsupported(f"Multi-argument {head} is a scalar function.")
+        if head == "COUNT" and argument == "*":
+            argument = None
+        return SelectItem(kind=head.lower(), expression=expression, name=name or expression, argument=argument)
+    if is_call and head in {"MIN", "MAX", "GROUP_CONCAT", "TOTAL_CHANGES"}:
+        raise ApproximationUnsupported(f"{head} has no sampling error bound.")
+    return SelectItem(kind="group", expression=expression, name=name or expression)
+
+
+def _sort_key(value):
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, bytes(value))
+
+
+class ApproximateQueryEngine:
+    """Estimates aggregates from growing uniform rowid samples and reports confidence intervals."""
+
+    def __init__(self, *, seed: int | None = None):
+        self.seed = seed
+
+    def population(self, db: sqlite3.Connection, plan: AggregatePlan):
+        # Separate queries: SQLite only answers a lone min()/max() with a single B-tree seek.
+        low = db.execute(f'SELECT min(rowid) FROM "{plan.table}"').fetchone()[0]
+        high = db.execute(f'SELECT max(rowid) FROM "{plan.table}"').fetchone()[0]
+        return (low or 0), (high or 0)
+
+    def refine(
+        self,
+        db: sqlite3.Connection,
+        plan: AggregatePlan,
+        *,
+        confidence: float = APPROX_DEFAULT_CONFIDENCE,
+        target_relative_error: float = APPROX_TARGET_RELATIVE_ERROR,
+        time_budget_ms: float = APPROX_TIME_BUDGET_MS,
+    ):
+        """Yield one snapshot per refinement step until the bounds are tight enough or time runs out."""
+        low, high = self.population(db, plan)
+        rowid_space = high - low + 1
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        rng = np.random.default_rng(self.seed)
+        max_probes = min(APPROX_MAX_PROBES, rowid_space)
+
+        sample_sql = self._sample_sql(plan)
+        chunk_limit = db.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        groups = {}
+        group_keys = []
+        key_columns = [[] for _ in range(len(plan.aggregates) + 1)]
+        probed = 0
+        step_size = APPROX_FIRST_STEP_PROBES
+        started_ns = perf_counter_ns()
+
+        while probed < max_probes:
+            # Each step is an independent uniform draw. Duplicates are dropped up front because
+            # rowid IN (...) would silently collapse them; sorting also keeps the B-tree walk local.
+            step = np.unique(rng.integers(low, high + 1, size=min(step_size, max_probes - probed)))
+            for offset in range(0, step.size, chunk_limit):
+                chunk = step[offset : offset + chunk_limit].tolist()
+                sql = sample_sql.replace(PLACEHOLDERS, ", ".join("?" * len(chunk)))
+                for row in db.execute(sql, chunk):
+                    key = tuple(row[: len(plan.group_by)])
+                    if key not in groups:
+                        groups[key] = len(group_keys)
+                        group_keys.append(key)
+                    key_columns[0].append(groups[key])
+                    for position, value in enumerate(row[len(plan.group_by) :], start=1):
+                        key_columns[position].append(value)
+            probed += step.size
+            step_size *= APPROX_STEP_GROWTH
+
+            elapsed_ms = (perf_counter_ns() - started_ns) / 1_000_000
+            snapshot = self._estimate(plan, group_keys, key_columns, probed, rowid_space, z)
+            snapshot.update(
+                {
+                    "confidence": confidence,
+                    "probes": probed,
+                    "rowid_space": rowid_space,
+                    "sample_fraction": round(probed / rowid_space, 6),
+                    "elapsed_ms": round(elapsed_ms, 3),
+                }
+            )
+            done = (
+                probed >= max_probes
+                or snapshot["max_relative_error"] <= target_relative_error
+                or elapsed_ms >= time_budget_ms
+            )
+            snapshot["final"] = done
+            # Size the next step so it ends near the budget instead of overshooting by a full growth factor.
+            per_probe_ms = elapsed_ms / probed
+            step_size = max(min(step_size, int((time_budget_ms - elapsed_ms) / per_probe_ms)), APPROX_FIRST_STEP_PROBES)
+            relative_error = snapshot["max_relative_error"]
+            snapshot["max_relative_error"] = round(relative_error, 6) if np.isfinite(relative_error) else None
+            yield snapshot
+            if done:
+                return
+
+    def _sample_sql(self, plan: AggregatePlan):
+        # SUM/AVG read text the way SQLite's aggregates do: by its numeric prefix, or 0 when it has none.
+        expressions = list(plan.group_by) + [
+            f"CAST(({item.argument}) AS REAL)" if item.argument and item.kind != "count" else item.argument or "1"
+            for item in plan.aggregates
+        ]
+        alias = f" AS {plan.alias}" if plan.alias else ""
+        qualifier = f"{plan.alias}." if plan.alias else ""
+        where = f" AND ({plan.where})" if plan.where else ""
+        return (
+            f"SELECT {', '.join(expressions)} FROM \"{plan.table}\"{alias} "
+            f"WHERE {qualifier}rowid IN ({PLACEHOLDERS}){where}"
+        )
+
+    def _estimate(self, plan: AggregatePlan, group_keys, key_columns, probes, rowid_space, z):
+        group_index = np.asarray(key_columns[0], dtype=np.intp)
+        group_count = max(len(group_keys), 0 if plan.group_by else 1)
+        # Every probe is one draw from the rowid space; probes that miss a row contribute zero.
+        rows, bounds = [], []
+        max_relative_error = 0.0
+        normalized_groups = [_normalize(expression) for expression in plan.group_by]
+        group_items = [
+            (item, normalized_groups.index(_normalize(item.expression)))
+            for item in plan.items
+            if item.kind == "group"
+        ]
+
+        per_item = []
+        for position, item in enumerate(plan.aggregates, start=1):
+            present = np.array([value is not None for value in key_columns[position]], dtype=bool)
+            if item.kind == "count":
+                # COUNT(column) only asks whether a value is there, whatever its type.
+                weights = present.astype(np.float64)
+            else:
+                weights = np.array([0.0 if value is None else value for value in key_columns[position]], dtype=np.float64)
+            hits = np.bincount(group_index, weights=present.astype(np.float64), minlength=group_count)
+            sums = np.bincount(group_index, weights=weights, minlength=group_count)
+            squares = np.bincount(group_index, weights=weights**2, minlength=group_count)
+            per_item.append((item, hits, sums, squares))
+
+        # Match SQLite's GROUP BY output order: NULL, numbers, text, then blobs.
+        order = sorted(range(group_count), key=lambda group: tuple(map(_sort_key, group_keys[group])) if group_keys else ())
+        for group in order:
+            row, row_bounds = {}, {}
+            key = group_keys[group] if group < len(group_keys) else ()
+            for item, position in group_items:
+                row[item.name] = key[position] if key else None
+
+            for item, hits, sums, squares in per_item:
+                if item.kind == "count":
+                    estimate, half_width = self._total(hits[group], hits[group], probes, rowid_space, z)
+                    estimate = int(round(estimate))
+                elif item.kind in {"sum", "total"}:
+                    estimate, half_width = self._total(sums[group], squares[group], probes, rowid_space, z)
+                else:
+                    estimate, half_width = self._mean(hits[group], sums[group], squares[group], z)
+                row[item.name] = estimate
+                if estimate is None:
+                    row_bounds[item.name] = None
+                    continue
+                row_bounds[item.name] = [estimate - half_width, estimate + half_width]
+                if estimate:
+                    max_relative_error = max(max_relative_error, abs(half_width / estimate))
+                elif half_width:
+                    max_relative_error = float("inf")
+
+            rows.append(row)
+            bounds.append(row_bounds)
+
+        return {"rows": rows, "bounds": bounds, "max_relative_error": max_relative_error}
+
+    def _total(self, total, squares, probes, rowid_space, z):
+        mean = total / probes
+        variance = max(squares / probes - mean**2, 0.0) * probes / max(probes - 1, 1)
+        estimate = rowid_space * mean
+        half_width = z * rowid_space * np.sqrt(variance / probes)
+        return float(estimate), float(half_width)
+
+    def _mean(self, hits, total, squares, z):
+        if not hits:
+            return None, 0.0
+        mean = total / hits
+        variance = max(squares / hits - mean**2, 0.0) * hits / max(hits - 1, 1)
+        return float(mean), float(z * np.sqrt(variance / hits))
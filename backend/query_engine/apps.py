@@ -0,0 +1,62 @@
+import os
+import sys
+from importlib import import_module
+from time import perf_counter
+
+from django.apps import AppConfig
+from django.conf import settings
+
+
+# Only processes that serve requests warm up and run the maintenance scheduler: ``manage.py`` with one
+# of these commands, or one of these application servers. Everything else (migrations, shells, tests,
+# task workers, ``python -c``) skips both.
+SERVING_COMMANDS = {"runserver"}
+SERVING_PROGRAMS = {"gunicorn", "uvicorn", "daphne", "hypercorn", "uwsgi"}
+
+
+def _serving_process():
+    argv = sys.argv
+    if not argv or not argv[0]:
+        return False
+    program = os.path.basename(argv[0])
+    if program == "__main__.py":
+        # ``python -m gunicorn`` reports the package's __main__ module as argv[0].
+        program = os.path.basename(os.path.dirname(argv[0]))
+    if program == "manage.py":
+        if len(argv) < 2 or argv[1] not in SERVING_COMMANDS:
+            return False
+        # The autoreloader parent only watches files; the child it spawns serves requests.
+        return os.environ.get("RUN_MAIN") == "true" or "--noreload" in argv
+    return program in SERVING_PROGRAMS
+
+
+class QueryEngineConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "query_engine"
+
+    def ready(self):
+        from .warmup import enabled_stages, run_warmup, startup_report
+
+        for module in ("query_engine.services", "query_engine.views"):
+            started = perf_counter()
+            import_module(module)
+            startup_report["imports_ms"][module] = round((perf_counter() - started) * 1000, 3)
+
+        if not _serving_process():
+            return
+
+        from .maintenance import maintenance_scheduler
+
+        maintenance_scheduler.start()
+
+        stages = enabled_stages()
+        if not stages:
+            return
+
+        startup_report["warmup"] = {"status": "scheduled", "stages": {}}
+        if getattr(settings, "INFRADB_WARMUP_BLOCKING", False):
+            run_warmup(stages)
+        else:
+            from .background import background_runner
+
+            background_runner.submit("warmup", run_warmup, stages)
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from time import monotonic, perf_counter_ns
+from typing import NamedTuple
+
+from .background import background_runner
+from .models import QueryJob
+from .pool import sqlite_pool
+from .sql_analysis import tokenize
+
+
+AUTOCOMPLETE_MAX_CONNECTIONS = 32
+AUTOCOMPLETE_DEFAULT_LIMIT = 20
+AUTOCOMPLETE_MAX_LIMIT = 100
+HISTORY_SAMPLE_JOBS = 500
+HISTORY_IDENTIFIERS = 300
+HISTORY_REFRESH_SECONDS = 60
+KIND_ORDER = {"table": 0, "view": 1, "column": 2, "index": 3, "identifier": 4}
+
+
+class Completion(NamedTuple):
+    label: str
+    kind: str
+    detail: str = ""
+
+    def as_dict(self):
+        return {"label": self.label, "kind": self.kind, "detail": self.detail}
+
+
+class PrefixIndex:
+    """Sorted, case-folded keys searched by bisection; one completion per key, tables ahead of columns."""
+
+    def __init__(self, completions=()):
+        self._candidates = {}
+        for item in completions:
+            self._candidates.setdefault(item.label.lower(), {})[item.kind] = item
+        self.keys = sorted(self._candidates)
+        self.items = [self._best(self._candidates[key]) for key in self.keys]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, key: str):
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return self.items[position]
+        return None
+
+    def search(self, prefix: str, limit: int, exclude=frozenset()):
+        results = []
+        position = bisect_left(self.keys, prefix)
+        while position < len(self.keys) and len(results) < limit and self.keys[position].startswith(prefix):
+            if self.keys[position] not in exclude:
+                results.append(self.items[position])
+            position += 1
+        return results
+
+    def updated(self, removed, added):
+        """Copy with ``removed`` taken out and ``added`` put in, leaving the original intact for readers."""
+        index = PrefixIndex()
+        index._candidates = dict(self._candidates)
+        index.keys = list(self.keys)
+        index.items = list(self.items)
+        for item, present in [(item, False) for item in removed] + [(item, True) for item in added]:
+            key = item.label.lower()
+            group = dict(index._candidates.get(key, {}))
+            if present:
+                group[item.kind] = item
+            else:
+                group.pop(item.kind, None)
+            position = bisect_left(index.keys, key)
+            exists = position < len(index.keys) and index.keys[position] == key
+            if group:
+                index._candidates[key] = group
+                if exists:
+                    index.items[position] = self._best(group)
+                else:
+                    index.keys.insert(position, key)
+                    index.items.insert(position, self._best(group))
+            elif exists:
+                del index._candidates[key]
+                del index.keys[position]
+                del index.items[position]
+        return index
+
+    @staticmethod
+    def _best(group: dict):
+        return min(group.values(), key=lambda item: KIND_ORDER.get(item.kind, len(KIND_ORDER)))
+
+
+@dataclass
+class CatalogEntry:
+    name: str
+    kind: str
+    sql: str
+    table: str
+    columns: tuple = ()
+
+    def completion(self):
+        return Completion(self.name, self.kind, self.table if self.kind == "index" else "")
+
+
+def _column_completion(label: str, tables: tuple):
+    return Completion(label, "column", tables[0] if len(tables) == 1 else f"{len(tables)} tables")
+
+
+@dataclass
+class ConnectionCompletions:
+    version: str | None = None
+    catalog: dict = field(default_factory=dict)
+    names: PrefixIndex = field(default_factory=PrefixIndex)
+    # Case-folded column name -> (spelling, tables that have it).
+    column_tables: dict = field(default_factory=dict)
+    columns_by_table: dict = field(default_factory=dict)
+    history: list = field(default_factory=list)
+    history_checked: float = 0.0
+
+
+class AutocompleteService:
+    """In-memory completion indexes per connection, rebuilt from the catalog when the schema version moves."""
+
+    def __init__(self, max_connections: int = AUTOCOMPLETE_MAX_CONNECTIONS):
+        self.max_connections = max_connections
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def complete(self, connection, version: str, prefix: str, *, table: str | None = None, limit: int | None = None):
+        limit = max(1, min(int(limit or AUTOCOMPLETE_DEFAULT_LIMIT), AUTOCOMPLETE_MAX_LIMIT))
+        state, rebuilt = self._state(connection, version)
+        if monotonic() - state.history_checked > HISTORY_REFRESH_SECONDS:
+            state.history_checked = monotonic()
+            background_runner.submit(f"autocomplete:{connection.pk}", self._refresh_history, connection, state)
+
+        started_ns = perf_counter_ns()
+        key = (prefix or "").lower()
+        if table:
+            index = state.columns_by_table.get(table.lower())
+            items = index.search(key, limit) if index is not None else []
+        else:
+            items = []
+            for label, _ in state.history:
+                if len(items) >= limit:
+                    break
+                if label.lower().startswith(key):
+                    items.append(state.names.get(label.lower()) or Completion(label, "identifier", "history"))
+            items += state.names.search(key, limit - len(items), exclude={item.label.lower() for item in items})
+        return {
+            "prefix": prefix,
+            "table": table,
+            "items": [item.as_dict() for item in items],
+            "indexed_names": len(state.names),
+            "rebuilt": rebuilt,
+            "lookup_ms": round((perf_counter_ns() - started_ns) / 1_000_000, 4),
+        }
+
+    def invalidate(self, connection_id):
+        with self._lock:
+            self._states.pop(str(connection_id), None)
+
+    def _state(self, connection, version: str):
+        key = str(connection.pk)
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                self._states.move_to_end(key)
+        if state is not None and state.version == version:
+            return state, False
+
+        previous = state or ConnectionCompletions()
+        state = self._build(connection, version, previous)
+        if not previous.history:
+            self._refresh_history(connection, state)
+        with self._lock:
+            self._states[key] = state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_connections:
+                self._states.popitem(last=False)
+        return state, True
+
+    def _build(self, connection, version: str, previous: ConnectionCompletions):
+        """Re-describe only objects whose DDL changed, then patch the previous indexes with the difference."""
+        catalog = {}
+        with sqlite_pool.connection(connection.file_path) as db:
+            rows = db.execute(
+                "SELECT type, name, tbl_name, sql FROM sqlite_master "
+                "WHERE type IN ('table', 'view', 'index') AND name NOT LIKE 'sqlite_%'"
+            ).fetchall()
+            for kind, name, table, sql in rows:
+                known = previous.catalog.get(name)
+                if known is not None and known.kind == kind and known.sql == (sql or ""):
+                    catalog[name] = known
+                    continue
+                columns = ()
+                if kind in {"table", "view"}:
+                    escaped = name.replace('"', '""')
+                    columns = tuple(row[1] for row in db.execute(f'PRAGMA table_info("{escaped}")').fetchall())
+                catalog[name] = CatalogEntry(name, kind, sql or "", table, columns)
+
+        removed = [entry for name, entry in previous.catalog.items() if catalog.get(name) is not entry]
+        added = [entry for name, entry in catalog.items() if previous.catalog.get(name) is not entry]
+
+        column_tables = dict(previous.column_tables)
+        touched = set()
+        for entry in removed:
+            for column in entry.columns:
+                key = column.lower()
+                label, tables = column_tables[key]
+                column_tables[key] = (label, tuple(table for table in tables if table != entry.name))
+                touched.add(key)
+        for entry in added:
+            for column in entry.columns:
+                key = column.lower()
+                label, tables = column_tables.get(key, (column, ()))
+                column_tables[key] = (label, tables + (entry.name,))
+                touched.add(key)
+        for key in touched:
+            if not column_tables[key][1]:
+                del column_tables[key]
+
+        columns_by_table = dict(previous.columns_by_table)
+        for entry in removed:
+            columns_by_table.pop(entry.name.lower(), None)
+        for entry in added:
+            if entry.columns:
+                columns_by_table[entry.name.lower()] = PrefixIndex(
+                    Completion(column, "column", entry.name) for column in entry.columns
+                )
+
+        if previous.catalog:
+            stale_columns = [previous.column_tables[key] for key in touched if key in previous.column_tables]
+            fresh_columns = [column_tables[key] for key in touched if key in column_tables]
+            names = previous.names.updated(
+                [entry.completion() for entry in removed] + [_column_completion(*item) for item in stale_columns],
+                [entry.completion() for entry in added] + [_column_completion(*item) for item in fresh_columns],
+            )
+        else:
+            names = PrefixIndex(
+                [entry.completion() for entry in catalog.values()]
+                + [_column_completion(label, tables) for label, tables in column_tables.values()]
+            )
+
+        return ConnectionCompletions(
+            version=version,
+            catalog=catalog,
+            names=names,
+            column_tables=column_tables,
+            columns_by_table=columns_by_table,
+            history=previous.history,
+            history_checked=previous.history_checked,
+        )
+
+    def _refresh_history(self, connection, state: ConnectionCompletions):
+        """Rank identifiers by how often recent successful queries on this connection used them."""
+        counts = Counter()
+        statements = (
+            QueryJob.objects.filter(connection=connection, status="COMPLETED")
+            .order_by("-created_at")
+            .values_list("sql_query", flat=True)[:HISTORY_SAMPLE_JOBS]
+        )
+        spelling = {}
+        for statement in statements:
+            tokens = tokenize(statement)
+            for index, token in enumerate(tokens):
+                calls = index + 1 < len(tokens) and tokens[index + 1].value == "("
+                if token.kind == "identifier" and len(token.value) > 1 and not calls:
+                    key = token.value.lower()
+                    counts[key] += 1
+                    spelling.setdefault(key, token.value)
+        state.history = [(spelling[key], count) for key, count in counts.most_common(HISTORY_IDENTIFIERS)]
+        state.history_checked = monotonic()
+
+
+autocomplete_service = AutocompleteService()
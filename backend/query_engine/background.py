@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRunner:
+    """Runs keyed jobs on daemon threads, with at most one job in flight per key."""
+
+    def __init__(self):
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def is_running(self, key):
+        with self._lock:
+            return key in self._inflight
+
+    @contextmanager
+    def claim(self, key):
+        """Hold ``key`` for work done on the caller's thread; yields False if a job already holds it."""
+        with self._lock:
+            claimed = key not in self._inflight
+            self._inflight.add(key)
+        try:
+            yield claimed
+        finally:
+            if claimed:
+                with self._lock:
+                    self._inflight.discard(key)
+
+    def submit(self, key, func, *args, **kwargs):
+        with self._lock:
+            if key in self._inflight:
+                return False
+            self._inflight.add(key)
+
+        thread = threading.Thread(
+            target=self._run,
+            args=(key, func, args, kwargs),
+            name=f"infradb-background-{key}",
+            daemon=True,
+        )
+        thread.start()
+        return True
+
+    def _run(self, key, func, args, kwargs):
+        try:
+            func(*args, **kwargs)
+        except Exception:
+            logger.exception("Background job %s failed", key)
+        finally:
+            connections.close_all()
+            with self._lock:
+                self._inflight.discard(key)
+
+
+background_runner = BackgroundRunner()
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+def version_etag(*parts):
+    """Strong ETag derived from cheap version tokens (row counts, timestamps, file headers)."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest[:32])
+
+
+def not_modified(request, etag: str, last_modified=None):
+    """Return a 304 when the client's If-None-Match / If-Modified-Since still hold, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        return None
+    return with_validators(response, etag, last_modified)
+
+
+def with_validators(response, etag: str, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    # Browsers revalidate on every fetch, so a 304 replaces the recomputation instead of a stale copy.
+    response["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+    return response
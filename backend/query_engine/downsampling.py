@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import sqlite3
+import warnings
+from dataclasses import dataclass
+from time import perf_counter
+
+import numpy as np
+
+
+DOWNSAMPLING_METHODS = ("lttb", "minmax")
+DEFAULT_DOWNSAMPLE_POINTS = 1000
+MAX_DOWNSAMPLE_POINTS = 10_000
+DOWNSAMPLE_CHUNK_ROWS = 65_536
+
+
+@dataclass(frozen=True)
+class DownsampleSpec:
+    x: str
+    y: str
+    points: int = DEFAULT_DOWNSAMPLE_POINTS
+    method: str = "lttb"
+
+    @classmethod
+    def from_options(cls, options):
+        if not isinstance(options, dict) or not options.get("x") or not options.get("y"):
+            raise ValueError("visualization needs the x and y column names.")
+        method = str(options.get("method") or "lttb").lower()
+        if method not in DOWNSAMPLING_METHODS:
+            raise ValueError(f"visualization method must be one of {', '.join(DOWNSAMPLING_METHODS)}.")
+        try:
+            points = int(options.get("points") or DEFAULT_DOWNSAMPLE_POINTS)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("visualization points must be an integer.") from exc
+        if not 3 <= points <= MAX_DOWNSAMPLE_POINTS:
+            raise ValueError(f"visualization points must be between 3 and {MAX_DOWNSAMPLE_POINTS}.")
+        return cls(str(options["x"]), str(options["y"]), points, method)
+
+
+def _quote(name: str):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _as_numbers(values, temporal: bool):
+    """Chart coordinates as float64; ISO 8601 text becomes epoch milliseconds."""
+    if temporal:
+        with warnings.catch_warnings():
+            # NumPy warns on, but still parses, a trailing UTC offset.
+            warnings.simplefilter("ignore", DeprecationWarning)
+            try:
+                return np.array(values, dtype="datetime64[ms]").astype(np.int64).astype(np.float64)
+            except ValueError as exc:
+                raise ValueError("x values must all be numbers or all be ISO 8601 timestamps.") from exc
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Chart columns must hold numbers (or ISO 8601 timestamps for x).") from exc
+
+
+class LTTBDownsampler:
+    """Largest-Triangle-Three-Buckets over rows streamed in x order, in memory proportional to ``points``.
+
+    Buckets split the ``total`` rows evenly by position, and each keeps the point that spans the
+    largest triangle with the previously kept point and the next bucket's centroid. A first pass
+    (``measure``) sums each bucket's centroid; the second (``add``) only tracks the best point of the
+    bucket being decided, so neither pass buffers rows.
+    """
+
+    passes = 2
+
+    def __init__(self, total: int, points: int):
+        self.total = total
+        self.points = points
+        self.sorted = True
+        self._reduce = total > points
+        # starts[i] = floor(i * (total - 2) / (points - 2)) + 1 is the first row of bucket i, in integer
+        # arithmetic so exact multiples do not round down a row; the final bucket is the last row alone.
+        span, buckets = (total - 2, points - 2) if self._reduce else (1, 1)
+        self._starts = np.arange(points - 1, dtype=np.int64) * span // buckets + 1
+        self._starts[-1] = total - 1
+        self._sums = np.zeros((2, points - 1))
+        self._counts = np.zeros(points - 1)
+        self._measured = 0
+        self._row = 0
+        self._last_x = -np.inf
+        self._anchor = None
+        self._best = None
+        self._out_x = []
+        self._out_y = []
+
+    def measure(self, x: np.ndarray, y: np.ndarray):
+        if not self._reduce or x.size == 0:
+            self._measured += x.size
+            return
+        buckets = self._buckets(self._measured, x.size)
+        self._measured += x.size
+        inside = buckets >= 0
+        length = self.points - 1
+        self._counts += np.bincount(buckets[inside], minlength=length)
+        self._sums[0] += np.bincount(buckets[inside], weights=x[inside], minlength=length)
+        self._sums[1] += np.bincount(buckets[inside], weights=y[inside], minlength=length)
+
+    def add(self, x: np.ndarray, y: np.ndarray):
+        if x.size == 0:
+            return
+        if self.sorted and (x[0] < self._last_x or np.any(np.diff(x) < 0)):
+            self.sorted = False
+        self._last_x = x[-1]
+        first_row = self._row
+        self._row += x.size
+        if not self._reduce:
+            self._out_x.append(x)
+            self._out_y.append(y)
+            return
+
+        buckets = self._buckets(first_row, x.size)
+        if first_row == 0:
+            self._emit(x[0], y[0])
+        # Rows arrive in bucket order, so each bucket is one contiguous run of the chunk.
+        runs = np.flatnonzero(np.diff(buckets)) + 1
+        for run in np.split(np.arange(x.size), runs):
+            bucket = int(buckets[run[0]])
+            if bucket < 0:
+                continue
+            if bucket == self.points - 2:
+                self._emit(x[run[-1]], y[run[-1]])
+                continue
+            self._consider(bucket, x[run], y[run])
+            if first_row + run[-1] + 1 == self._starts[bucket + 1]:
+                self._emit(*self._best[1:])
+
+    def finish(self):
+        if self._reduce and self._best is not None:
+            # Fewer rows arrived than counted: settle the open bucket on what is there.
+            self._emit(*self._best[1:])
+        if not self._out_x:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(self._out_x), np.concatenate(self._out_y)
+
+    def _buckets(self, first_row: int, count: int):
+        rows = np.arange(first_row, first_row + count)
+        # Row 0 is always kept and belongs to no bucket (-1).
+        return np.where(rows == 0, -1, np.searchsorted(self._starts, rows, side="right") - 1)
+
+    def _consider(self, bucket: int, x: np.ndarray, y: np.ndarray):
+        following = bucket + 1
+        centroid_x, centroid_y = self._sums[:, following] / max(self._counts[following], 1)
+        anchor_x, anchor_y = self._anchor
+        # Twice the triangle area; the constant factor does not change the argmax.
+        areas = np.abs((anchor_x - centroid_x) * (y - anchor_y) - (anchor_x - x) * (centroid_y - anchor_y))
+        chosen = int(np.argmax(areas))
+        if self._best is None or areas[chosen] > self._best[0]:
+            self._best = (areas[chosen], x[chosen], y[chosen])
+
+    def _emit(self, x, y):
+        self._anchor = (x, y)
+        self._best = None
+        self._out_x.append(np.array([x]))
+        self._out_y.append(np.array([y]))
+
+
+class MinMaxDownsampler:
+    """Keeps the lowest and highest point of each equal-width x bucket, in memory fixed by ``points``.
+
+    Rows may arrive in any order; the kept points come back sorted by x.
+    """
+
+    passes = 1
+
+    def __init__(self, x_min: float, x_max: float, points: int):
+        self.x_min = x_min
+        self.buckets = max(points // 2, 1)
+        self.width = (x_max - x_min) / self.buckets or 1.0
+        self.sorted = True
+        self._min_y = np.full(self.buckets, np.inf)
+        self._min_x = np.full(self.buckets, np.nan)
+        self._max_y = np.full(self.buckets, -np.inf)
+        self._max_x = np.full(self.buckets, np.nan)
+
+    def add(self, x: np.ndarray, y: np.ndarray):
+        if x.size == 0:
+            return
+        bucket = np.clip(((x - self.x_min) / self.width).astype(np.int64), 0, self.buckets - 1)
+        # Sorting by (bucket, y) puts each bucket's lowest point first and highest last.
+        order = np.lexsort((y, bucket))
+        ordered = bucket[order]
+        boundary = ordered[1:] != ordered[:-1]
+        lowest = order[np.concatenate(([True], boundary))]
+        highest = order[np.concatenate((boundary, [True]))]
+
+        slots = bucket[lowest]
+        better = y[lowest] < self._min_y[slots]
+        self._min_y[slots[better]] = y[lowest][better]
+        self._min_x[slots[better]] = x[lowest][better]
+        slots = bucket[highest]
+        better = y[highest] > self._max_y[slots]
+        self._max_y[slots[better]] = y[highest][better]
+        self._max_x[slots[better]] = x[highest][better]
+
+    def finish(self):
+        filled = ~np.isnan(self._min_x)
+        low_x, low_y = self._min_x[filled], self._min_y[filled]
+        high_x, high_y = self._max_x[filled], self._max_y[filled]
+        # Within a bucket the two points go in x order; a bucket whose extremes coincide keeps one.
+        low_first = low_x <= high_x
+        first_x = np.where(low_first, low_x, high_x)
+        first_y = np.where(low_first, low_y, high_y)
+        second_x = np.where(low_first, high_x, low_x)
+        second_y = np.where(low_first, high_y, low_y)
+        distinct = (first_x != second_x) | (first_y != second_y)
+        x = np.column_stack((first_x, second_x)).ravel()
+        y = np.column_stack((first_y, second_y)).ravel()
+        keep = np.column_stack((np.ones_like(distinct), distinct)).ravel()
+        return x[keep], y[keep]
+
+
+def downsample_query(db: sqlite3.Connection, statement: str, parameters, spec: DownsampleSpec):
+    """Reduce a read statement's (x, y) series to at most ``spec.points`` points in streaming scans.
+
+    A single read transaction covers the count/range pre-pass and the scans, so all see the same rows.
+    """
+    started = perf_counter()
+    statement = statement.strip().rstrip(";")
+    x_column, y_column = _quote(spec.x), _quote(spec.y)
+    source = f"SELECT {x_column}, {y_column} FROM ({statement}) WHERE {x_column} IS NOT NULL AND {y_column} IS NOT NULL"
+    bound = () if parameters is None else parameters
+
+    db.execute("BEGIN")
+    try:
+        # SQLite reads an unknown double-quoted name as a string literal, so check the names first.
+        cursor = db.execute(f"SELECT * FROM ({statement}) LIMIT 0", bound)
+        available = [item[0] for item in cursor.description or []]
+        cursor.close()
+        missing = [name for name in (spec.x, spec.y) if name not in available]
+        if missing:
+            raise ValueError(f"The query returns no column named {', '.join(missing)}.")
+        total, low, high = db.execute(
+            f"SELECT count(*), min({x_column}), max({x_column}) FROM ({source})", bound
+        ).fetchone()
+        temporal = isinstance(low, str)
+        if total and spec.method == "minmax":
+            x_min, x_max = _as_numbers([low, high], temporal)
+            sampler = MinMaxDownsampler(x_min, x_max, spec.points)
+        else:
+            sampler = LTTBDownsampler(total, spec.points)
+
+        # LTTB measures bucket centroids on a first scan and picks points on the second.
+        steps = [sampler.measure, sampler.add] if sampler.passes == 2 else [sampler.add]
+        for step in steps:
+            cursor = db.execute(source, bound)
+            cursor.row_factory = None
+            while True:
+                chunk = cursor.fetchmany(DOWNSAMPLE_CHUNK_ROWS)
+                if not chunk:
+                    break
+                xs, ys = zip(*chunk)
+                step(_as_numbers(xs, temporal), _as_numbers(ys, False))
+            cursor.close()
+    finally:
+        db.rollback()
+
+    x, y = sampler.finish()
+    if temporal:
+        stamps = x.astype(np.int64)
+        # One unit for the whole response, so every point has the same shape.
+        unit = "s" if np.all(stamps % 1000 == 0) else "ms"
+        x_values = np.datetime_as_string(stamps.astype("datetime64[ms]"), unit=unit).tolist()
+    else:
+        x_values = x.tolist()
+    return {
+        "columns": [{"name": spec.x, "type": "text"}, {"name": spec.y, "type": "text"}],
+        "rows": [{spec.x: x_value, spec.y: y_value} for x_value, y_value in zip(x_values, y.tolist())],
+        "downsampling": {
+            "method": spec.method,
+            "x": spec.x,
+            "y": spec.y,
+            "x_kind": "timestamp" if temporal else "number",
+            "source_rows": total,
+            "points": len(x_values),
+            "target_points": spec.points,
+            # LTTB assumes rows in x order; an unsorted series still gets points, just not a faithful shape.
+            "x_sorted": sampler.sorted,
+            "duration_ms": round((perf_counter() - started) * 1000, 3),
+        },
+    }
@@ -1,25 +1,66 @@
 from __future__ import annotations
 
 import sys
+import threading
 from pathlib import Path
 from time import perf_counter
 
+from django.conf import settings
+
+from .native_sidecar import DEFAULT_SIDECAR_SOCKET, SidecarClient, SidecarUnavailable
+from .tracing import span
+
+
+NATIVE_MODES = ("inprocess", "sidecar")
+
 
 class NativeEngineClient:
-    def __init__(self):
+    def __init__(self, mode: str | None = None):
+        self._mode = mode
         self._engine_module = None
+        self._import_attempted = False
+        self._engine = None
+        self._sidecar = None
+        self._lock = threading.Lock()
+        self.timings = {}
+
+    @property
+    def mode(self):
+        mode = self._mode or getattr(settings, "INFRADB_NATIVE_MODE", "inprocess")
+        return mode if mode in NATIVE_MODES else "inprocess"
 
     @property
     def available(self):
+        if self.mode == "sidecar":
+            try:
+                return bool(self._sidecar_client().ping().get("available"))
+            except SidecarUnavailable:
+                return False
         return self._load_engine() is not None
 
+    def load(self):
+        """Import the module and build the shared engine up front; returns import and construction timings."""
+        if self.mode == "sidecar":
+            try:
+                reply = self._sidecar_client().ping()
+            except SidecarUnavailable as exc:
+                return {"available": False, "mode": "sidecar", "error": str(exc)}
+            return {**reply, "mode": "sidecar"}
+        self._shared_engine()
+        return {"available": self._engine is not None, **self.timings}
+
     def scan_database(self, file_path: str):
-        module = self._load_engine()
-        if module is None:
+        with span("native_scan", mode=self.mode):
+            return self._scan(file_path)
+
+    def _scan(self, file_path: str):
+        if self.mode == "sidecar":
+            return self._scan_in_sidecar(file_path)
+        engine = self._shared_engine()
+        if engine is None:
             return {"available": False}
 
         started = perf_counter()
-        engine = module.Engine()
         batch = engine.execute_optimized_scan(file_path)
         duration_ms = round((perf_counter() - started) * 1000, 3)
         return {
@@ -29,9 +70,57 @@ class NativeEngineClient:
             "label": "pybind-native",
         }
 
+    def _scan_in_sidecar(self, file_path: str):
+        # A crash or hang in the native code takes down the sidecar, not this worker's request.
+        started = perf_counter()
+        try:
+            reply, batch = self._sidecar_client().scan(file_path)
+        except SidecarUnavailable as exc:
+            return {"available": False, "error": str(exc), "label": "native-sidecar"}
+        if batch is None:
+            return {"available": False, "error": reply.get("error", ""), "label": "native-sidecar"}
+        with batch:
+            return {
+                "available": True,
+                "scan_row_estimate": batch.row_count,
+                "scan_duration_ms": reply["scan_duration_ms"],
+                "round_trip_ms": round((perf_counter() - started) * 1000, 3),
+                "shared_bytes": batch.size,
+                "label": "native-sidecar",
+            }
+
+    def _sidecar_client(self):
+        socket_path = getattr(settings, "INFRADB_NATIVE_SIDECAR_SOCKET", DEFAULT_SIDECAR_SOCKET)
+        if self._sidecar is None or self._sidecar.socket_path != socket_path:
+            self._sidecar = SidecarClient(socket_path)
+        return self._sidecar
+
+    def _shared_engine(self):
+        # Engine() logs to stdout on construction, so one instance serves every query.
+        if self._engine is not None:
+            return self._engine
+
+        module = self._load_engine()
+        if module is None:
+            return None
+        with self._lock:
+            if self._engine is None:
+                started = perf_counter()
+                self._engine = module.Engine()
+                self.timings["engine_init_ms"] = round((perf_counter() - started) * 1000, 3)
+        return self._engine
+
     def _load_engine(self):
-        if self._engine_module is not None:
+        if self._import_attempted:
             return self._engine_module
+        # Concurrent callers wait for the one import instead of reporting the engine missing meanwhile.
+        with self._lock:
+            if not self._import_attempted:
+                self._import_engine()
+        return self._engine_module
+
+    def _import_engine(self):
+        started = perf_counter()
 
         release_dir = Path(__file__).resolve().parent.parent.parent / "native" / "build" / "Release"
         if release_dir.exists():
@@ -46,4 +135,9 @@ class NativeEngineClient:
         else:
             self._engine_module = infradb_core
 
-        return self._engine_module
+        self.timings["import_ms"] = round((perf_counter() - started) * 1000, 3)
+        # Set last, so the lock-free check above never sees the flag before the module.
+        self._import_attempted = True
+
+
+native_client = NativeEngineClient()
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from time import perf_counter_ns
+from urllib.parse import quote
+
+
+FEDERATION_POOL_SIZE = 16
+FEDERATION_IDLE_SESSIONS = 2
+ALIAS_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,63}$")
+RESERVED_ALIASES = {"main", "temp"}
+
+
+class FederationError(Exception):
+    pass
+
+
+def _read_only_uri(path: str):
+    return f"file:{quote(str(Path(path).resolve()))}?mode=ro"
+
+
+class FederatedSessionPool:
+    """Caches read-only SQLite sessions per attach set, so repeat queries skip ATTACH and schema parsing."""
+
+    def __init__(self, max_attach_sets: int = FEDERATION_POOL_SIZE, idle_sessions: int = FEDERATION_IDLE_SESSIONS):
+        self.max_attach_sets = max_attach_sets
+        self.idle_sessions = idle_sessions
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def session(self, primary_path: str, attachments: dict):
+        """Yield ``(db, info)`` with every ``alias -> path`` attached; the session returns to the pool afterwards."""
+        for alias in attachments:
+            if not ALIAS_PATTERN.match(alias) or alias.lower() in RESERVED_ALIASES:
+                raise FederationError(f"Invalid attachment alias: {alias}")
+        key = (str(primary_path), tuple(sorted((alias.lower(), str(path)) for alias, path in attachments.items())))
+
+        started_ns = perf_counter_ns()
+        db = self._checkout(key)
+        reused = db is not None
+        if db is None:
+            db = self._open(primary_path, attachments)
+        info = {"session_reused": reused, "session_setup_ms": round((perf_counter_ns() - started_ns) / 1_000_000, 3)}
+
+        healthy = True
+        try:
+            yield db, info
+        except sqlite3.DatabaseError as exc:
+            # Statement errors leave the session usable; anything else (corruption, I/O) retires it.
+            healthy = isinstance(exc, sqlite3.OperationalError)
+            raise
+        finally:
+            if db.in_transaction:
+                db.rollback()
+            self._checkin(key, db) if healthy else db.close()
+
+    def clear(self):
+        with self._lock:
+            sessions = [db for idle in self._idle.values() for db in idle]
+            self._idle.clear()
+        for db in sessions:
+            db.close()
+
+    def _open(self, primary_path: str, attachments: dict):
+        db = sqlite3.connect(_read_only_uri(primary_path), uri=True, check_same_thread=False)
+        try:
+            if len(attachments) > db.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED):
+                raise FederationError(
+                    f"At most {db.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)} connections can be attached to one query."
+                )
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA query_only=ON;")
+            db.execute("PRAGMA temp_store=MEMORY;")
+            for alias, path in attachments.items():
+                db.execute(f'ATTACH DATABASE ? AS "{alias}"', (_read_only_uri(path),))
+                # Touching sqlite_master parses the schema now instead of on the first real query.
+                db.execute(f'SELECT count(*) FROM "{alias}".sqlite_master').fetchone()
+            db.execute("SELECT count(*) FROM main.sqlite_master").fetchone()
+        except Exception:
+            db.close()
+            raise
+        return db
+
+    def _checkout(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if not idle:
+                return None
+            self._idle.move_to_end(key)
+            return idle.pop()
+
+    def _checkin(self, key, db: sqlite3.Connection):
+        evicted = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(idle) < self.idle_sessions:
+                idle.append(db)
+            else:
+                evicted.append(db)
+            while len(self._idle) > self.max_attach_sets:
+                _, sessions = self._idle.popitem(last=False)
+                evicted.extend(sessions)
+        for session in evicted:
+            session.close()
+
+
+federated_pool = FederatedSessionPool()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from time import monotonic
+
+from django.conf import settings
+
+from .pool import sqlite_pool
+
+
+GROUP_COMMIT_STATEMENTS = {"INSERT", "UPDATE", "DELETE", "REPLACE"}
+DEFAULT_GROUP_COMMIT_MAX_BATCH = 128
+
+
+@dataclass
+class PendingWrite:
+    statement: str
+    parameters: tuple | dict = ()
+    queued_at: float = field(default_factory=monotonic)
+    done: threading.Event = field(default_factory=threading.Event)
+    rowcount: int = 0
+    error: Exception | None = None
+    batch_size: int = 0
+    wait_ms: float = 0.0
+
+    def as_dict(self):
+        return {"batch_size": self.batch_size, "wait_ms": self.wait_ms}
+
+
+class GroupCommitter:
+    """Coalesces concurrent writes to one file into a single transaction, one savepoint per caller.
+
+    The first writer to arrive leads the batch: it waits up to the commit window for others to join,
+    runs every statement inside its own savepoint and commits once, so a failing statement is rolled
+    back alone while the rest of the batch shares a single WAL commit. A file whose last batch held a
+    single write skips the window, so a lone writer pays no extra latency. Batches only gather writers
+    in this process; other worker processes commit their own batches against the same write lock.
+    """
+
+    def __init__(self, pool=sqlite_pool):
+        self.pool = pool
+        self._pending = {}
+        self._writers = {}
+        self._last_batch_size = {}
+        self._condition = threading.Condition()
+
+    @property
+    def window_seconds(self):
+        return max(float(getattr(settings, "INFRADB_GROUP_COMMIT_WINDOW_MS", 0)), 0.0) / 1000
+
+    @property
+    def max_batch(self):
+        return int(getattr(settings, "INFRADB_GROUP_COMMIT_MAX_BATCH", DEFAULT_GROUP_COMMIT_MAX_BATCH))
+
+    @property
+    def enabled(self):
+        return self.window_seconds > 0
+
+    def execute(self, file_path: str, statement: str, parameters=()):
+        """Run ``statement`` as part of the next group commit; returns its PendingWrite or raises its error."""
+        key = str(file_path)
+        write = PendingWrite(statement, parameters)
+        with self._condition:
+            batch = self._pending.setdefault(key, [])
+            batch.append(write)
+            leader = len(batch) == 1
+            writer = self._writers.setdefault(key, threading.Lock())
+            if len(batch) >= self.max_batch:
+                self._condition.notify_all()
+
+        if leader:
+            with self._condition:
+                if self._last_batch_size.get(key, 0) > 1:
+                    self._condition.wait_for(lambda: len(batch) >= self.max_batch, timeout=self.window_seconds)
+            # Writes that arrive while an earlier batch is committing keep joining this one.
+            with writer:
+                with self._condition:
+                    self._pending.pop(key, None)
+                    self._last_batch_size[key] = len(batch)
+                self._commit(key, batch)
+        else:
+            write.done.wait()
+
+        if write.error is not None:
+            raise write.error
+        return write
+
+    def _commit(self, key: str, batch):
+        started = monotonic()
+        try:
+            with self.pool.connection(key) as db:
+                isolation_level, db.isolation_level = db.isolation_level, None
+                try:
+                    self._run_batch(db, batch)
+                finally:
+                    db.isolation_level = isolation_level
+        except Exception as exc:
+            # The shared transaction is gone, so statements that had succeeded were not kept either.
+            for write in batch:
+                if write.error is None:
+                    write.error = exc
+        finally:
+            for write in batch:
+                write.batch_size = len(batch)
+                write.wait_ms = round((started - write.queued_at) * 1000, 3)
+                write.done.set()
+
+    def _run_batch(self, db, batch):
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for index, write in enumerate(batch):
+                savepoint = f"infradb_write_{index}"
+                db.execute(f"SAVEPOINT {savepoint}")
+                try:
+                    write.rowcount = max(db.execute(write.statement, write.parameters).rowcount, 0)
+                except sqlite3.Error as exc:
+                    if not db.in_transaction:
+                        raise
+                    db.execute(f"ROLLBACK TO {savepoint}")
+                    write.error = exc
+                db.execute(f"RELEASE {savepoint}")
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+
+
+group_committer = GroupCommitter()
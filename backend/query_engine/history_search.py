@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import re
+
+from django.db import DatabaseError, connection as default_connection
+
+
+SEARCH_TABLE = "query_engine_queryjob_search"
+JOB_TABLE = "query_engine_queryjob"
+# Column weights for bm25(): a hit in the statement outranks one in the error message.
+SEARCH_WEIGHTS = (10.0, 1.0)
+SNIPPET_TOKENS = 16
+MAX_SEARCH_TERMS = 16
+
+# The index stores its own copy of the text keyed by the job's rowid and carries the job id for the
+# join, so results never depend on rowids staying put; a rowid reused after a VACUUM replaces the
+# stale entry instead of failing the job's insert. Underscores stay inside tokens so that
+# ``customer_id`` is one word, and the prefix indexes keep ``"cust"*`` lookups off a full term scan.
+CREATE_SEARCH_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "sql_query, error_message, job_id UNINDEXED, tokenize = \"unicode61 tokenchars '_'\", prefix = '2 3')",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON {JOB_TABLE} BEGIN
+        INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, sql_query, error_message, job_id)
+        VALUES (new.rowid, new.sql_query, coalesce(new.error_message, ''), new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF sql_query, error_message ON {JOB_TABLE}
+    WHEN old.sql_query IS NOT new.sql_query OR old.error_message IS NOT new.error_message BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.rowid AND job_id = old.id;
+        INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, sql_query, error_message, job_id)
+        VALUES (new.rowid, new.sql_query, coalesce(new.error_message, ''), new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON {JOB_TABLE} BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = old.rowid AND job_id = old.id;
+    END""",
+)
+DROP_SEARCH_SQL = (
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_update",
+    f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_delete",
+    f"DROP TABLE IF EXISTS {SEARCH_TABLE}",
+)
+POPULATE_SEARCH_SQL = (
+    f"INSERT INTO {SEARCH_TABLE} (rowid, sql_query, error_message, job_id) "
+    f"SELECT rowid, sql_query, coalesce(error_message, ''), id FROM {JOB_TABLE}"
+)
+
+_TERM_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def search_supported(connection=default_connection):
+    """True when the Django database is SQLite and this build of it has FTS5."""
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # Builds may register FTS5 as a loadable module instead of a compile option.
+        cursor.execute("SELECT count(*) FROM pragma_module_list WHERE name = 'fts5'")
+        return bool(cursor.fetchone()[0])
+
+
+def search_index_ready(connection=default_connection):
+    if connection.vendor != "sqlite":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(connection=default_connection, *, populate=True):
+    if not search_supported(connection):
+        return False
+    with connection.cursor() as cursor:
+        for statement in CREATE_SEARCH_SQL:
+            cursor.execute(statement)
+        if populate:
+            cursor.execute(POPULATE_SEARCH_SQL)
+    return True
+
+
+def drop_search_index(connection=default_connection):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_SEARCH_SQL:
+            cursor.execute(statement)
+
+
+def rebuild_search_index(connection=default_connection):
+    """Re-index every job from scratch, e.g. after a VACUUM renumbered the job table's rowids."""
+    drop_search_index(connection)
+    if not create_search_index(connection):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
+
+
+def fts_words(text: str):
+    return _WORD_PATTERN.findall(text or "")[:MAX_SEARCH_TERMS]
+
+
+def fts_query(text: str):
+    """Turn free text into a safe FTS5 query: quoted phrases stay phrases, bare words match as prefixes.
+
+    Every term is quoted, so operators and punctuation in pasted SQL never reach the FTS5 parser.
+    Returns None when the text holds no words.
+    """
+    terms = []
+    for phrase, word in _TERM_PATTERN.findall(text or ""):
+        words = _WORD_PATTERN.findall(phrase or word)
+        if not words:
+            continue
+        if phrase:
+            terms.append('"' + " ".join(words) + '"')
+        else:
+            terms.extend(f'"{item}"*' for item in words)
+    return " ".join(terms[:MAX_SEARCH_TERMS]) or None
+
+
+def search_jobs(match: str, *, user_id, connection_id=None, status=None, since=None, until=None, limit=50,
+                connection=default_connection):
+    """Ranked ``(job_id, score, snippet)`` rows for an FTS5 ``match`` within the user's filtered jobs.
+
+    ``connection_id`` is the connection's primary key as the database stores it. Lower scores rank
+    higher, as bm25() reports them.
+    """
+    operations = connection.ops
+    weights = ", ".join(str(weight) for weight in SEARCH_WEIGHTS)
+    clauses = [f"{SEARCH_TABLE} MATCH %s", "job.user_id = %s"]
+    params = [match, user_id]
+    if connection_id is not None:
+        clauses.append("job.connection_id = %s")
+        params.append(connection_id)
+    if status is not None:
+        clauses.append("job.status = %s")
+        params.append(status)
+    if since is not None:
+        clauses.append("job.created_at >= %s")
+        params.append(operations.adapt_datetimefield_value(since))
+    if until is not None:
+        clauses.append("job.created_at < %s")
+        params.append(operations.adapt_datetimefield_value(until))
+    sql = (
+        f"SELECT job.id, bm25({SEARCH_TABLE}, {weights}) AS score, "
+        f"snippet({SEARCH_TABLE}, 0, '[', ']', '…', {SNIPPET_TOKENS}) "
+        f"FROM {SEARCH_TABLE} JOIN {JOB_TABLE} AS job ON job.id = {SEARCH_TABLE}.job_id "
+        f"WHERE {' AND '.join(clauses)} ORDER BY score, job.created_at DESC LIMIT %s"
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, limit])
+            return cursor.fetchall()
+    except DatabaseError as exc:
+        raise ValueError(f"History search failed: {exc}") from exc
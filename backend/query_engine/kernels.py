@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import numpy as np
+
+from .engine_client import native_client
+
+
+# dtypes the native kernels accept in place; anything else takes the NumPy path.
+NATIVE_VALUE_DTYPES = {np.dtype(np.int32), np.dtype(np.int64), np.dtype(np.float64)}
+NATIVE_KEY_DTYPES = {np.dtype(np.int32), np.dtype(np.int64)}
+NATIVE_GROUP_VALUE_DTYPES = {np.dtype(np.int64), np.dtype(np.float64)}
+COMPARE_OPERATORS = {
+    "=": np.equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+    "<>": np.not_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+}
+
+
+def native_kernels():
+    """``infradb_core.kernels`` when the native module is importable, else None.
+
+    In sidecar mode the native code stays out of the web worker, so kernels take the NumPy path.
+    """
+    if native_client.mode == "sidecar":
+        return None
+    module = native_client._load_engine()
+    return getattr(module, "kernels", None)
+
+
+def _native(values, dtypes=NATIVE_VALUE_DTYPES, *masks):
+    kernels = native_kernels()
+    if kernels is None or values.dtype not in dtypes or not values.flags.c_contiguous:
+        return None
+    for mask in masks:
+        if mask is not None and (mask.dtype != np.bool_ or not mask.flags.c_contiguous):
+            return None
+    return kernels
+
+
+def _valid(values: np.ndarray, null_mask):
+    valid = np.ones(values.shape, dtype=bool) if null_mask is None else ~null_mask
+    if values.dtype.kind == "f":
+        valid &= ~np.isnan(values)
+    return valid
+
+
+def compare(values: np.ndarray, op: str, operand, null_mask=None):
+    """Positions where ``values <op> operand``; NULLs never match."""
+    if op not in COMPARE_OPERATORS:
+        raise ValueError(f"Unknown comparison operator: {op}")
+    kernels = _native(values, NATIVE_VALUE_DTYPES, null_mask)
+    if kernels is not None:
+        return kernels.compare(values, op, operand, null_mask)
+    matches = COMPARE_OPERATORS[op](values, operand)
+    if null_mask is not None:
+        matches &= ~null_mask
+    return np.flatnonzero(matches)
+
+
+def between(values: np.ndarray, low, high, null_mask=None):
+    """Positions where ``low <= values <= high``; NULLs never match."""
+    kernels = _native(values, NATIVE_VALUE_DTYPES, null_mask)
+    if kernels is not None:
+        return kernels.between(values, low, high, null_mask)
+    matches = (values >= low) & (values <= high)
+    if null_mask is not None:
+        matches &= ~null_mask
+    return np.flatnonzero(matches)
+
+
+def in_list(values: np.ndarray, members, null_mask=None):
+    """Positions whose value is one of ``members``; NULLs never match."""
+    # A member that does not survive conversion to the column's dtype (2.5 against integers, or
+    # out of its range) cannot equal any value, so it is dropped rather than wrapped or truncated
+    # into a false match. Members go one by one: NumPy would widen the whole list to uint64 or object.
+    members = np.array(_representable(members, values.dtype), dtype=values.dtype)
+    kernels = _native(values, NATIVE_VALUE_DTYPES, null_mask)
+    if kernels is not None:
+        return kernels.in_list(values, np.ascontiguousarray(members), null_mask)
+    matches = np.isin(values, members)
+    if null_mask is not None:
+        matches &= ~null_mask
+    return np.flatnonzero(matches)
+
+
+def _representable(members, dtype: np.dtype):
+    kept = []
+    for member in members:
+        try:
+            converted = dtype.type(member)
+        except (OverflowError, TypeError, ValueError):
+            continue
+        if converted == member:
+            kept.append(converted)
+    return kept
+
+
+def compact(values: np.ndarray, selection: np.ndarray, null_mask=None):
+    """Values (and their null flags, when a mask is given) at the selected positions."""
+    selection = np.asarray(selection, dtype=np.int64)
+    kernels = _native(values, NATIVE_VALUE_DTYPES, null_mask)
+    if kernels is not None and selection.flags.c_contiguous:
+        return kernels.compact(values, selection, null_mask)
+    return values[selection], None if null_mask is None else null_mask[selection]
+
+
+def group_by(keys: np.ndarray, values: np.ndarray, key_nulls=None, value_nulls=None):
+    """COUNT(*), COUNT/SUM/MIN/MAX of ``values`` per key, groups in order of first appearance.
+
+    NULL keys form one group of their own, flagged in ``key_is_null``; NULL values are left out
+    of the value aggregates, and a group with no values has NaN for its MIN and MAX.
+    """
+    if keys.shape != values.shape:
+        raise ValueError("keys and values must have the same length")
+    kernels = _native(keys, NATIVE_KEY_DTYPES, key_nulls, value_nulls)
+    if kernels is not None and values.dtype in NATIVE_GROUP_VALUE_DTYPES and values.flags.c_contiguous:
+        return kernels.group_by(keys, values, key_nulls, value_nulls)
+
+    null_keys = np.zeros(keys.shape, dtype=bool) if key_nulls is None else np.asarray(key_nulls, dtype=bool)
+    # Null keys share a sentinel slot placed by where the first one appears.
+    labels = np.empty(keys.shape, dtype=np.int64)
+    uniques, first_seen, inverse = np.unique(keys[~null_keys], return_index=True, return_inverse=True)
+    first_seen = np.flatnonzero(~null_keys)[first_seen]
+    labels[~null_keys] = inverse
+    if null_keys.any():
+        labels[null_keys] = uniques.size
+        first_seen = np.append(first_seen, np.flatnonzero(null_keys)[0])
+    order = np.argsort(first_seen, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+    labels = rank[labels]
+    groups = order.size
+
+    present = np.ones(values.shape, dtype=bool) if value_nulls is None else ~np.asarray(value_nulls, dtype=bool)
+    numeric = values.astype(np.float64)
+    mins = np.full(groups, np.inf)
+    maxs = np.full(groups, -np.inf)
+    np.minimum.at(mins, labels[present], numeric[present])
+    np.maximum.at(maxs, labels[present], numeric[present])
+    value_counts = np.bincount(labels[present], minlength=groups).astype(np.int64)
+    mins[value_counts == 0] = np.nan
+    maxs[value_counts == 0] = np.nan
+    return {
+        "key_is_null": np.arange(groups) == (rank[uniques.size] if null_keys.any() else -1),
+        "keys": np.append(uniques, keys.dtype.type(0))[order] if null_keys.any() else uniques[order],
+        "row_counts": np.bincount(labels, minlength=groups).astype(np.int64),
+        "value_counts": value_counts,
+        "sums": np.bincount(labels[present], weights=numeric[present], minlength=groups),
+        "mins": mins,
+        "maxs": maxs,
+    }
+
+
+def top_k(values: np.ndarray, k: int, *, largest: bool = True, null_mask=None):
+    """Positions of the ``k`` largest (or smallest) non-NULL values, best first; ties keep row order."""
+    kernels = _native(values, NATIVE_VALUE_DTYPES, null_mask)
+    if kernels is not None:
+        return kernels.top_k(values, k, largest, null_mask)
+    candidates = np.flatnonzero(_valid(values, null_mask))
+    ranked = values[candidates]
+    if not largest:
+        # A stable sort leaves equal values in row order.
+        return candidates[np.argsort(ranked, kind="stable")[:k]]
+    # Negating would overflow INT64_MIN, so sort the reversed array ascending and read it backwards:
+    # the values come out largest first with ties back in row order.
+    order = ranked.size - 1 - np.argsort(ranked[::-1], kind="stable")[::-1]
+    return candidates[order[:k]]
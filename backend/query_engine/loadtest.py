@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import sqlite3
+from contextlib import closing
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import monotonic, perf_counter_ns
+from urllib.parse import urlsplit
+
+
+LOAD_TEST_ENDPOINTS = ("read", "write", "explain", "schema", "history")
+DEFAULT_MIX = {"read": 60, "write": 10, "explain": 10, "schema": 10, "history": 10}
+REPORTED_PERCENTILES = (50, 90, 95, 99, 99.9)
+# Each power-of-two range of microseconds is split into this many linear steps (under 1% error).
+HISTOGRAM_SUB_BUCKETS = 128
+FIXTURE_STATUSES = ("new", "paid", "shipped", "refunded")
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of microsecond latencies with sparse buckets and constant-time record()."""
+
+    _half = HISTOGRAM_SUB_BUCKETS // 2
+    _shift = HISTOGRAM_SUB_BUCKETS.bit_length() - 1
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum_us = 0
+        self.max_us = 0
+
+    def record(self, value_us: int):
+        value_us = max(int(value_us), 0)
+        index = self._index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum_us += value_us
+        self.max_us = max(self.max_us, value_us)
+
+    def merge(self, other: "LatencyHistogram"):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, percent: float):
+        if not self.total:
+            return None
+        threshold = self.total * percent / 100
+        running = 0
+        for index in sorted(self.counts):
+            running += self.counts[index]
+            if running >= threshold:
+                return min(self._upper(index), self.max_us)
+        return self.max_us
+
+    def as_dict(self):
+        return {
+            "count": self.total,
+            "mean_ms": round(self.sum_us / self.total / 1000, 3) if self.total else None,
+            "max_ms": round(self.max_us / 1000, 3),
+            **{f"p{percent:g}_ms": _ms(self.percentile(percent)) for percent in REPORTED_PERCENTILES},
+            # Upper bound in microseconds and count per occupied bucket, enough to merge or re-derive percentiles.
+            "buckets": [[self._upper(index), self.counts[index]] for index in sorted(self.counts)],
+        }
+
+    def _index(self, value_us: int):
+        magnitude = max(value_us.bit_length() - self._shift, 0)
+        return magnitude * self._half + (value_us >> magnitude)
+
+    def _upper(self, index: int):
+        magnitude = max((index - self._half) // self._half, 0)
+        return ((index - magnitude * self._half + 1) << magnitude) - 1
+
+
+def _ms(value_us):
+    return None if value_us is None else round(value_us / 1000, 3)
+
+
+@dataclass
+class EndpointStats:
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    requests: int = 0
+    errors: int = 0
+    rejected: int = 0
+    status_codes: dict = field(default_factory=dict)
+    response_bytes: int = 0
+
+    def as_dict(self, elapsed_s: float):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0.0,
+            "throughput_rps": round(self.requests / elapsed_s, 2) if elapsed_s else 0.0,
+            "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+            "response_bytes": self.response_bytes,
+            "latency": self.histogram.as_dict(),
+        }
+
+
+def parse_mix(text: str | None):
+    """``read=60,write=10`` -> weights per endpoint; endpoints left out get no traffic."""
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip().lower()
+        if name not in LOAD_TEST_ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; expected one of {', '.join(LOAD_TEST_ENDPOINTS)}.")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("The workload mix needs at least one endpoint with a positive weight.")
+    return mix
+
+
+def build_fixture(path: Path, rows: int, *, seed: int = 7):
+    """Create (or reuse) a SQLite file with ``rows`` orders spread over customers, indexed like a console app."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(path)) as db:
+        existing = db.execute("SELECT name FROM sqlite_master WHERE name = 'orders'").fetchone()
+        if existing and db.execute("SELECT COUNT(*) FROM orders").fetchone()[0] >= rows:
+            return path
+        generator = random.Random(seed)
+        customers = max(rows // 20, 1)
+        db.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            DROP TABLE IF EXISTS orders;
+            DROP TABLE IF EXISTS customers;
+            DROP TABLE IF EXISTS load_events;
+            CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT NOT NULL, region TEXT NOT NULL);
+            CREATE TABLE orders (
+                id INTEGER PRIMARY KEY,
+                customer_id INTEGER NOT NULL REFERENCES customers(id),
+                amount REAL NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            );
+            CREATE INDEX orders_customer ON orders(customer_id);
+            CREATE TABLE load_events (id INTEGER PRIMARY KEY, worker INTEGER NOT NULL, payload TEXT NOT NULL);
+            """
+        )
+        with db:
+            db.executemany(
+                "INSERT INTO customers VALUES (?, ?, ?)",
+                ((index, f"customer {index}", f"region-{index % 8}") for index in range(1, customers + 1)),
+            )
+            db.executemany(
+                "INSERT INTO orders VALUES (?, ?, ?, ?, ?)",
+                (
+                    (
+                        index,
+                        generator.randint(1, customers),
+                        round(generator.uniform(1, 500), 2),
+                        generator.choice(FIXTURE_STATUSES),
+                        f"2024-{generator.randint(1, 12):02d}-{generator.randint(1, 28):02d}",
+                    )
+                    for index in range(1, rows + 1)
+                ),
+            )
+    return path
+
+
+class WorkloadGenerator:
+    """Random statements against the fixture; reads return up to ``result_rows`` rows."""
+
+    def __init__(self, rows: int, result_rows: int, seed: int | None = None):
+        self.rows = rows
+        self.customers = max(rows // 20, 1)
+        self.result_rows = result_rows
+        self.random = random.Random(seed)
+
+    def read(self):
+        choice = self.random.randrange(3)
+        if choice == 0:
+            customer = self.random.randint(1, self.customers)
+            return f"SELECT * FROM orders WHERE customer_id = {customer} LIMIT {self.result_rows}"
+        if choice == 1:
+            start = self.random.randint(1, max(self.rows - self.result_rows, 1))
+            return (
+                "SELECT o.id, o.amount, c.name FROM orders o JOIN customers c ON c.id = o.customer_id "
+                f"WHERE o.id >= {start} ORDER BY o.id LIMIT {self.result_rows}"
+            )
+        status = self.random.choice(FIXTURE_STATUSES)
+        return f"SELECT created_at, COUNT(*), SUM(amount) FROM orders WHERE status = '{status}' GROUP BY created_at"
+
+    def write(self, worker: int):
+        return f"INSERT INTO load_events (worker, payload) VALUES ({worker}, 'load-{self.random.getrandbits(32):08x}')"
+
+
+class HttpSession:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams, so the harness needs nothing beyond the stdlib."""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method: str, path: str, body=None):
+        """Returns (status, body bytes); reconnects once if the server dropped an idle keep-alive connection."""
+        payload = json.dumps(body).encode() if body is not None else b""
+        for attempt in range(2):
+            reused = self._writer is not None
+            try:
+                return await asyncio.wait_for(self._send(method, path, payload), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if not reused or attempt:
+                    raise
+            except BaseException:
+                await self.close()
+                raise
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self._reader = self._writer = None
+
+    async def _send(self, method: str, path: str, payload: bytes):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        head = [
+            f"{method} {self.prefix}{path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Accept: application/json",
+            "Connection: keep-alive",
+        ]
+        if payload:
+            head += ["Content-Type: application/json", f"Content-Length: {len(payload)}"]
+        self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + payload)
+        await self._writer.drain()
+
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await self._reader.readuntil(b"\r\n")) != b"\r\n":
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while size := int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16):
+                body += await self._reader.readexactly(size)
+                await self._reader.readexactly(2)
+            await self._reader.readuntil(b"\r\n")
+        elif "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self._reader.read()
+            headers["connection"] = "close"
+        if headers.get("connection", "").lower() == "close" or status_line.startswith(b"HTTP/1.0"):
+            await self.close()
+        return status, bytes(body)
+
+
+@dataclass
+class LoadTestConfig:
+    base_url: str
+    connection_id: str
+    users: int = 8
+    duration_s: float = 30.0
+    warmup_s: float = 2.0
+    mix: dict = field(default_factory=lambda: dict(DEFAULT_MIX))
+    rows: int = 100_000
+    result_rows: int = 100
+    timeout_s: float = 30.0
+    think_time_ms: float = 0.0
+    seed: int | None = None
+
+
+class LoadTestRunner:
+    """Closed-loop virtual users replaying the weighted mix; samples taken during warm-up are discarded."""
+
+    def __init__(self, config: LoadTestConfig):
+        self.config = config
+        self.stats = {name: EndpointStats() for name in config.mix if config.mix[name] > 0}
+        self._names = list(self.stats)
+        self._weights = [config.mix[name] for name in self._names]
+
+    def run(self):
+        return asyncio.run(self._run())
+
+    async def _run(self):
+        started = monotonic()
+        self._measure_from = started + self.config.warmup_s
+        self._stop_at = self._measure_from + self.config.duration_s
+        await asyncio.gather(*(self._user(worker) for worker in range(self.config.users)))
+        elapsed = max(monotonic() - self._measure_from, 0.0)
+        return self.report(elapsed)
+
+    def report(self, elapsed_s: float):
+        total = EndpointStats()
+        for stats in self.stats.values():
+            total.histogram.merge(stats.histogram)
+            total.requests += stats.requests
+            total.errors += stats.errors
+            total.rejected += stats.rejected
+            total.response_bytes += stats.response_bytes
+            for code, count in stats.status_codes.items():
+                total.status_codes[code] = total.status_codes.get(code, 0) + count
+        config = {key: value for key, value in vars(self.config).items()}
+        return {
+            "config": config,
+            "elapsed_s": round(elapsed_s, 3),
+            "endpoints": {name: stats.as_dict(elapsed_s) for name, stats in self.stats.items()},
+            "total": total.as_dict(elapsed_s),
+        }
+
+    async def _user(self, worker: int):
+        seed = None if self.config.seed is None else self.config.seed + worker
+        workload = WorkloadGenerator(self.config.rows, self.config.result_rows, seed)
+        session = HttpSession(self.config.base_url, self.config.timeout_s)
+        try:
+            while monotonic() < self._stop_at:
+                name = workload.random.choices(self._names, self._weights)[0]
+                method, path, body = self._request(name, workload, worker)
+                started_ns = perf_counter_ns()
+                try:
+                    status, payload = await session.request(method, path, body)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    status, payload = 0, b""
+                elapsed_us = (perf_counter_ns() - started_ns) // 1000
+                if monotonic() >= self._measure_from:
+                    self._record(name, status, elapsed_us, len(payload))
+                if self.config.think_time_ms:
+                    await asyncio.sleep(self.config.think_time_ms / 1000)
+        finally:
+            await session.close()
+
+    def _request(self, name: str, workload: WorkloadGenerator, worker: int):
+        connection_id = self.config.connection_id
+        if name == "read":
+            return "POST", "/api/v1/query/jobs/run/", {"connection_id": connection_id, "sql": workload.read()}
+        if name == "write":
+            return "POST", "/api/v1/query/jobs/run/", {"connection_id": connection_id, "sql": workload.write(worker)}
+        if name == "explain":
+            return "POST", "/api/v1/query/jobs/explain/", {"connection_id": connection_id, "sql": workload.read()}
+        if name == "schema":
+            return "GET", f"/api/v1/databases/connections/{connection_id}/schema/", None
+        return "GET", "/api/v1/query/jobs/history/?limit=50", None
+
+    def _record(self, name: str, status: int, elapsed_us: int, size: int):
+        stats = self.stats[name]
+        stats.requests += 1
+        stats.status_codes[status] = stats.status_codes.get(status, 0) + 1
+        stats.response_bytes += size
+        if status == 429:
+            stats.rejected += 1
+        if status == 0 or status >= 400:
+            stats.errors += 1
+        else:
+            stats.histogram.record(elapsed_us)
+
+
+def compare_reports(report: dict, baseline: dict, max_regression: float):
+    """Endpoints whose p99 or throughput moved past ``max_regression`` (a fraction) against the baseline."""
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        before, after = previous["latency"].get("p99_ms"), current["latency"].get("p99_ms")
+        if before and after and after > before * (1 + max_regression):
+            regressions.append(f"{name}: p99 {before}ms -> {after}ms")
+        before, after = previous["throughput_rps"], current["throughput_rps"]
+        if before and after < before * (1 - max_regression):
+            regressions.append(f"{name}: throughput {before}/s -> {after}/s")
+        if current["error_rate"] > previous["error_rate"] + max_regression:
+            regressions.append(f"{name}: error rate {previous['error_rate']} -> {current['error_rate']}")
+    return regressions
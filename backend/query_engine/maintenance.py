@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from time import monotonic, perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from databases.models import DatabaseConnection
+
+from .admission import admission_controller
+from .models import MaintenanceRun
+from .tracing import span
+
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_ACTIONS = ("checkpoint", "incremental_vacuum", "optimize")
+DEFAULT_MAINTENANCE_INTERVAL_SECONDS = 60
+DEFAULT_MAINTENANCE_IDLE_SECONDS = 2.0
+DEFAULT_MAINTENANCE_BUDGET_MS = 250
+
+CHECKPOINT_WAL_BYTES = 4 * 1024 * 1024
+FREELIST_RATIO = 0.10
+VACUUM_PAGES_PER_STEP = 256
+OPTIMIZE_INTERVAL_SECONDS = 6 * 60 * 60
+# Rows ANALYZE samples per index under PRAGMA optimize, which keeps it to milliseconds on large tables.
+OPTIMIZE_ANALYSIS_LIMIT = 400
+# How long a maintenance statement waits on a foreground lock before giving up.
+MAINTENANCE_BUSY_TIMEOUT_SECONDS = 0.05
+RECENT_RUNS = 20
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+@dataclass
+class FileHealth:
+    file_bytes: int
+    wal_bytes: int
+    page_size: int
+    page_count: int
+    freelist_count: int
+    auto_vacuum: str
+    journal_mode: str
+    analyzed_tables: int
+
+    @property
+    def freelist_ratio(self):
+        return self.freelist_count / self.page_count if self.page_count else 0.0
+
+    def as_dict(self):
+        return {**asdict(self), "freelist_ratio": round(self.freelist_ratio, 4)}
+
+
+@dataclass
+class FileObservation:
+    """What the scheduler last saw of a file, used to tell written files from idle ones."""
+
+    version: str
+    seen_at: float
+    wal_bytes: int
+    write_rate_bytes_s: float = 0.0
+    modified_since_optimize: bool = True
+    optimized_at: float | None = None
+
+
+def _file_version(db_path: Path):
+    parts = []
+    for path in (db_path, db_path.with_name(f"{db_path.name}-wal")):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            parts.append("0-0")
+        else:
+            parts.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+    return ":".join(parts)
+
+
+def inspect_database(db: sqlite3.Connection, db_path: Path):
+    wal_path = db_path.with_name(f"{db_path.name}-wal")
+    analyzed = db.execute(
+        "SELECT count(DISTINCT tbl) FROM sqlite_stat1"
+        if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+        else "SELECT 0"
+    ).fetchone()[0]
+    return FileHealth(
+        file_bytes=db_path.stat().st_size,
+        wal_bytes=wal_path.stat().st_size if wal_path.exists() else 0,
+        page_size=db.execute("PRAGMA page_size").fetchone()[0],
+        page_count=db.execute("PRAGMA page_count").fetchone()[0],
+        freelist_count=db.execute("PRAGMA freelist_count").fetchone()[0],
+        auto_vacuum=AUTO_VACUUM_MODES.get(db.execute("PRAGMA auto_vacuum").fetchone()[0], "none"),
+        journal_mode=db.execute("PRAGMA journal_mode").fetchone()[0].lower(),
+        analyzed_tables=analyzed,
+    )
+
+
+class MaintenanceScheduler:
+    """Checkpoints, vacuums and re-analyzes SQLite files while no statements are running.
+
+    Each pass visits the active connections, decides from WAL size, freelist ratio and whether the
+    file was written since the last pass which actions are due, and runs them within a small time
+    budget on its own connection, stopping as soon as a foreground statement shows up.
+    """
+
+    def __init__(self, controller=admission_controller):
+        self.admission_controller = controller
+        self._observations = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._leader_lock = None
+        self.last_pass = None
+
+    @property
+    def interval(self):
+        return float(getattr(settings, "INFRADB_MAINTENANCE_INTERVAL_SECONDS", DEFAULT_MAINTENANCE_INTERVAL_SECONDS))
+
+    @property
+    def idle_seconds(self):
+        return float(getattr(settings, "INFRADB_MAINTENANCE_IDLE_SECONDS", DEFAULT_MAINTENANCE_IDLE_SECONDS))
+
+    @property
+    def budget_ms(self):
+        return float(getattr(settings, "INFRADB_MAINTENANCE_BUDGET_MS", DEFAULT_MAINTENANCE_BUDGET_MS))
+
+    @property
+    def lock_path(self):
+        return Path(
+            getattr(settings, "INFRADB_MAINTENANCE_LOCK_FILE", Path(tempfile.gettempdir()) / "infradb" / "maintenance.lock")
+        )
+
+    @property
+    def leader(self):
+        return self._leader_lock is not None
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def start(self):
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="infradb-maintenance", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def run_pass(self):
+        """Visit every active SQLite connection once, as long as the server stays idle."""
+        started = timezone.now()
+        visited, runs = 0, 0
+        seen_files = set()
+        queryset = DatabaseConnection.objects.filter(is_active=True, engine="SQLITE").order_by("updated_at")
+        for connection in queryset:
+            if not self._idle():
+                break
+            db_path = Path(connection.file_path or "")
+            if str(db_path) in seen_files or not db_path.is_file():
+                continue
+            seen_files.add(str(db_path))
+            visited += 1
+            try:
+                runs += len(self.maintain(connection=connection)["runs"])
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning("Maintenance skipped for %s: %s", connection.pk, exc)
+        self.last_pass = {
+            "started_at": started.isoformat(),
+            "duration_ms": round((timezone.now() - started).total_seconds() * 1000, 3),
+            "connections": visited,
+            "runs": runs,
+        }
+        return self.last_pass
+
+    def maintain(self, *, connection: DatabaseConnection, actions=None):
+        """Run the due actions (or exactly ``actions``, when given) against one connection's file."""
+        if connection.engine != "SQLITE":
+            raise ValueError(f"Maintenance is not configured for {connection.engine}.")
+        unknown = set(actions or ()) - set(MAINTENANCE_ACTIONS)
+        if unknown:
+            raise ValueError(f"Unknown maintenance action: {', '.join(sorted(unknown))}")
+
+        db_path = Path(connection.file_path)
+        if not db_path.is_file():
+            raise FileNotFoundError(f"SQLite database not found: {db_path}")
+        forced = actions is not None
+        deadline = monotonic() + self.budget_ms / 1000
+        runs = []
+        with closing(self._connect(db_path)) as db:
+            health = inspect_database(db, db_path)
+            observation = self._observe(db_path, health)
+            if forced:
+                plan = [(action, "requested") for action in MAINTENANCE_ACTIONS if action in actions]
+            else:
+                plan = self._plan(health, observation)
+            for action, reason in plan:
+                if monotonic() >= deadline or not (forced or self._idle()):
+                    break
+                run = self._run(connection, db, db_path, action, reason, health, deadline, yield_to_foreground=not forced)
+                runs.append(run)
+                health = inspect_database(db, db_path)
+                if action == "optimize" and run.status != "FAILED":
+                    observation.modified_since_optimize = False
+                    observation.optimized_at = monotonic()
+            # The actions' own writes are not foreground modifications.
+            observation.version = _file_version(db_path)
+            observation.wal_bytes = health.wal_bytes
+        return {
+            "connection_id": str(connection.id),
+            "health": health.as_dict(),
+            "runs": [self.serialize(run) for run in runs],
+        }
+
+    def status(self, *, connection: DatabaseConnection):
+        db_path = Path(connection.file_path)
+        if not db_path.is_file():
+            raise FileNotFoundError(f"SQLite database not found: {db_path}")
+        with closing(self._connect(db_path)) as db:
+            health = inspect_database(db, db_path)
+        with self._lock:
+            observation = self._observations.get(str(db_path))
+        return {
+            "connection_id": str(connection.id),
+            "health": health.as_dict(),
+            "write_rate_bytes_s": round(observation.write_rate_bytes_s, 1) if observation else None,
+            "due": [action for action, _ in self._plan(health, observation)] if observation else [],
+            "scheduler": {
+                "enabled": self.enabled,
+                "leader": self.leader,
+                "interval_seconds": self.interval,
+                "budget_ms": self.budget_ms,
+                "last_pass": self.last_pass,
+            },
+            "runs": [self.serialize(run) for run in connection.maintenance_runs.all()[:RECENT_RUNS]],
+        }
+
+    def serialize(self, run: MaintenanceRun):
+        return {
+            "id": run.pk,
+            "action": run.action,
+            "status": run.status,
+            "reason": run.reason,
+            "duration_ms": run.duration_ms,
+            "before": run.before,
+            "after": run.after,
+            "effect": self._effect(run.before, run.after),
+            "detail": run.detail,
+            "error": run.error_message,
+            "created_at": run.created_at.isoformat() if run.created_at else None,
+        }
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            # Every worker process starts a scheduler; only the one holding the host lock runs passes,
+            # and another takes over when that process exits and the lock is released with it.
+            if not self._lead():
+                continue
+            try:
+                self.run_pass()
+            except Exception:
+                logger.exception("Maintenance pass failed")
+            finally:
+                connections.close_all()
+
+    def _lead(self):
+        if self._leader_lock is not None:
+            return True
+        try:
+            self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+            handle = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as exc:
+            logger.warning("Maintenance lock unavailable: %s", exc)
+            return False
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(handle)
+            return False
+        self._leader_lock = handle
+        return True
+
+    def _idle(self):
+        # Statements running in the host's other workers count too, not just this process's.
+        return self.admission_controller.host_idle_seconds() >= self.idle_seconds
+
+    def _connect(self, db_path: Path):
+        # Autocommit, so each PRAGMA runs in a transaction of its own and holds locks only briefly.
+        return sqlite3.connect(db_path, timeout=MAINTENANCE_BUSY_TIMEOUT_SECONDS, isolation_level=None)
+
+    def _observe(self, db_path: Path, health: FileHealth):
+        key = str(db_path)
+        version = _file_version(db_path)
+        now = monotonic()
+        with self._lock:
+            observation = self._observations.get(key)
+            if observation is None:
+                observation = self._observations[key] = FileObservation(version, now, health.wal_bytes)
+                return observation
+            if version != observation.version:
+                observation.modified_since_optimize = True
+                elapsed = now - observation.seen_at
+                growth = max(health.wal_bytes - observation.wal_bytes, 0)
+                observation.write_rate_bytes_s = growth / elapsed if elapsed > 0 else 0.0
+            else:
+                observation.write_rate_bytes_s = 0.0
+            observation.version, observation.seen_at, observation.wal_bytes = version, now, health.wal_bytes
+            return observation
+
+    def _plan(self, health: FileHealth, observation: FileObservation):
+        plan = []
+        if health.journal_mode == "wal" and health.wal_bytes >= CHECKPOINT_WAL_BYTES:
+            plan.append(("checkpoint", f"WAL is {health.wal_bytes / 1_048_576:.1f} MB"))
+        if health.auto_vacuum == "incremental" and health.freelist_ratio >= FREELIST_RATIO:
+            plan.append(("incremental_vacuum", f"{health.freelist_ratio:.0%} of pages are free"))
+        optimize_due = observation.optimized_at is None or monotonic() - observation.optimized_at >= OPTIMIZE_INTERVAL_SECONDS
+        if observation.modified_since_optimize and optimize_due:
+            plan.append(("optimize", "written since the last optimize"))
+        return plan
+
+    def _run(self, connection, db, db_path, action, reason, health, deadline, *, yield_to_foreground=True):
+        started = perf_counter()
+        status, detail, error = "COMPLETED", {}, None
+        try:
+            with span("maintenance", action=action):
+                if action == "checkpoint":
+                    status, detail = self._checkpoint(db)
+                elif action == "incremental_vacuum":
+                    status, detail = self._incremental_vacuum(db, deadline, yield_to_foreground)
+                else:
+                    status, detail = self._optimize(db, deadline)
+        except sqlite3.Error as exc:
+            status, error = "FAILED", str(exc)
+        duration_ms = round((perf_counter() - started) * 1000, 3)
+        after = health if status == "FAILED" else inspect_database(db, db_path)
+        return MaintenanceRun.objects.create(
+            connection=connection,
+            action=action.upper(),
+            status=status,
+            reason=reason,
+            before=health.as_dict(),
+            after=after.as_dict(),
+            detail=detail,
+            duration_ms=duration_ms,
+            error_message=error,
+        )
+
+    def _checkpoint(self, db):
+        # PASSIVE copies what it can without waiting on anyone, so the TRUNCATE that follows only
+        # has the tail left to copy while it holds the write lock.
+        passive = db.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        busy, wal_frames, checkpointed = db.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        detail = {"passive_frames": passive[2], "wal_frames": wal_frames, "checkpointed_frames": checkpointed, "busy": bool(busy)}
+        # A reader still on an old snapshot keeps the WAL from being reset; the next pass retries.
+        return ("PARTIAL" if busy else "COMPLETED"), detail
+
+    def _incremental_vacuum(self, db, deadline, yield_to_foreground):
+        freed = 0
+        while db.execute("PRAGMA freelist_count").fetchone()[0]:
+            if monotonic() >= deadline or (yield_to_foreground and not self._idle()):
+                return "PARTIAL", {"pages_freed": freed}
+            before = db.execute("PRAGMA page_count").fetchone()[0]
+            db.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})").fetchall()
+            freed += before - db.execute("PRAGMA page_count").fetchone()[0]
+        return "COMPLETED", {"pages_freed": freed}
+
+    def _optimize(self, db, deadline):
+        db.execute(f"PRAGMA analysis_limit={OPTIMIZE_ANALYSIS_LIMIT}")
+        db.set_progress_handler(lambda: int(monotonic() >= deadline), 1000)
+        analyzed = []
+        try:
+            if sqlite3.sqlite_version_info >= (3, 46, 0):
+                # 0x10000 checks every table rather than only those this connection has queried.
+                db.execute("PRAGMA optimize=0x10002").fetchall()
+            else:
+                # Older libraries only consider tables queried on this connection, which is none of
+                # them here, so indexed tables that have never been analyzed are analyzed directly.
+                for table in self._unanalyzed_tables(db):
+                    db.execute(f'ANALYZE "{table.replace(chr(34), chr(34) * 2)}"')
+                    analyzed.append(table)
+                db.execute("PRAGMA optimize").fetchall()
+        except sqlite3.OperationalError as exc:
+            if "interrupt" not in str(exc):
+                raise
+            return "PARTIAL", {"interrupted": True, "analyzed": analyzed}
+        finally:
+            db.set_progress_handler(None, 0)
+        return "COMPLETED", {"analysis_limit": OPTIMIZE_ANALYSIS_LIMIT, "analyzed": analyzed}
+
+    @staticmethod
+    def _unanalyzed_tables(db):
+        indexed = {
+            row[0]
+            for row in db.execute(
+                "SELECT DISTINCT tbl_name FROM sqlite_master WHERE type = 'index' AND tbl_name NOT LIKE 'sqlite_%'"
+            )
+        }
+        if db.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+            indexed -= {row[0] for row in db.execute("SELECT DISTINCT tbl FROM sqlite_stat1")}
+        return sorted(indexed)
+
+    @staticmethod
+    def _effect(before: dict, after: dict):
+        return {
+            key: after[key] - before[key]
+            for key in ("file_bytes", "wal_bytes", "page_count", "freelist_count", "analyzed_tables")
+            if key in before and key in after
+        }
+
+
+maintenance_scheduler = MaintenanceScheduler()
@@ -0,0 +1,70 @@
+import math
+import sqlite3
+from contextlib import closing
+from time import perf_counter_ns
+
+from django.core.management.base import BaseCommand, CommandError
+
+from query_engine.approximate import ApproximateQueryEngine, ApproximationUnsupported, plan_aggregate
+from query_engine.parallel import MAX_PARALLELISM, ParallelScanExecutor
+
+
+class Command(BaseCommand):
+    help = "Time a single-table aggregate serially and at increasing degrees of parallelism."
+
+    def add_arguments(self, parser):
+        parser.add_argument("file", help="Path to the SQLite database.")
+        parser.add_argument("sql", help="Single-table COUNT/SUM/MIN/MAX/AVG query, optionally grouped.")
+        parser.add_argument("--max-parallelism", type=int, default=MAX_PARALLELISM)
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per setting; the best time is reported.")
+
+    def handle(self, *args, **options):
+        try:
+            plan = plan_aggregate(options["sql"], extrema=True)
+        except ApproximationUnsupported as exc:
+            raise CommandError(str(exc)) from exc
+
+        with closing(sqlite3.connect(options["file"])) as db:
+            low, high = ApproximateQueryEngine().population(db, plan)
+            serial_ms, expected = self._best(options["repeat"], lambda: db.execute(options["sql"]).fetchall())
+        self.stdout.write(f"rowid range {low}..{high}; {MAX_PARALLELISM} CPU(s) available")
+        self.stdout.write(f"{'mode':>10} {'best ms':>10} {'speedup':>8} {'efficiency':>10}  matches")
+        self.stdout.write(f"{'sqlite':>10} {serial_ms:>10.1f} {1.0:>8.2f} {1.0:>10.2f}  -")
+
+        max_parallelism = max(options["max_parallelism"], 1)
+        executor = ParallelScanExecutor(max_workers=max_parallelism)
+        levels = sorted({2**power for power in range(int(math.log2(max_parallelism)) + 1)} | {max_parallelism})
+        try:
+            # Warm the pool so worker start-up is not billed to the first level.
+            executor.execute(options["file"], plan, low, high, max_parallelism)
+            for level in levels:
+                elapsed_ms, (rows, _) = self._best(
+                    options["repeat"], lambda: executor.execute(options["file"], plan, low, high, level)
+                )
+                speedup = serial_ms / elapsed_ms
+                matches = self._matches([tuple(row.values()) for row in rows], expected)
+                self.stdout.write(
+                    f"{f'dop={level}':>10} {elapsed_ms:>10.1f} {speedup:>8.2f} {speedup / level:>10.2f}  {matches}"
+                )
+        finally:
+            executor.shutdown()
+
+    def _best(self, repeat, func):
+        best_ms, result = math.inf, None
+        for _ in range(max(repeat, 1)):
+            started_ns = perf_counter_ns()
+            result = func()
+            best_ms = min(best_ms, (perf_counter_ns() - started_ns) / 1_000_000)
+        return best_ms, result
+
+    def _matches(self, rows, expected):
+        if len(rows) != len(expected):
+            return False
+        for row, reference in zip(rows, expected):
+            for value, wanted in zip(row, reference):
+                if isinstance(value, float) and isinstance(wanted, float):
+                    if not math.isclose(value, wanted, rel_tol=1e-9, abs_tol=1e-9):
+                        return False
+                elif value != wanted:
+                    return False
+        return True
@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from databases.models import DatabaseConnection
+from databases.views import bootstrap
+from query_engine.loadtest import LoadTestConfig, LoadTestRunner, build_fixture, compare_reports, parse_mix
+
+
+class Command(BaseCommand):
+    help = "Replay a mixed console workload against a running server and report per-endpoint latency and throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the server under test.")
+        parser.add_argument("--users", type=int, default=8, help="Concurrent virtual users.")
+        parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds, after warm-up.")
+        parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of traffic excluded from the report.")
+        parser.add_argument(
+            "--mix", default="", help="Endpoint weights, e.g. read=60,write=10,explain=10,schema=10,history=10."
+        )
+        parser.add_argument("--rows", type=int, default=100_000, help="Rows in the generated orders fixture.")
+        parser.add_argument("--result-rows", type=int, default=100, help="LIMIT applied to read statements.")
+        parser.add_argument("--think-time-ms", type=float, default=0.0, help="Pause between a user's requests.")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds.")
+        parser.add_argument("--seed", type=int, default=None, help="Seed for a repeatable request sequence.")
+        parser.add_argument("--connection", help="Use this existing connection id instead of the generated fixture.")
+        parser.add_argument(
+            "--fixture-dir",
+            default=str(Path(settings.BASE_DIR) / "user_databases" / "loadtest"),
+            help="Where generated fixtures are written; the server must share this database and filesystem.",
+        )
+        parser.add_argument("--output", default="loadtest-report.json", help="Where the JSON report is written.")
+        parser.add_argument("--baseline", help="Earlier report to compare against; regressions fail the command.")
+        parser.add_argument(
+            "--max-regression", type=float, default=0.2, help="Allowed fractional change against the baseline."
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        if options["users"] < 1 or options["duration"] <= 0:
+            raise CommandError("--users and --duration must be positive.")
+
+        connection_id = options["connection"] or self._register_fixture(options)
+        config = LoadTestConfig(
+            base_url=options["url"],
+            connection_id=connection_id,
+            users=options["users"],
+            duration_s=options["duration"],
+            warmup_s=max(options["warmup"], 0.0),
+            mix=mix,
+            rows=options["rows"],
+            result_rows=max(options["result_rows"], 1),
+            timeout_s=options["timeout"],
+            think_time_ms=max(options["think_time_ms"], 0.0),
+            seed=options["seed"],
+        )
+        self.stdout.write(
+            f"{config.users} users for {config.duration_s:g}s (+{config.warmup_s:g}s warm-up) against {config.base_url}"
+        )
+        report = LoadTestRunner(config).run()
+
+        Path(options["output"]).write_text(json.dumps(report, indent=2))
+        self._print(report)
+        self.stdout.write(f"Report written to {options['output']}")
+
+        if options["baseline"]:
+            baseline = json.loads(Path(options["baseline"]).read_text())
+            regressions = compare_reports(report, baseline, options["max_regression"])
+            if regressions:
+                raise CommandError("Regressed against the baseline: " + "; ".join(regressions))
+            self.stdout.write(f"Within {options['max_regression']:.0%} of {options['baseline']}.")
+
+    def _register_fixture(self, options):
+        """Generate the fixture file and point a SQLite connection in the console workspace at it."""
+        rows = options["rows"]
+        path = Path(options["fixture_dir"]).resolve() / f"orders_{rows}.sqlite3"
+        self.stdout.write(f"Preparing fixture {path}")
+        build_fixture(path, rows)
+
+        workspace = bootstrap.ensure_default_workspace(bootstrap.get_actor())
+        connection, _ = DatabaseConnection.objects.update_or_create(
+            workspace=workspace,
+            name=f"Load test ({rows} rows)",
+            defaults={"engine": "SQLITE", "database_name": path.name, "file_path": str(path)},
+        )
+        return str(connection.pk)
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{'endpoint':>10} {'requests':>9} {'rps':>8} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+        )
+        rows = list(report["endpoints"].items()) + [("total", report["total"])]
+        for name, stats in rows:
+            latency = stats["latency"]
+            self.stdout.write(
+                f"{name:>10} {stats['requests']:>9} {stats['throughput_rps']:>8} {stats['errors']:>7} "
+                f"{latency['p50_ms'] or '-':>9} {latency['p99_ms'] or '-':>9} {latency['max_ms']:>9}"
+            )
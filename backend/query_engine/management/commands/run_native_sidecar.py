@@ -0,0 +1,40 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from query_engine.engine_client import NativeEngineClient
+from query_engine.native_sidecar import DEFAULT_SIDECAR_SOCKET, NativeSidecarServer, socket_in_use
+
+
+class Command(BaseCommand):
+    help = "Host the native engine in one process per machine and serve scans to workers over a Unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=getattr(settings, "INFRADB_NATIVE_SIDECAR_SOCKET", DEFAULT_SIDECAR_SOCKET),
+            help="Path of the Unix socket to listen on.",
+        )
+
+    def handle(self, *args, **options):
+        socket_path = options["socket"]
+        if os.path.exists(socket_path):
+            if socket_in_use(socket_path):
+                raise CommandError(f"A sidecar is already listening on {socket_path}.")
+            # Left behind by a sidecar that did not shut down cleanly.
+            os.unlink(socket_path)
+
+        client = NativeEngineClient(mode="inprocess")
+        detail = client.load()
+        if not detail["available"]:
+            self.stderr.write("infradb_core could not be imported; scans will report the engine as unavailable.")
+
+        server = NativeSidecarServer(socket_path, client)
+        self.stdout.write(f"Native sidecar {os.getpid()} listening on {socket_path} ({detail})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from dataclasses import dataclass, field
+
+from .approximate import ApproximationUnsupported, plan_aggregate
+from .sql_analysis import tokenize
+
+
+MATERIALIZED_TABLE_PREFIX = "infradb_mv_"
+VIEW_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,63}$")
+INCREMENTAL_AGGREGATES = {"count", "sum", "total"}
+NONDETERMINISTIC_FUNCTIONS = {"RANDOM", "RANDOMBLOB", "CHANGES", "TOTAL_CHANGES", "LAST_INSERT_ROWID"}
+TIME_KEYWORDS = {"CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP"}
+ROWID_ALIASES = {"rowid", "oid", "_rowid_"}
+ROW_COUNT_COLUMN = "__rows"
+TRIGGER_SUFFIXES = ("insert", "delete", "update")
+
+
+class MaterializedViewError(Exception):
+    pass
+
+
+@dataclass
+class ViewPlan:
+    table_name: str
+    definition: str
+    strategy: str
+    read_sql: str
+    source_table: str = ""
+    reason: str | None = None
+    create_statements: list = field(default_factory=list)
+    populate_statements: list = field(default_factory=list)
+    trigger_statements: list = field(default_factory=list)
+
+
+def materialized_table_name(name: str):
+    if not VIEW_NAME_PATTERN.match(name or ""):
+        raise MaterializedViewError("View names must be identifiers of at most 64 characters.")
+    return f"{MATERIALIZED_TABLE_PREFIX}{name.lower()}"
+
+
+def _quote(name: str):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class MaterializedViewManager:
+    """Builds view tables in a SQLite file; SUM/COUNT groupings are kept current by triggers."""
+
+    def plan(self, db: sqlite3.Connection, sql: str, table_name: str):
+        definition = sql.strip().rstrip(";").strip()
+        tokens = tokenize(definition)
+        if not tokens or not tokens[0].is_keyword("SELECT", "WITH"):
+            raise MaterializedViewError("Materialized views must be defined by a SELECT statement.")
+        if any(token.kind == "param" for token in tokens):
+            raise MaterializedViewError("Materialized view definitions cannot contain bound parameters.")
+
+        try:
+            return self._incremental_plan(db, definition, table_name)
+        except (ApproximationUnsupported, MaterializedViewError) as exc:
+            return ViewPlan(
+                table_name=table_name,
+                definition=definition,
+                strategy="FULL",
+                read_sql=f"SELECT * FROM {_quote(table_name)} ORDER BY rowid",
+                reason=str(exc),
+                create_statements=[f"CREATE TABLE {_quote(table_name)} AS {definition}"],
+                populate_statements=[f"DELETE FROM {_quote(table_name)}", f"INSERT INTO {_quote(table_name)} {definition}"],
+            )
+
+    def create(self, db: sqlite3.Connection, plan: ViewPlan):
+        exists = db.execute("SELECT 1 FROM sqlite_master WHERE name=?", (plan.table_name,)).fetchone()
+        if exists:
+            raise MaterializedViewError(f"{plan.table_name} already exists in this database.")
+
+        with db:
+            for statement in plan.create_statements:
+                db.execute(statement)
+            if plan.strategy == "INCREMENTAL":
+                for statement in plan.populate_statements + plan.trigger_statements:
+                    db.execute(statement)
+        return self._row_count(db, plan)
+
+    def refresh(self, db: sqlite3.Connection, plan: ViewPlan):
+        # One transaction: readers in WAL mode keep seeing the previous contents until commit.
+        with db:
+            for statement in plan.populate_statements:
+                db.execute(statement)
+        return self._row_count(db, plan)
+
+    def drop(self, db: sqlite3.Connection, table_name: str):
+        with db:
+            for suffix in TRIGGER_SUFFIXES:
+                db.execute(f"DROP TRIGGER IF EXISTS {_quote(f'{table_name}__{suffix}')}")
+            db.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+
+    def _row_count(self, db: sqlite3.Connection, plan: ViewPlan):
+        return db.execute(f"SELECT count(*) FROM {_quote(plan.table_name)}").fetchone()[0]
+
+    def _incremental_plan(self, db: sqlite3.Connection, definition: str, table_name: str):
+        if any(token.is_keyword("FILTER") for token in tokenize(definition)):
+            raise MaterializedViewError("Aggregate FILTER clauses are refreshed in full.")
+        aggregate = plan_aggregate(definition)
+
+        source = db.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type='table' AND name=? COLLATE NOCASE", (aggregate.table,)
+        ).fetchone()
+        if source is None:
+            raise MaterializedViewError(f"{aggregate.table} is not a base table.")
+        source_table, source_ddl = source
+        columns = {row[1].lower(): row[1] for row in db.execute(f"PRAGMA table_info({_quote(source_table)})")}
+        columns.update({alias: alias for alias in ROWID_ALIASES if alias not in columns})
+
+        for item in aggregate.aggregates:
+            if item.kind not in INCREMENTAL_AGGREGATES:
+                raise MaterializedViewError(f"{item.kind.upper()} cannot be maintained from row deltas.")
+        keys = []
+        for expression in aggregate.group_by:
+            key_tokens = tokenize(expression)
+            if len(key_tokens) != 1 or key_tokens[0].kind != "identifier" or key_tokens[0].value.lower() not in columns:
+                raise MaterializedViewError("Only plain column GROUP BY keys are maintained incrementally.")
+            matches = [item for item in aggregate.items if item.kind == "group" and item.expression == expression]
+            if not matches:
+                raise MaterializedViewError(f"GROUP BY key {expression} must be selected.")
+            keys.append((matches[0].name, expression))
+        if keys and "COLLATE" in (source_ddl or "").upper():
+            # Triggers match groups with binary IS comparisons, which would split collated keys.
+            raise MaterializedViewError("Tables with collated columns are refreshed in full.")
+
+        names = [item.name for item in aggregate.items]
+        if len({name.lower() for name in names}) != len(names):
+            raise MaterializedViewError("Selected column names must be unique.")
+
+        bind = _RowBinder(aggregate.alias, source_table, columns)
+        sums = [item for item in aggregate.aggregates if item.kind == "sum"]
+        nonnull = {item.name: f"__nonnull_{position}" for position, item in enumerate(sums, start=1)}
+        hidden = [ROW_COUNT_COLUMN] + list(nonnull.values())
+
+        # Groups first seen by a trigger start from these defaults, the values of an empty aggregate.
+        defaults = {"count": " DEFAULT 0", "total": " DEFAULT 0.0"}
+        column_defs = [_quote(item.name) + defaults.get(item.kind, "") for item in aggregate.items]
+        column_defs += [f"{_quote(name)} INTEGER NOT NULL DEFAULT 0" for name in hidden]
+        create_statements = [f"CREATE TABLE {_quote(table_name)} ({', '.join(column_defs)})"]
+        if keys:
+            key_list = ", ".join(_quote(name) for name, _ in keys)
+            create_statements.append(f"CREATE INDEX {_quote(f'{table_name}__keys')} ON {_quote(table_name)} ({key_list})")
+
+        alias = f" AS {aggregate.alias}" if aggregate.alias else ""
+        where = f" WHERE {aggregate.where}" if aggregate.where else ""
+        group = f" GROUP BY {', '.join(aggregate.group_by)}" if aggregate.group_by else ""
+        select_list = [item.expression for item in aggregate.items] + ["count(*)"]
+        select_list += [f"count({item.argument})" for item in sums]
+        insert_columns = ", ".join(_quote(name) for name in names + hidden)
+        populate_statements = [
+            f"DELETE FROM {_quote(table_name)}",
+            f"INSERT INTO {_quote(table_name)} ({insert_columns}) "
+            f"SELECT {', '.join(select_list)} FROM {_quote(source_table)}{alias}{where}{group}",
+        ]
+
+        bodies = {}
+        for row, sign in (("NEW", "+"), ("OLD", "-")):
+            bodies[row] = self._trigger_body(table_name, aggregate, keys, nonnull, bind, row, sign)
+
+        trigger_statements = [
+            f"CREATE TRIGGER {_quote(f'{table_name}__insert')} AFTER INSERT ON {_quote(source_table)} "
+            f"BEGIN {bodies['NEW']} END",
+            f"CREATE TRIGGER {_quote(f'{table_name}__delete')} AFTER DELETE ON {_quote(source_table)} "
+            f"BEGIN {bodies['OLD']} END",
+        ]
+        if bind.referenced:
+            # Only updates touching a key, an aggregate argument or the filter can move a row between groups.
+            watched = "" if bind.referenced & ROWID_ALIASES else f" OF {', '.join(_quote(name) for name in sorted(bind.referenced))}"
+            trigger_statements.append(
+                f"CREATE TRIGGER {_quote(f'{table_name}__update')} AFTER UPDATE{watched} ON {_quote(source_table)} "
+                f"BEGIN {bodies['OLD']} {bodies['NEW']} END"
+            )
+
+        read_sql = f"SELECT {', '.join(_quote(name) for name in names)} FROM {_quote(table_name)}"
+        if keys:
+            read_sql += f" ORDER BY {', '.join(_quote(name) for name, _ in keys)}"
+
+        return ViewPlan(
+            table_name=table_name,
+            definition=definition,
+            strategy="INCREMENTAL",
+            read_sql=read_sql,
+            source_table=source_table,
+            create_statements=create_statements,
+            populate_statements=populate_statements,
+            trigger_statements=trigger_statements,
+        )
+
+    def _trigger_body(self, table_name, aggregate, keys, nonnull, bind, row, sign):
+        view = _quote(table_name)
+        condition = f"({bind(aggregate.where, row)})" if aggregate.where else "1"
+        match = " AND ".join([f"{_quote(name)} IS {bind(expression, row)}" for name, expression in keys] + [condition])
+
+        assignments = [f"{_quote(ROW_COUNT_COLUMN)} = {_quote(ROW_COUNT_COLUMN)} {sign} 1"]
+        for item in aggregate.aggregates:
+            column = _quote(item.name)
+            argument = bind(item.argument, row) if item.argument else None
+            if item.kind == "count":
+                delta = f"({argument} IS NOT NULL)" if argument else "1"
+                assignments.append(f"{column} = {column} {sign} {delta}")
+            elif item.kind == "total":
+                assignments.append(f"{column} = {column} {sign} coalesce({argument}, 0.0)")
+            else:
+                # SUM stays NULL until the group holds a non-NULL value, matching SQLite's own SUM.
+                counter = _quote(nonnull[item.name])
+                present = f"({argument} IS NOT NULL)"
+                assignments.append(
+                    f"{column} = CASE WHEN {counter} {sign} {present} > 0 "
+                    f"THEN coalesce({column}, 0) {sign} coalesce({argument}, 0) END"
+                )
+                assignments.append(f"{counter} = {counter} {sign} {present}")
+
+        statements = []
+        if keys and sign == "+":
+            key_values = ", ".join(bind(expression, row) for _, expression in keys)
+            key_columns = ", ".join(_quote(name) for name, _ in keys)
+            statements.append(
+                f"INSERT INTO {view} ({key_columns}) SELECT {key_values} "
+                f"WHERE {condition} AND NOT EXISTS (SELECT 1 FROM {view} WHERE {match});"
+            )
+        statements.append(f"UPDATE {view} SET {', '.join(assignments)} WHERE {match};")
+        if keys and sign == "-":
+            statements.append(f"DELETE FROM {view} WHERE {match} AND {_quote(ROW_COUNT_COLUMN)} = 0;")
+        return " ".join(statements)
+
+
+class _RowBinder:
+    """Rewrites column references in an expression to NEW./OLD. references for trigger bodies."""
+
+    def __init__(self, alias: str | None, table: str, columns: dict):
+        self.qualifiers = {table.lower()} | ({alias.lower()} if alias else set())
+        self.columns = columns
+        self.referenced = set()
+
+    def __call__(self, expression: str, row: str):
+        tokens = tokenize(expression)
+        parts = []
+        for index, token in enumerate(tokens):
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+            previous = tokens[index - 1] if index else None
+            if token.is_keyword(*TIME_KEYWORDS) or (token.kind == "string" and token.value.lower() == "'now'"):
+                raise MaterializedViewError("Time-dependent filters are refreshed in full.")
+            if token.kind == "identifier" and following is not None and following.value == "(":
+                if token.upper in NONDETERMINISTIC_FUNCTIONS:
+                    raise MaterializedViewError(f"{token.upper}() is not deterministic.")
+                parts.append(expression[token.start : token.end])
+            elif token.kind == "identifier" and following is not None and following.value == ".":
+                if token.value.lower() not in self.qualifiers:
+                    raise MaterializedViewError(f"Unknown table reference {token.value}.")
+            elif token.value == "." and previous is not None and previous.value.lower() in self.qualifiers:
+                continue
+            elif token.kind == "identifier" and not (previous is not None and previous.is_keyword("AS", "COLLATE")):
+                column = self.columns.get(token.value.lower())
+                if column is None:
+                    raise MaterializedViewError(f"Unknown column {token.value}.")
+                self.referenced.add(column)
+                parts.append(f"{row}.{_quote(column)}")
+            else:
+                parts.append(expression[token.start : token.end])
+        return " ".join(parts)
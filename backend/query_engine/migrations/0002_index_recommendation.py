@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("databases", "0001_initial"),
+        ("query_engine", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexRecommendation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("table_name", models.CharField(max_length=255)),
+                ("index_name", models.CharField(max_length=255)),
+                ("columns", models.JSONField(default=list)),
+                ("statement", models.TextField()),
+                ("supporting_calls", models.IntegerField(default=0)),
+                ("workload_time_ms", models.FloatField(default=0)),
+                ("estimated_saving_ms", models.FloatField(default=0)),
+                ("estimated_write_cost_ms", models.FloatField(default=0)),
+                ("score", models.FloatField(default=0)),
+                ("sample_sql", models.TextField(blank=True, default="")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "Pending"),
+                            ("APPLIED", "Applied"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="PENDING",
+                        max_length=20,
+                    ),
+                ),
+                ("build_time_ms", models.FloatField(blank=True, null=True)),
+                ("error_message", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("applied_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "connection",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="index_recommendations",
+                        to="databases.databaseconnection",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-score"],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("databases", "0001_initial"),
+        ("query_engine", "0002_index_recommendation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MaterializedView",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=255)),
+                ("table_name", models.CharField(max_length=255)),
+                ("definition", models.TextField()),
+                ("canonical_sql", models.TextField()),
+                (
+                    "source_table",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("read_sql", models.TextField()),
+                (
+                    "strategy",
+                    models.CharField(
+                        choices=[
+                            ("INCREMENTAL", "Incremental"),
+                            ("FULL", "Full refresh"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("refresh_interval_seconds", models.IntegerField(default=300)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("ACTIVE", "Active"),
+                            ("STALE", "Stale"),
+                            ("FAILED", "Failed"),
+                        ],
+                        default="ACTIVE",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "data_version",
+                    models.CharField(blank=True, default="", max_length=128),
+                ),
+                ("row_count", models.BigIntegerField(blank=True, null=True)),
+                ("refresh_time_ms", models.FloatField(blank=True, null=True)),
+                ("error_message", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("refreshed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "connection",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="materialized_views",
+                        to="databases.databaseconnection",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+                "unique_together": {("connection", "name")},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("query_engine", "0003_materialized_view"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="queryjob",
+            name="admission",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("ADMITTED", "Admitted immediately"),
+                    ("QUEUED", "Admitted after queueing"),
+                    ("REJECTED", "Rejected"),
+                ],
+                default="",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="queryjob",
+            name="priority",
+            field=models.CharField(
+                choices=[("interactive", "Interactive"), ("batch", "Batch")],
+                default="interactive",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="queryjob",
+            name="queue_time_ms",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("databases", "0002_databaseconnection_updated_at"),
+        ("query_engine", "0004_query_job_admission"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatementStatistics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint_id", models.CharField(max_length=32)),
+                ("fingerprint", models.TextField()),
+                ("query_type", models.CharField(blank=True, default="", max_length=20)),
+                ("sample_sql", models.TextField(blank=True, default="")),
+                ("calls", models.BigIntegerField(default=0)),
+                ("errors", models.BigIntegerField(default=0)),
+                ("total_time_ms", models.FloatField(default=0)),
+                ("min_time_ms", models.FloatField(blank=True, null=True)),
+                ("max_time_ms", models.FloatField(blank=True, null=True)),
+                ("latency_histogram", models.JSONField(default=list)),
+                ("rows", models.BigIntegerField(default=0)),
+                ("cache_hits", models.BigIntegerField(default=0)),
+                ("first_seen", models.DateTimeField(auto_now_add=True)),
+                ("last_seen", models.DateTimeField(blank=True, null=True)),
+                (
+                    "connection",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="statement_statistics",
+                        to="databases.databaseconnection",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-total_time_ms"],
+                "unique_together": {("connection", "fingerprint_id")},
+            },
+        ),
+    ]
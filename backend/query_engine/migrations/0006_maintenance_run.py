@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('databases', '0002_databaseconnection_updated_at'),
+        ('query_engine', '0005_statement_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MaintenanceRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('CHECKPOINT', 'WAL checkpoint'), ('OPTIMIZE', 'PRAGMA optimize'), ('INCREMENTAL_VACUUM', 'Incremental vacuum')], max_length=20)),
+                ('status', models.CharField(choices=[('COMPLETED', 'Completed'), ('PARTIAL', 'Stopped early'), ('FAILED', 'Failed')], max_length=20)),
+                ('reason', models.CharField(blank=True, default='', max_length=255)),
+                ('before', models.JSONField(default=dict)),
+                ('after', models.JSONField(default=dict)),
+                ('detail', models.JSONField(default=dict)),
+                ('duration_ms', models.FloatField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('connection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='maintenance_runs', to='databases.databaseconnection')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('query_engine', '0006_maintenance_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queryjob',
+            name='parameters',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
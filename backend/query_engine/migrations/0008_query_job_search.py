@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from query_engine.history_search import create_search_index, drop_search_index
+
+
+def create_index(apps, schema_editor):
+    # Other database backends, or SQLite builds without FTS5, fall back to a filtered scan.
+    create_search_index(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('query_engine', '0007_query_job_parameters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
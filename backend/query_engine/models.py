@@ -11,11 +11,22 @@ class QueryJob(models.Model):
         ('FAILED', 'Failed'),
         ('CANCELLED', 'Cancelled'),
     ]
+    PRIORITY_CHOICES = [
+        ('interactive', 'Interactive'),
+        ('batch', 'Batch'),
+    ]
+    ADMISSION_CHOICES = [
+        ('ADMITTED', 'Admitted immediately'),
+        ('QUEUED', 'Admitted after queueing'),
+        ('REJECTED', 'Rejected'),
+    ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     connection = models.ForeignKey(DatabaseConnection, on_delete=models.CASCADE)
     sql_query = models.TextField()
+    # Values bound to the statement's placeholders: a list, an object of named values, or a batch's list of either.
+    parameters = models.JSONField(null=True, blank=True)
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     
@@ -25,6 +36,11 @@ class QueryJob(models.Model):
     data_scanned_bytes = models.BigIntegerField(null=True, blank=True)
     
     error_message = models.TextField(null=True, blank=True)
+
+    # Admission control
+    priority = models.CharField(max_length=20, choices=PRIORITY_CHOICES, default='interactive')
+    admission = models.CharField(max_length=20, choices=ADMISSION_CHOICES, blank=True, default='')
+    queue_time_ms = models.FloatField(null=True, blank=True)
     
     # Results can be stored in S3/Object storage and referenced here
     results_path = models.CharField(max_length=512, null=True, blank=True)
@@ -35,3 +51,135 @@ class QueryJob(models.Model):
 
     def __str__(self):
         return f"Job {self.id} - {self.status}"
+
+class IndexRecommendation(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('APPLIED', 'Applied'),
+        ('FAILED', 'Failed'),
+    ]
+
+    connection = models.ForeignKey(DatabaseConnection, on_delete=models.CASCADE, related_name='index_recommendations')
+    table_name = models.CharField(max_length=255)
+    index_name = models.CharField(max_length=255)
+    columns = models.JSONField(default=list)
+    statement = models.TextField()
+
+    # Workload evidence mined from QueryJob history
+    supporting_calls = models.IntegerField(default=0)
+    workload_time_ms = models.FloatField(default=0)
+    estimated_saving_ms = models.FloatField(default=0)
+    estimated_write_cost_ms = models.FloatField(default=0)
+    score = models.FloatField(default=0)
+    sample_sql = models.TextField(blank=True, default='')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    build_time_ms = models.FloatField(null=True, blank=True)
+    error_message = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-score']
+
+    def __str__(self):
+        return f"{self.table_name}({', '.join(self.columns)}) - {self.status}"
+
+class MaterializedView(models.Model):
+    STRATEGY_CHOICES = [
+        ('INCREMENTAL', 'Incremental'),
+        ('FULL', 'Full refresh'),
+    ]
+    STATUS_CHOICES = [
+        ('ACTIVE', 'Active'),
+        ('STALE', 'Stale'),
+        ('FAILED', 'Failed'),
+    ]
+
+    connection = models.ForeignKey(DatabaseConnection, on_delete=models.CASCADE, related_name='materialized_views')
+    name = models.CharField(max_length=255)
+    table_name = models.CharField(max_length=255)
+    definition = models.TextField()
+    # Canonical token form of the definition; reads with the same form are served from table_name.
+    canonical_sql = models.TextField()
+    source_table = models.CharField(max_length=255, blank=True, default='')
+    read_sql = models.TextField()
+
+    strategy = models.CharField(max_length=20, choices=STRATEGY_CHOICES)
+    refresh_interval_seconds = models.IntegerField(default=300)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
+    # File version recorded after the last full refresh; any later write makes a FULL view stale.
+    data_version = models.CharField(max_length=128, blank=True, default='')
+    row_count = models.BigIntegerField(null=True, blank=True)
+    refresh_time_ms = models.FloatField(null=True, blank=True)
+    error_message = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('connection', 'name')
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.strategy}) - {self.status}"
+
+class StatementStatistics(models.Model):
+    connection = models.ForeignKey(DatabaseConnection, on_delete=models.CASCADE, related_name='statement_statistics')
+    # Literal-free statement text and its hash; every variant differing only in constants shares a row.
+    fingerprint_id = models.CharField(max_length=32)
+    fingerprint = models.TextField()
+    query_type = models.CharField(max_length=20, blank=True, default='')
+    sample_sql = models.TextField(blank=True, default='')
+
+    calls = models.BigIntegerField(default=0)
+    errors = models.BigIntegerField(default=0)
+    total_time_ms = models.FloatField(default=0)
+    min_time_ms = models.FloatField(null=True, blank=True)
+    max_time_ms = models.FloatField(null=True, blank=True)
+    # Call counts per latency bucket (see statement_stats.LATENCY_BUCKETS_MS), used for percentiles.
+    latency_histogram = models.JSONField(default=list)
+    rows = models.BigIntegerField(default=0)
+    cache_hits = models.BigIntegerField(default=0)
+
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('connection', 'fingerprint_id')
+        ordering = ['-total_time_ms']
+
+    def __str__(self):
+        return f"{self.fingerprint[:60]} ({self.calls} calls)"
+
+class MaintenanceRun(models.Model):
+    ACTION_CHOICES = [
+        ('CHECKPOINT', 'WAL checkpoint'),
+        ('OPTIMIZE', 'PRAGMA optimize'),
+        ('INCREMENTAL_VACUUM', 'Incremental vacuum'),
+    ]
+    STATUS_CHOICES = [
+        ('COMPLETED', 'Completed'),
+        ('PARTIAL', 'Stopped early'),
+        ('FAILED', 'Failed'),
+    ]
+
+    connection = models.ForeignKey(DatabaseConnection, on_delete=models.CASCADE, related_name='maintenance_runs')
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    reason = models.CharField(max_length=255, blank=True, default='')
+    # File health (WAL and file size, page and freelist counts) measured just before and after the action.
+    before = models.JSONField(default=dict)
+    after = models.JSONField(default=dict)
+    detail = models.JSONField(default=dict)
+    duration_ms = models.FloatField(null=True, blank=True)
+    error_message = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.action} on {self.connection_id} - {self.status}"
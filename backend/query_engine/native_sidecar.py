@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import uuid
+from dataclasses import dataclass, field
+from multiprocessing import resource_tracker, shared_memory
+from time import monotonic, perf_counter
+
+
+DEFAULT_SIDECAR_SOCKET = "/tmp/infradb-native.sock"
+SIDECAR_TIMEOUT_SECONDS = 30.0
+# After a failed call, further calls fail fast for this long instead of each waiting on a dead socket.
+SIDECAR_RETRY_SECONDS = 5.0
+# Result segments are unlinked this long after publication; callers map them well within it.
+SEGMENT_TTL_SECONDS = 10.0
+SEGMENT_PREFIX = "infradb_"
+MAX_MESSAGE_BYTES = 1 << 20
+
+_HEADER = struct.Struct("!I")
+
+
+class SidecarUnavailable(Exception):
+    pass
+
+
+def send_message(sock, payload: dict):
+    body = json.dumps(payload).encode()
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def recv_message(sock):
+    """Read one length-prefixed JSON message; None when the peer closed the connection first."""
+    header = _recv_exactly(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Sidecar message of {length} bytes exceeds the {MAX_MESSAGE_BYTES} byte limit.")
+    body = _recv_exactly(sock, length)
+    if body is None:
+        return None
+    return json.loads(body)
+
+
+def _recv_exactly(sock, size: int):
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = sock.recv(size - len(chunks))
+        if not chunk:
+            return None
+        chunks += chunk
+    return bytes(chunks)
+
+
+def _untrack(segment):
+    # Ownership is handed across processes, so the tracker must not unlink it when this one exits.
+    resource_tracker.unregister(segment._name, "shared_memory")
+
+
+class SharedBatch:
+    """A scan result mapped from the sidecar's shared-memory segment; ``buffer`` views it without copying."""
+
+    def __init__(self, row_count: int, segment=None, size: int = 0):
+        self.row_count = row_count
+        self.size = size
+        self._segment = segment
+
+    @classmethod
+    def attach(cls, reply: dict):
+        name, size = reply.get("segment"), reply.get("segment_bytes", 0)
+        if not name or not size:
+            return cls(reply["row_count"])
+        segment = shared_memory.SharedMemory(name=name)
+        _untrack(segment)
+        return cls(reply["row_count"], segment, size)
+
+    @property
+    def buffer(self):
+        if self._segment is None:
+            return memoryview(b"")
+        return self._segment.buf[: self.size]
+
+    def close(self):
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SidecarClient:
+    """Talks to the per-host sidecar over its Unix socket, one short-lived connection per call."""
+
+    def __init__(self, socket_path: str, timeout: float = SIDECAR_TIMEOUT_SECONDS):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._down_until = 0.0
+        self._last_error = ""
+
+    def request(self, op: str, **fields):
+        if monotonic() < self._down_until:
+            raise SidecarUnavailable(self._last_error)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                send_message(sock, {"op": op, **fields})
+                reply = recv_message(sock)
+            if reply is None:
+                raise ConnectionError("the sidecar closed the connection without replying")
+        except (OSError, ValueError) as exc:
+            self._last_error = f"Native sidecar at {self.socket_path} is unavailable: {exc}"
+            self._down_until = monotonic() + SIDECAR_RETRY_SECONDS
+            raise SidecarUnavailable(self._last_error) from exc
+        self._down_until = 0.0
+        return reply
+
+    def ping(self):
+        return self.request("ping")
+
+    def scan(self, file_path: str):
+        """Returns the reply and the batch it points at; the caller closes the batch when done with it."""
+        reply = self.request("scan", file_path=file_path)
+        if not reply.get("ok"):
+            return reply, None
+        return reply, SharedBatch.attach(reply)
+
+
+@dataclass
+class InFlightScan:
+    done: threading.Event = field(default_factory=threading.Event)
+    reply: dict | None = None
+
+
+class NativeSidecarServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Hosts the one native engine for every worker on the host and hands results back in shared memory.
+
+    Concurrent scans of the same file run once and every caller gets the same segment. Segments are
+    owned here and unlinked after SEGMENT_TTL_SECONDS; callers that mapped them keep their mapping.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, client, segment_ttl: float = SEGMENT_TTL_SECONDS):
+        self.client = client
+        self.segment_ttl = segment_ttl
+        self.started_at = monotonic()
+        self.counters = {"requests": 0, "scans": 0, "shared_scans": 0, "errors": 0}
+        self._segments = []
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        super().__init__(socket_path, _SidecarHandler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        self._reap(everything=True)
+        try:
+            os.unlink(self.server_address)
+        except FileNotFoundError:
+            pass
+
+    def handle_request_message(self, request: dict):
+        with self._lock:
+            self.counters["requests"] += 1
+        self._reap()
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, **self.describe()}
+        if op == "scan" and request.get("file_path"):
+            return self._scan(str(request["file_path"]))
+        return {"ok": False, "error": f"Unknown sidecar request: {op!r}"}
+
+    def describe(self):
+        with self._lock:
+            segments = len(self._segments)
+            counters = dict(self.counters)
+        return {
+            "available": self.client._shared_engine() is not None,
+            "pid": os.getpid(),
+            "uptime_s": round(monotonic() - self.started_at, 3),
+            "segments": segments,
+            **counters,
+            **self.client.timings,
+        }
+
+    def _scan(self, file_path: str):
+        with self._lock:
+            flight = self._in_flight.get(file_path)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[file_path] = InFlightScan()
+                self.counters["scans"] += 1
+            else:
+                self.counters["shared_scans"] += 1
+        if not leader:
+            flight.done.wait()
+            return flight.reply or {"ok": False, "available": True, "error": "The shared scan did not finish."}
+
+        try:
+            flight.reply = self._run_scan(file_path)
+        finally:
+            with self._lock:
+                del self._in_flight[file_path]
+            flight.done.set()
+        return flight.reply
+
+    def _run_scan(self, file_path: str):
+        engine = self.client._shared_engine()
+        if engine is None:
+            return {"ok": False, "available": False, "error": "infradb_core is not importable in the sidecar."}
+        started = perf_counter()
+        try:
+            batch = engine.execute_optimized_scan(file_path)
+        except Exception as exc:
+            with self._lock:
+                self.counters["errors"] += 1
+            return {"ok": False, "available": True, "error": str(exc)}
+        reply = {
+            "ok": True,
+            "row_count": batch.row_count,
+            "scan_duration_ms": round((perf_counter() - started) * 1000, 3),
+        }
+        reply.update(self._publish(batch))
+        return reply
+
+    def _publish(self, batch):
+        """Copy the batch's column buffer, when the binding exposes one, into a fresh shared segment."""
+        try:
+            view = memoryview(batch).cast("B")
+        except TypeError:
+            return {}
+        if not view.nbytes:
+            return {}
+        segment = shared_memory.SharedMemory(
+            name=f"{SEGMENT_PREFIX}{uuid.uuid4().hex[:16]}", create=True, size=view.nbytes
+        )
+        segment.buf[: view.nbytes] = view
+        with self._lock:
+            self._segments.append((monotonic(), segment))
+        return {"segment": segment.name, "segment_bytes": view.nbytes}
+
+    def _reap(self, everything: bool = False):
+        cutoff = monotonic() - self.segment_ttl
+        with self._lock:
+            expired = [segment for created, segment in self._segments if everything or created < cutoff]
+            self._segments = [item for item in self._segments if item[1] not in expired]
+        for segment in expired:
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                _untrack(segment)
+
+
+class _SidecarHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (OSError, ValueError):
+                return
+            if request is None:
+                return
+            try:
+                reply = self.server.handle_request_message(request)
+            except Exception as exc:
+                reply = {"ok": False, "error": str(exc)}
+            try:
+                send_message(self.request, reply)
+            except OSError:
+                return
+
+
+def socket_in_use(socket_path: str):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            return False
+    return True
@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from time import perf_counter, perf_counter_ns
+
+from databases.models import DatabaseConnection
+
+from .services import QueryExecutionError, QueryExecutionService
+from .snapshots import SnapshotError, point_in_time_copy
+from .sql_analysis import StatementShape, extract_shape
+
+
+SCAN_PATTERN = re.compile(r"^SCAN (?:TABLE )?(?P<table>[^\s(]+)(?: AS (?P<alias>\S+))?(?P<rest>.*)$")
+TEMP_BTREE_PATTERN = re.compile(r"USE TEMP B-TREE FOR (?P<purpose>.+)$")
+CORRELATED_PATTERN = re.compile(r"^CORRELATED (?P<kind>SCALAR|LIST) SUBQUERY")
+
+VERIFY_MAX_DATABASE_BYTES = 512 * 1024 * 1024
+VERIFY_TIME_BUDGET_SECONDS = 5.0
+VERIFY_REPEAT = 3
+
+
+@dataclass(frozen=True)
+class PlanFinding:
+    kind: str
+    detail: str
+    table: str | None = None
+    purpose: str | None = None
+
+
+@dataclass(frozen=True)
+class IndexSuggestion:
+    table: str
+    columns: tuple
+    reason: str
+    source: str = "full_scan"
+
+    @property
+    def name(self):
+        return "idx_" + "_".join((self.table, *self.columns))
+
+    @property
+    def statement(self):
+        columns = ", ".join(f'"{column}"' for column in self.columns)
+        return f'CREATE INDEX IF NOT EXISTS "{self.name}" ON "{self.table}" ({columns});'
+
+    def as_dict(self):
+        return {
+            "kind": "index",
+            "table": self.table,
+            "columns": list(self.columns),
+            "sql": self.statement,
+            "reason": self.reason,
+        }
+
+
+def load_table_metadata(db: sqlite3.Connection):
+    """Return ``(columns_by_table, indexes_by_table)`` for every user table, keyed by lowercase name."""
+    columns_by_table = {}
+    indexes_by_table = {}
+    tables = db.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+
+    for (table_name,) in tables:
+        key = table_name.lower()
+        columns_by_table[key] = tuple(
+            row[1].lower() for row in db.execute(f"PRAGMA table_info('{table_name}')").fetchall()
+        )
+        indexes = []
+        for index_row in db.execute(f"PRAGMA index_list('{table_name}')").fetchall():
+            index_columns = db.execute(f"PRAGMA index_info('{index_row[1]}')").fetchall()
+            indexes.append(tuple((row[2] or "").lower() for row in index_columns))
+        indexes_by_table[key] = indexes
+
+    return columns_by_table, indexes_by_table
+
+
+def index_columns_for(table: str, shape: StatementShape, columns_by_table: dict, *, sort_refs=None):
+    """Order candidate key columns the way SQLite can use them: equality, then one range or the sort keys."""
+    def columns_of(refs):
+        return [ref.column for ref in refs if shape.resolve(ref, columns_by_table) == table]
+
+    key = list(dict.fromkeys(columns_of(shape.equality)))
+    if not key:
+        # Without a filter of its own the table is likely the inner side of a join, probed on its join keys.
+        key = list(dict.fromkeys(columns_of(ref for pair in shape.joins for ref in pair)))
+
+    if sort_refs is not None:
+        key.extend(column for column in columns_of(sort_refs) if column not in key)
+    else:
+        key.extend(column for column in columns_of(shape.ranges)[:1] if column not in key)
+    return tuple(key)
+
+
+def is_covered(columns: tuple, indexes: list):
+    return any(existing[: len(columns)] == columns for existing in indexes)
+
+
+def plan_findings(plan, shape: StatementShape):
+    findings = []
+    for step in plan:
+        detail = step["detail"]
+
+        scan = SCAN_PATTERN.match(detail)
+        if scan and "USING" not in scan.group("rest"):
+            table = shape.tables.get(scan.group("table").lower(), scan.group("table").lower())
+            findings.append(PlanFinding(kind="full_scan", detail=detail, table=table))
+            continue
+
+        temp_btree = TEMP_BTREE_PATTERN.search(detail)
+        if temp_btree:
+            findings.append(PlanFinding(kind="temp_btree", detail=detail, purpose=temp_btree.group("purpose")))
+            continue
+
+        if CORRELATED_PATTERN.match(detail):
+            findings.append(PlanFinding(kind="correlated_subquery", detail=detail))
+    return findings
+
+
+def suggest_indexes(findings, shape: StatementShape, columns_by_table: dict, indexes_by_table: dict):
+    """Turn plan findings into uncovered index suggestions plus advisory rewrites."""
+    suggestions = {}
+    rewrites = []
+
+    def propose(source, table, columns, reason):
+        if not columns or is_covered(columns, indexes_by_table.get(table, [])):
+            return
+        suggestions.setdefault(
+            (table, columns), IndexSuggestion(table=table, columns=columns, reason=reason, source=source)
+        )
+
+    for finding in findings:
+        if finding.kind == "full_scan" and finding.table in columns_by_table:
+            columns = index_columns_for(finding.table, shape, columns_by_table)
+            if columns:
+                propose(
+                    finding.kind,
+                    finding.table,
+                    columns,
+                    f"Full scan of {finding.table}; an index on ({', '.join(columns)}) turns it into a seek.",
+                )
+            else:
+                rewrites.append(
+                    {
+                        "kind": "rewrite",
+                        "sql": None,
+                        "reason": f"Full scan of {finding.table} has no indexable predicate; add a selective WHERE clause or LIMIT.",
+                    }
+                )
+
+        elif finding.kind == "temp_btree":
+            sort_refs = shape.group_by if "GROUP BY" in finding.purpose or "DISTINCT" in finding.purpose else shape.order_by
+            tables = {shape.resolve(ref, columns_by_table) for ref in sort_refs}
+            if len(tables) != 1 or None in tables:
+                continue
+            table = tables.pop()
+            columns = index_columns_for(table, shape, columns_by_table, sort_refs=sort_refs)
+            propose(
+                finding.kind,
+                table,
+                columns,
+                f"Temp B-tree built for {finding.purpose}; an index on {table}({', '.join(columns)}) returns rows pre-sorted.",
+            )
+
+        elif finding.kind == "correlated_subquery":
+            rewrites.append(
+                {
+                    "kind": "rewrite",
+                    "sql": None,
+                    "reason": "Correlated subquery runs once per outer row; rewrite it as a JOIN against a pre-aggregated derived table.",
+                }
+            )
+
+    return list(suggestions.values()), rewrites
+
+
+class QueryOptimizerService:
+    def __init__(self, execution_service: QueryExecutionService | None = None):
+        self.execution_service = execution_service or QueryExecutionService()
+
+    def optimize(self, *, connection: DatabaseConnection, sql: str, verify: bool = False):
+        explained = self.execution_service.explain(connection=connection, sql=sql)
+        plan = explained["plan"]
+        shape = extract_shape(sql)
+
+        try:
+            with closing(self.execution_service._connect_sqlite(connection)) as db:
+                columns_by_table, indexes_by_table = load_table_metadata(db)
+        except sqlite3.Error as exc:
+            raise QueryExecutionError(str(exc)) from exc
+
+        findings = plan_findings(plan, shape)
+        suggestions, rewrites = suggest_indexes(findings, shape, columns_by_table, indexes_by_table)
+
+        verification = None
+        measurements = {}
+        if verify and suggestions:
+            verification = self._verify(connection, sql, suggestions)
+            measurements = verification.pop("suggestions")
+
+        suggestion_payloads = []
+        for suggestion in suggestions:
+            payload = suggestion.as_dict()
+            if suggestion.name in measurements:
+                payload["verification"] = measurements[suggestion.name]
+            suggestion_payloads.append(payload)
+        suggestion_payloads.extend(rewrites)
+
+        recommendations = [item["reason"] for item in suggestion_payloads]
+        if not recommendations:
+            recommendations.append("The plan uses indexed access paths throughout; no index or rewrite is suggested.")
+
+        return {
+            "original_sql": sql,
+            # Kept a single statement so it can be run as is; the DDL to apply first comes separately.
+            "optimized_sql": sql,
+            "index_statements": [suggestion.statement for suggestion in suggestions],
+            "explanation": "Suggestions derived from the connection's EXPLAIN QUERY PLAN output.",
+            "recommendations": recommendations,
+            "plan": plan,
+            "findings": [asdict(finding) for finding in findings],
+            "suggestions": suggestion_payloads,
+            "verification": verification,
+        }
+
+    def _verify(self, connection: DatabaseConnection, sql: str, suggestions):
+        statement = sql.strip().rstrip(";")
+        if statement.split(None, 1)[0].upper() not in {"SELECT", "WITH"}:
+            return {"performed": False, "reason": "Only read statements are timed.", "suggestions": {}}
+
+        source = Path(connection.file_path)
+        if source.stat().st_size > VERIFY_MAX_DATABASE_BYTES:
+            return {"performed": False, "reason": "Database is too large for a temporary copy.", "suggestions": {}}
+
+        try:
+            with point_in_time_copy(source) as copy_path, closing(sqlite3.connect(copy_path)) as db:
+                baseline_ms = self._time_statement(db, statement)
+                results = {}
+                for suggestion in suggestions:
+                    db.execute(suggestion.statement)
+                    optimized_ms = self._time_statement(db, statement)
+                    plan_after = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()]
+                    db.execute(f'DROP INDEX "{suggestion.name}"')
+                    results[suggestion.name] = {
+                        "baseline_ms": baseline_ms,
+                        "optimized_ms": optimized_ms,
+                        "speedup": round(baseline_ms / optimized_ms, 2) if baseline_ms and optimized_ms else None,
+                        "plan_after": plan_after,
+                    }
+        except (sqlite3.Error, SnapshotError, OSError) as exc:
+            raise QueryExecutionError(f"Verification failed: {exc}") from exc
+
+        return {"performed": True, "baseline_ms": baseline_ms, "suggestions": results}
+
+    def _time_statement(self, db: sqlite3.Connection, statement: str):
+        """Best-of-N wall time in ms, or None when a run exceeds the verification budget."""
+        deadline = perf_counter() + VERIFY_TIME_BUDGET_SECONDS
+        db.set_progress_handler(lambda: int(perf_counter() > deadline), 10_000)
+        best_ns = None
+        try:
+            for _ in range(VERIFY_REPEAT):
+                started_ns = perf_counter_ns()
+                cursor = db.execute(statement)
+                while cursor.fetchmany(1000):
+                    pass
+                elapsed_ns = perf_counter_ns() - started_ns
+                best_ns = elapsed_ns if best_ns is None else min(best_ns, elapsed_ns)
+        except sqlite3.OperationalError:
+            return None
+        finally:
+            db.set_progress_handler(None, 0)
+        return round(best_ns / 1_000_000, 3)
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from time import perf_counter_ns
+from urllib.parse import quote
+
+from .approximate import AggregatePlan, _normalize, _sort_key
+
+
+PARALLEL_MIN_ROWS = 200_000
+MAX_PARALLELISM = max(os.cpu_count() or 1, 1)
+
+
+class ParallelExecutionError(Exception):
+    pass
+
+
+def partial_sql(plan: AggregatePlan):
+    """Per-partition query: group keys followed by the partial state each aggregate needs for merging."""
+    expressions = list(plan.group_by)
+    for item in plan.aggregates:
+        argument = item.argument or "*"
+        if item.kind == "avg":
+            expressions += [f"sum({argument})", f"count({argument})"]
+        else:
+            expressions.append(f"{item.kind}({argument})")
+
+    alias = f" AS {plan.alias}" if plan.alias else ""
+    qualifier = f"{plan.alias}." if plan.alias else ""
+    where = f" AND ({plan.where})" if plan.where else ""
+    group = f" GROUP BY {', '.join(plan.group_by)}" if plan.group_by else ""
+    return (
+        f"SELECT {', '.join(expressions)} FROM \"{plan.table}\"{alias} "
+        f"WHERE {qualifier}rowid BETWEEN ? AND ?{where}{group}"
+    )
+
+
+def scan_partition(file_path: str, sql: str, low: int, high: int):
+    """Worker entry point: run one rowid range on its own read-only connection."""
+    started_ns = perf_counter_ns()
+    db = sqlite3.connect(f"file:{quote(str(Path(file_path).resolve()))}?mode=ro", uri=True)
+    try:
+        db.execute("PRAGMA query_only=ON;")
+        rows = db.execute(sql, (low, high)).fetchall()
+    finally:
+        db.close()
+    return rows, round((perf_counter_ns() - started_ns) / 1_000_000, 3)
+
+
+def rowid_partitions(low: int, high: int, parts: int):
+    span = high - low + 1
+    bounds = [low + span * index // parts for index in range(parts + 1)]
+    return [(bounds[index], bounds[index + 1] - 1) for index in range(parts) if bounds[index + 1] > bounds[index]]
+
+
+def _merge_value(kind, current, value):
+    if value is None:
+        return current
+    if current is None:
+        return value
+    if kind in {"count", "sum", "total"}:
+        return current + value
+    if kind == "min":
+        return value if _sort_key(value) < _sort_key(current) else current
+    return value if _sort_key(value) > _sort_key(current) else current
+
+
+def merge_partials(plan: AggregatePlan, partials):
+    """Combine partition results into the rows SQLite would return for the whole table."""
+    key_width = len(plan.group_by)
+    merged = {}
+    for rows in partials:
+        for row in rows:
+            key = tuple(row[:key_width])
+            state = merged.setdefault(key, [None] * (len(row) - key_width))
+            position = 0
+            for item in plan.aggregates:
+                if item.kind == "avg":
+                    state[position] = _merge_value("sum", state[position], row[key_width + position])
+                    state[position + 1] = _merge_value("count", state[position + 1], row[key_width + position + 1])
+                    position += 2
+                else:
+                    state[position] = _merge_value(item.kind, state[position], row[key_width + position])
+                    position += 1
+
+    if not plan.group_by and not merged:
+        # An ungrouped aggregate over no rows still returns one row.
+        merged[()] = [None] * sum(2 if item.kind == "avg" else 1 for item in plan.aggregates)
+
+    normalized_groups = [_normalize(expression) for expression in plan.group_by]
+    results = []
+    for key in sorted(merged, key=lambda group: tuple(map(_sort_key, group))):
+        state = merged[key]
+        values = {}
+        position = 0
+        for item in plan.aggregates:
+            if item.kind == "avg":
+                total, count = state[position], state[position + 1]
+                values[item.name] = total / count if count else None
+                position += 2
+            else:
+                value = state[position]
+                if item.kind == "count":
+                    value = value or 0
+                elif item.kind == "total":
+                    value = float(value or 0.0)
+                values[item.name] = value
+                position += 1
+
+        row = {}
+        for item in plan.items:
+            if item.kind == "group":
+                row[item.name] = key[normalized_groups.index(_normalize(item.expression))]
+            else:
+                row[item.name] = values[item.name]
+        results.append(row)
+    return results
+
+
+class ParallelScanExecutor:
+    """Splits single-table aggregates into rowid ranges and scans them on a shared process pool."""
+
+    def __init__(self, max_workers: int = MAX_PARALLELISM):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def execute(self, file_path: str, plan: AggregatePlan, low: int, high: int, parallelism: int):
+        parallelism = max(1, min(int(parallelism), self.max_workers))
+        partitions = rowid_partitions(low, high, parallelism)
+        sql = partial_sql(plan)
+
+        started_ns = perf_counter_ns()
+        if len(partitions) == 1:
+            results = [scan_partition(file_path, sql, *partitions[0])]
+        else:
+            pool = self._executor()
+            try:
+                futures = [pool.submit(scan_partition, file_path, sql, first, last) for first, last in partitions]
+                results = [future.result() for future in futures]
+            except BrokenProcessPool as exc:
+                self.shutdown()
+                raise ParallelExecutionError("A parallel scan worker exited unexpectedly.") from exc
+        scan_ms = round((perf_counter_ns() - started_ns) / 1_000_000, 3)
+
+        rows = merge_partials(plan, [partial for partial, _ in results])
+        return rows, {
+            "parallelism": len(partitions),
+            "partitions": [
+                {"rowid_range": [first, last], "groups": len(partial), "duration_ms": duration_ms}
+                for (first, last), (partial, duration_ms) in zip(partitions, results)
+            ],
+            "scan_ms": scan_ms,
+            "merge_ms": round((perf_counter_ns() - started_ns) / 1_000_000 - scan_ms, 3),
+        }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # Spawned workers never inherit the server's threads or open database handles.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+
+parallel_executor = ParallelScanExecutor()
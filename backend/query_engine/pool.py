@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .tracing import span
+
+
+SQLITE_POOL_IDLE_PER_FILE = 4
+SQLITE_POOL_MAX_FILES = 32
+# Compiled statements each pooled connection keeps; the sqlite3 default of 128 is shared with
+# the PRAGMAs, schema reads and savepoints that also run on these connections.
+DEFAULT_SQLITE_CACHED_STATEMENTS = 256
+
+
+def configure_sqlite(db: sqlite3.Connection):
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL;")
+    db.execute("PRAGMA synchronous=NORMAL;")
+    db.execute("PRAGMA temp_store=MEMORY;")
+    db.execute("PRAGMA foreign_keys=ON;")
+    return db
+
+
+class StatementCacheMirror:
+    """Replays the sqlite3 module's per-connection LRU of compiled statements to count reuses.
+
+    The module caches statements by SQL text but exposes no counters, so each execute is looked
+    up in an LRU of the same capacity: a hit there means SQLite skipped compiling the statement.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._recent = OrderedDict()
+
+    def touch(self, sql: str):
+        if sql in self._recent:
+            self._recent.move_to_end(sql)
+            self.hits += 1
+            return True
+        self._recent[sql] = None
+        if len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+        self.misses += 1
+        return False
+
+    def mark(self):
+        return self.hits, self.misses
+
+    def since(self, mark):
+        return {"hits": self.hits - mark[0], "misses": self.misses - mark[1]}
+
+
+class PooledConnection(sqlite3.Connection):
+    """A connection whose ``execute`` calls are counted against its statement cache mirror."""
+
+    statement_cache: StatementCacheMirror
+
+    def execute(self, sql, parameters=(), /):
+        self.statement_cache.touch(sql)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, parameters, /):
+        self.statement_cache.touch(sql)
+        return super().executemany(sql, parameters)
+
+
+class SQLiteConnectionPool:
+    """Reuses configured connections per file, so the parsed schema and page cache outlive a single query."""
+
+    def __init__(self, idle_per_file: int = SQLITE_POOL_IDLE_PER_FILE, max_files: int = SQLITE_POOL_MAX_FILES):
+        self.idle_per_file = idle_per_file
+        self.max_files = max_files
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+        self._statement_hits = 0
+        self._statement_misses = 0
+
+    @property
+    def cached_statements(self):
+        return int(getattr(settings, "INFRADB_SQLITE_CACHED_STATEMENTS", DEFAULT_SQLITE_CACHED_STATEMENTS))
+
+    @contextmanager
+    def connection(self, file_path: str, *, reuse: bool = True):
+        """A configured connection to ``file_path``, returned to the pool afterwards.
+
+        With ``reuse=False`` the caller is about to change session state (PRAGMAs, ATTACH, TEMP
+        objects), so it gets a fresh connection that is closed instead of checked back in. A pooled
+        connection that nonetheless wrote something is retired the same way.
+        """
+        key = str(file_path)
+        with span("connect") as current:
+            db = self._checkout(key) if reuse else None
+            if current is not None:
+                current.attributes["pooled"] = db is not None
+            db = db or self._open(key)
+        healthy = reuse
+        mark = db.statement_cache.mark()
+        changes = db.total_changes
+        try:
+            yield db
+        except Exception as exc:
+            # Statement errors (often re-raised wrapped) leave the connection usable; a bare
+            # DatabaseError such as "file is not a database", or driver failures, retire it.
+            cause = exc if isinstance(exc, sqlite3.Error) else exc.__cause__
+            broken = isinstance(cause, (sqlite3.InterfaceError, sqlite3.InternalError))
+            healthy = healthy and not broken and type(cause) is not sqlite3.DatabaseError
+            raise
+        finally:
+            if db.in_transaction:
+                db.rollback()
+            # A write may have been to a TEMP table; only connections that wrote nothing are shared again.
+            healthy = healthy and db.total_changes == changes
+            usage = db.statement_cache.since(mark)
+            with self._lock:
+                self._statement_hits += usage["hits"]
+                self._statement_misses += usage["misses"]
+            self._checkin(key, db) if healthy else db.close()
+
+    def warm(self, file_path: str):
+        """Open a pooled connection and parse the schema now rather than on the first query."""
+        with self.connection(file_path) as db:
+            return db.execute("SELECT count(*) FROM sqlite_master").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "files": len(self._idle),
+                "idle_connections": sum(len(idle) for idle in self._idle.values()),
+                "cached_statements": self.cached_statements,
+                "statement_cache": {"hits": self._statement_hits, "misses": self._statement_misses},
+            }
+
+    def _open(self, key: str):
+        capacity = self.cached_statements
+        db = PooledConnection(key, check_same_thread=False, cached_statements=capacity)
+        db.statement_cache = StatementCacheMirror(capacity)
+        return configure_sqlite(db)
+
+    def _checkout(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if not idle:
+                return None
+            self._idle.move_to_end(key)
+            return idle.pop()
+
+    def _checkin(self, key, db: sqlite3.Connection):
+        evicted = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(idle) < self.idle_per_file:
+                idle.append(db)
+            else:
+                evicted.append(db)
+            while len(self._idle) > self.max_files:
+                _, connections = self._idle.popitem(last=False)
+                evicted.extend(connections)
+        for connection in evicted:
+            connection.close()
+
+
+sqlite_pool = SQLiteConnectionPool()
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from time import perf_counter, perf_counter_ns
+from urllib.parse import quote
+
+import numpy as np
+
+from . import kernels
+from .statistics import current_row_estimate, rowid_upper_bound
+
+
+PROFILE_BATCH_ROWS = 65_536
+PROFILE_FULL_SCAN_ROWS = 1_000_000
+PROFILE_SAMPLE_ROWS = 100_000
+PROFILE_HISTOGRAM_BINS = 20
+PROFILE_RESERVOIR_SIZE = 50_000
+PROFILE_TOP_VALUES = 10
+PROFILE_TIME_BUDGET_SECONDS = 30.0
+
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_VALUE_BITS = 64 - HLL_PRECISION
+
+_UINT64_MASK = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def splitmix64(values: np.ndarray):
+    """Vectorized 64-bit finalizer so HyperLogLog sees well-distributed hashes."""
+    with np.errstate(over="ignore"):
+        z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return (z ^ (z >> np.uint64(31))) & _UINT64_MASK
+
+
+class HyperLogLog:
+    def __init__(self):
+        self.registers = np.zeros(HLL_REGISTERS, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray):
+        if not hashes.size:
+            return
+        buckets = (hashes >> np.uint64(HLL_VALUE_BITS)).astype(np.intp)
+        remainder = hashes & np.uint64((1 << HLL_VALUE_BITS) - 1)
+        # Remainders fit in 50 bits, so float64 log2 recovers the highest set bit exactly.
+        ranks = np.full(hashes.shape, HLL_VALUE_BITS + 1, dtype=np.uint8)
+        nonzero = remainder > 0
+        ranks[nonzero] = HLL_VALUE_BITS - np.floor(np.log2(remainder[nonzero].astype(np.float64))).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def estimate(self):
+        alpha = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+        raw = alpha * HLL_REGISTERS**2 / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * HLL_REGISTERS and zeros:
+            return int(round(HLL_REGISTERS * np.log(HLL_REGISTERS / zeros)))
+        return int(round(raw))
+
+
+class Reservoir:
+    """Batch form of Algorithm R: a uniform fixed-size sample of everything offered so far."""
+
+    def __init__(self, size: int, rng: np.random.Generator):
+        self.size = size
+        self.rng = rng
+        self.values = np.empty(0, dtype=np.float64)
+        self.seen = 0
+
+    def offer(self, batch: np.ndarray):
+        free = self.size - self.values.size
+        if free > 0:
+            self.values = np.concatenate([self.values, batch[:free]])
+            self.seen += min(free, batch.size)
+            batch = batch[free:]
+        if batch.size:
+            positions = np.arange(self.seen + 1, self.seen + batch.size + 1)
+            slots = (self.rng.random(batch.size) * positions).astype(np.int64)
+            keep = slots < self.size
+            self.values[slots[keep]] = batch[keep]
+            self.seen += batch.size
+
+
+class ColumnProfile:
+    def __init__(self, name: str, declared_type: str, *, keep_hashes: bool, rng: np.random.Generator):
+        self.name = name
+        self.declared_type = declared_type
+        self.count = 0
+        self.null_count = 0
+        self.numeric_count = 0
+        self.numeric_mean = 0.0
+        self.numeric_m2 = 0.0
+        self.numeric_min = None
+        self.numeric_max = None
+        self.text_count = 0
+        self.text_min = None
+        self.text_max = None
+        self.text_length_total = 0
+        self.hll = HyperLogLog()
+        self.reservoir = Reservoir(PROFILE_RESERVOIR_SIZE, rng)
+        self.keep_hashes = keep_hashes
+        self.hashes = []
+        self.text_samples = []
+
+    def update(self, values: np.ndarray):
+        self.count += values.size
+        nulls = values == None  # noqa: E711 - elementwise comparison on an object array
+        self.null_count += int(np.count_nonzero(nulls))
+        present = values[~nulls]
+        if not present.size:
+            return
+
+        value_types = set(map(type, present))
+        if value_types <= {int, float}:
+            numeric, text = present.astype(np.float64), present[:0]
+        elif int not in value_types and float not in value_types:
+            numeric, text = np.empty(0, dtype=np.float64), present
+        else:
+            is_numeric = np.fromiter(
+                (isinstance(value, (int, float)) for value in present), dtype=bool, count=present.size
+            )
+            numeric = present[is_numeric].astype(np.float64)
+            text = present[~is_numeric]
+
+        if numeric.size:
+            self._update_numeric(numeric)
+        if text.size:
+            self._update_text(text)
+
+    def _update_numeric(self, numeric: np.ndarray):
+        # Chan et al. parallel merge keeps mean/variance stable across batches.
+        batch_mean = float(numeric.mean())
+        batch_m2 = float(((numeric - batch_mean) ** 2).sum())
+        total = self.numeric_count + numeric.size
+        delta = batch_mean - self.numeric_mean
+        self.numeric_m2 += batch_m2 + delta**2 * self.numeric_count * numeric.size / total
+        self.numeric_mean += delta * numeric.size / total
+        self.numeric_count = total
+
+        batch_min, batch_max = float(numeric.min()), float(numeric.max())
+        self.numeric_min = batch_min if self.numeric_min is None else min(self.numeric_min, batch_min)
+        self.numeric_max = batch_max if self.numeric_max is None else max(self.numeric_max, batch_max)
+        self.reservoir.offer(numeric)
+        self._add_hashes(splitmix64(numeric.view(np.uint64)))
+
+    def _update_text(self, text: np.ndarray):
+        strings = text.astype(str)
+        self.text_count += strings.size
+        batch_min, batch_max = min(strings.tolist()), max(strings.tolist())
+        self.text_min = batch_min if self.text_min is None else min(self.text_min, batch_min)
+        self.text_max = batch_max if self.text_max is None else max(self.text_max, batch_max)
+        self.text_length_total += int(np.char.str_len(strings).sum())
+        if len(self.text_samples) * PROFILE_BATCH_ROWS < PROFILE_RESERVOIR_SIZE:
+            self.text_samples.append(strings[:PROFILE_RESERVOIR_SIZE])
+        hashes = np.fromiter((hash(value) for value in strings), dtype=np.int64, count=strings.size)
+        self._add_hashes(splitmix64(hashes.view(np.uint64)))
+
+    def _add_hashes(self, hashes: np.ndarray):
+        self.hll.add_hashes(hashes)
+        if self.keep_hashes:
+            self.hashes.append(hashes)
+
+    def distinct_estimate(self, population_rows: int):
+        if not self.keep_hashes or not self.hashes:
+            return self.hll.estimate(), "hyperloglog"
+
+        _, counts = np.unique(np.concatenate(self.hashes), return_counts=True)
+        sample_rows = int(counts.sum())
+        singletons = int(np.count_nonzero(counts == 1))
+        if singletons >= 0.9 * sample_rows:
+            # Key-like column: nearly every sampled value is unique, so scale linearly.
+            return int(round(population_rows * counts.size / self.count)), "linear"
+
+        # Otherwise scale the sample's frequency profile up with the GEE estimator.
+        scale = np.sqrt(max(population_rows, sample_rows) / sample_rows)
+        return int(round(scale * singletons + counts.size - singletons)), "gee"
+
+    def as_dict(self, population_rows: int):
+        distinct, method = self.distinct_estimate(population_rows)
+        payload = {
+            "name": self.name,
+            "declared_type": self.declared_type,
+            "kind": self._kind(),
+            "count": self.count,
+            "null_count": self.null_count,
+            "null_fraction": round(self.null_count / self.count, 6) if self.count else 0.0,
+            "distinct_estimate": distinct,
+            "distinct_method": method,
+            "min": None,
+            "max": None,
+        }
+
+        if self.numeric_count:
+            payload.update(
+                {
+                    "min": self.numeric_min,
+                    "max": self.numeric_max,
+                    "mean": round(self.numeric_mean, 6),
+                    "stddev": round(float(np.sqrt(self.numeric_m2 / self.numeric_count)), 6),
+                    "histogram": self._histogram(),
+                }
+            )
+        if self.text_count:
+            if not self.numeric_count:
+                payload.update({"min": self.text_min, "max": self.text_max})
+            payload["avg_length"] = round(self.text_length_total / self.text_count, 3)
+            payload["top_values"] = self._top_values()
+        return payload
+
+    def _kind(self):
+        if self.numeric_count and self.text_count:
+            return "mixed"
+        if self.numeric_count:
+            return "numeric"
+        if self.text_count:
+            return "text"
+        return "empty"
+
+    def _histogram(self):
+        counts, edges = np.histogram(
+            self.reservoir.values,
+            bins=PROFILE_HISTOGRAM_BINS,
+            range=(self.numeric_min, self.numeric_max) if self.numeric_min != self.numeric_max else None,
+        )
+        scale = self.numeric_count / max(self.reservoir.values.size, 1)
+        return {
+            "edges": [round(float(edge), 6) for edge in edges],
+            "counts": [int(round(count * scale)) for count in counts],
+        }
+
+    def _top_values(self):
+        values, counts = np.unique(np.concatenate(self.text_samples), return_counts=True)
+        order = kernels.top_k(counts.astype(np.int64), PROFILE_TOP_VALUES)
+        return [{"value": str(values[index]), "count": int(counts[index])} for index in order]
+
+
+class TableProfiler:
+    """Profiles table columns in NumPy batches, sampling by rowid once a table is too large to scan."""
+
+    def __init__(self, *, seed: int | None = None):
+        self.seed = seed
+
+    def profile(self, db: sqlite3.Connection, table: str, columns=None, sample_rows: int = PROFILE_SAMPLE_ROWS):
+        declared = self._declared_columns(db, table)
+        selected = list(columns or declared)
+        unknown = [column for column in selected if column not in declared]
+        if unknown:
+            raise ValueError(f"Unknown column(s) on {table}: {', '.join(unknown)}")
+
+        started_ns = perf_counter_ns()
+        rng = np.random.default_rng(self.seed)
+        row_estimate = rowid_upper_bound(db, table)
+        sampled = row_estimate is not None and row_estimate > PROFILE_FULL_SCAN_ROWS
+        profiles = [
+            ColumnProfile(column, declared[column], keep_hashes=sampled, rng=rng) for column in selected
+        ]
+        column_sql = ", ".join(f'"{column}"' for column in selected)
+
+        deadline = perf_counter() + PROFILE_TIME_BUDGET_SECONDS
+        db.set_progress_handler(lambda: int(perf_counter() > deadline), 100_000)
+        try:
+            if sampled:
+                rows_read = self._profile_sample(db, table, column_sql, profiles, sample_rows, rng)
+                population_rows = row_estimate
+            else:
+                rows_read = self._profile_scan(db, f'SELECT {column_sql} FROM "{table}"', (), profiles)
+                population_rows = rows_read
+        finally:
+            db.set_progress_handler(None, 0)
+        if sampled:
+            # Deleted rows keep max(rowid) up, so report a real count whenever one is affordable.
+            population_rows = current_row_estimate(db, table) or population_rows
+
+        return {
+            "table": table,
+            "row_count": population_rows,
+            "row_count_exact": not sampled,
+            "sampled": sampled,
+            "rows_profiled": rows_read,
+            "duration_ms": round((perf_counter_ns() - started_ns) / 1_000_000, 3),
+            "columns": [profile.as_dict(population_rows) for profile in profiles],
+        }
+
+    def _declared_columns(self, db: sqlite3.Connection, table: str):
+        exists = db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name=?", (table,)
+        ).fetchone()
+        if not exists:
+            raise ValueError(f"Table not found: {table}")
+        return {row[1]: row[2] for row in db.execute(f"PRAGMA table_info('{table}')").fetchall()}
+
+    def _profile_scan(self, db, sql, params, profiles):
+        cursor = db.execute(sql, params)
+        rows_read = 0
+        while True:
+            rows = cursor.fetchmany(PROFILE_BATCH_ROWS)
+            if not rows:
+                return rows_read
+            rows_read += len(rows)
+            for profile, values in zip(profiles, zip(*rows)):
+                batch = np.empty(len(values), dtype=object)
+                batch[:] = values
+                profile.update(batch)
+
+    def _profile_sample(self, db, table, column_sql, profiles, sample_rows, rng):
+        low = db.execute(f'SELECT min(rowid) FROM "{table}"').fetchone()[0]
+        high = db.execute(f'SELECT max(rowid) FROM "{table}"').fetchone()[0]
+        rowids = np.unique(rng.integers(low, high + 1, size=sample_rows))
+        chunk_size = db.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        rows_read = 0
+        for start in range(0, rowids.size, chunk_size):
+            chunk = rowids[start : start + chunk_size].tolist()
+            placeholders = ", ".join("?" * len(chunk))
+            rows_read += self._profile_scan(
+                db, f'SELECT {column_sql} FROM "{table}" WHERE rowid IN ({placeholders})', chunk, profiles
+            )
+        return rows_read
+
+
+def profile_table(file_path: str, table: str, columns=None, sample_rows: int = PROFILE_SAMPLE_ROWS):
+    """Profile on a read-only, query-only connection so WAL writers and other readers are never blocked."""
+    with closing(sqlite3.connect(f"file:{quote(str(Path(file_path).resolve()))}?mode=ro", uri=True)) as db:
+        db.execute("PRAGMA query_only=1;")
+        return TableProfiler().profile(db, table, columns=columns, sample_rows=sample_rows)
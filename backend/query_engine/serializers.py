@@ -7,4 +7,4 @@ class QueryJobSerializer(serializers.ModelSerializer):
     class Meta:
         model = QueryJob
         fields = '__all__'
-        read_only_fields = ['user', 'status', 'execution_time_ms', 'rows_affected', 'data_scanned_bytes', 'error_message', 'results_path', 'started_at', 'finished_at']
+        read_only_fields = ['user', 'status', 'execution_time_ms', 'rows_affected', 'data_scanned_bytes', 'error_message', 'priority', 'admission', 'queue_time_ms', 'results_path', 'started_at', 'finished_at']
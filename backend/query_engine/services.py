@@ -1,19 +1,54 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import sqlite3
+import uuid
+from contextlib import closing
 from pathlib import Path
 from time import perf_counter_ns
 
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
 from django.utils import timezone
 
 from databases.models import DatabaseConnection
 
-from .engine_client import NativeEngineClient
-from .models import QueryJob
+from .admission import AdmissionRejected, admission_controller
+from .analytics import AnalyticsEngineError, RouteDecision, analytics_pool, route_statement
+from .approximate import APPROX_MIN_POPULATION_ROWS, ApproximateQueryEngine, ApproximationUnsupported, plan_aggregate
+from .background import background_runner
+from .downsampling import DownsampleSpec, downsample_query
+from .engine_client import native_client
+from .federation import FederationError, federated_pool
+from .group_commit import GROUP_COMMIT_STATEMENTS, group_committer
+from .history_search import fts_query, fts_words, search_index_ready, search_jobs
+from .materialized import MaterializedViewError, MaterializedViewManager, materialized_table_name
+from .models import MaterializedView, QueryJob, StatementStatistics
+from .parallel import MAX_PARALLELISM, PARALLEL_MIN_ROWS, ParallelExecutionError, parallel_executor
+from .pool import configure_sqlite, sqlite_pool
+from .sql_analysis import canonical_sql, extract_shape, fingerprint, tokenize
+from .statement_stats import histogram_percentile, statement_statistics
+from .statistics import StatisticsManager, estimate_plan, load_statistics
+from .tracing import span
 
 
 READ_QUERY_PREFIXES = {"SELECT", "WITH", "PRAGMA", "EXPLAIN"}
+SESSION_SAFE_STATEMENTS = {"SELECT", "WITH"}
+EXECUTION_ENGINES = {"auto", "sqlite", "duckdb"}
 ROW_PREVIEW_LIMIT = 500
+MAX_BATCH_PARAMETER_SETS = 1000
+PLAN_CACHE_TIMEOUT_SECONDS = 300
+ROUTE_CACHE_TIMEOUT_SECONDS = 300
+STATISTICS_CHECK_INTERVAL_SECONDS = 300
+STATEMENT_ORDERINGS = {
+    "total_time": "total_time_ms",
+    "mean_time": "mean_time_ms",
+    "p95_time": "p95_time_ms",
+    "calls": "calls",
+    "rows": "rows",
+    "errors": "errors",
+}
 
 
 class QueryExecutionError(Exception):
@@ -22,29 +57,170 @@ class QueryExecutionError(Exception):
 
 class QueryExecutionService:
     def __init__(self):
-        self.native_client = NativeEngineClient()
+        self.native_client = native_client
+        self.connection_pool = sqlite_pool
+        self.statistics_manager = StatisticsManager()
+        self.materialized_views = MaterializedViewManager()
+        self.analytics_pool = analytics_pool
+        self.federated_pool = federated_pool
+        self.parallel_executor = parallel_executor
+        self.admission_controller = admission_controller
+        self.group_committer = group_committer
 
-    def execute(self, *, connection: DatabaseConnection, sql: str, actor):
-        statement = self._normalize_statement(sql)
-        job = QueryJob.objects.create(
-            user=actor,
+    def execute(
+        self,
+        *,
+        connection: DatabaseConnection,
+        sql: str,
+        actor,
+        approximate=None,
+        engine="auto",
+        attachments=None,
+        parallelism=None,
+        priority="interactive",
+        parameters=None,
+        many=False,
+        visualization=None,
+    ):
+        response = None
+        for response in self.stream_execute(
             connection=connection,
-            sql_query=statement,
-            status="RUNNING",
-            started_at=timezone.now(),
-        )
+            sql=sql,
+            actor=actor,
+            approximate=approximate,
+            engine=engine,
+            attachments=attachments,
+            parallelism=parallelism,
+            priority=priority,
+            parameters=parameters,
+            many=many,
+            visualization=visualization,
+        ):
+            pass
+        return response
+
+    def stream_execute(
+        self,
+        *,
+        connection: DatabaseConnection,
+        sql: str,
+        actor,
+        approximate=None,
+        engine="auto",
+        attachments=None,
+        parallelism=None,
+        priority="interactive",
+        parameters=None,
+        many=False,
+        visualization=None,
+    ):
+        """Yield interim approximate snapshots, if any were requested, followed by the final response.
+
+        ``parameters`` binds a list of positional or an object of named values to the statement's
+        placeholders; with ``many`` it is a list of such sets, each run against the same statement.
+        ``visualization`` names an x and a y column and returns that series downsampled for a chart.
+        """
+        statement = self._normalize_statement(sql)
+        bound = self._bind_parameters(parameters, many=many)
+        spec = self._downsample_spec(visualization)
+        try:
+            with span("admission", priority=priority):
+                ticket = self.admission_controller.acquire(connection.pk, connection.workspace_id, priority)
+        except AdmissionRejected as exc:
+            job = QueryJob.objects.create(
+                user=actor,
+                connection=connection,
+                sql_query=statement,
+                parameters=parameters,
+                status="FAILED",
+                priority=priority,
+                admission=exc.ticket.decision,
+                queue_time_ms=exc.ticket.queue_time_ms,
+                error_message=str(exc),
+                finished_at=timezone.now(),
+            )
+            exc.job_id = str(job.id)
+            raise
+
+        try:
+            with span("job_create"):
+                job = QueryJob.objects.create(
+                    user=actor,
+                    connection=connection,
+                    sql_query=statement,
+                    parameters=parameters,
+                    status="RUNNING",
+                    priority=priority,
+                    admission=ticket.decision,
+                    queue_time_ms=ticket.queue_time_ms,
+                    started_at=timezone.now(),
+                )
+        except Exception:
+            self.admission_controller.release(ticket)
+            raise
 
         started_ns = perf_counter_ns()
         try:
-            payload = self._execute_sqlite(connection, statement)
+            # View definitions hold no placeholders, so a bound statement never reads from one.
+            view = None if attachments or bound is not None else self._matching_materialized_view(connection, statement)
+            if bound is not None and (parallelism is not None or approximate is not None):
+                raise QueryExecutionError("Bound parameters cannot be combined with parallel or approximate execution.")
+            if spec is not None:
+                if attachments or many or parallelism is not None or approximate is not None:
+                    raise QueryExecutionError("Downsampling runs alone on SQLite; drop attachments, batches, parallel and approximate options.")
+                payload = self._execute_downsampled(connection, statement, bound, spec)
+            elif attachments:
+                if approximate is not None:
+                    raise QueryExecutionError("Federated queries cannot be approximated.")
+                if many:
+                    raise QueryExecutionError("Federated queries cannot run as a batch.")
+                payload = self._execute_federated(connection, statement, attachments, bound)
+            elif view is not None:
+                payload = self._execute_sqlite(connection, view.read_sql)
+                payload["materialized_view"] = {"name": view.name, "table": view.table_name, "strategy": view.strategy}
+            elif parallelism is not None:
+                if approximate is not None:
+                    raise QueryExecutionError("Choose either approximate or parallel execution.")
+                payload = self._execute_parallel(connection, statement, parallelism)
+            elif approximate is None:
+                payload = self._execute_routed(connection, statement, engine, bound, many)
+            else:
+                for payload in self._execute_approximate(connection, statement, approximate):
+                    if not payload["approximation"].get("final", True):
+                        yield {
+                            "job_id": str(job.id),
+                            "status": "RUNNING",
+                            "results": payload["rows"],
+                            "columns": payload["columns"],
+                            "approximation": payload["approximation"],
+                        }
+        except GeneratorExit:
+            job.status = "CANCELLED"
+            job.execution_time_ms = round((perf_counter_ns() - started_ns) / 1_000_000, 3)
+            job.finished_at = timezone.now()
+            job.save(update_fields=["status", "execution_time_ms", "finished_at"])
+            raise
         except Exception as exc:
             duration_ms = round((perf_counter_ns() - started_ns) / 1_000_000, 3)
             job.status = "FAILED"
             job.execution_time_ms = duration_ms
             job.error_message = str(exc)
             job.finished_at = timezone.now()
-            job.save(update_fields=["status", "execution_time_ms", "error_message", "finished_at"])
+            with span("job_save"):
+                job.save(update_fields=["status", "execution_time_ms", "error_message", "finished_at"])
+            statement_statistics.record(
+                connection_id=connection.pk,
+                fingerprint=fingerprint(statement),
+                sql=statement,
+                duration_ms=duration_ms,
+                failed=True,
+            )
             raise
+        finally:
+            self.admission_controller.release(ticket)
+
+        if payload["query_type"] not in READ_QUERY_PREFIXES:
+            self.schedule_statistics_refresh(connection=connection)
 
         native_metrics = self.native_client.scan_database(connection.file_path) if connection.file_path else {"available": False}
         duration_ms = round((perf_counter_ns() - started_ns) / 1_000_000, 3)
@@ -53,9 +229,18 @@ class QueryExecutionService:
         job.execution_time_ms = duration_ms
         job.rows_affected = payload["rows_affected"]
         job.finished_at = timezone.now()
-        job.save(update_fields=["status", "execution_time_ms", "rows_affected", "finished_at"])
+        with span("job_save"):
+            job.save(update_fields=["status", "execution_time_ms", "rows_affected", "finished_at"])
+        statement_statistics.record(
+            connection_id=connection.pk,
+            fingerprint=fingerprint(statement),
+            sql=statement,
+            duration_ms=duration_ms,
+            rows=payload["rows_affected"],
+            cache_hit="materialized_view" in payload,
+        )
 
-        return {
+        response = {
             "job_id": str(job.id),
             "status": job.status,
             "results": payload["rows"],
@@ -65,20 +250,42 @@ class QueryExecutionService:
             "execution_time_ms": duration_ms,
             "truncated": payload["truncated"],
             "query_type": payload["query_type"],
+            "fingerprint": fingerprint(statement).id,
+            "admission": ticket.as_dict(),
             "engine": {
-                "execution_mode": "sqlite",
+                "execution_mode": payload.get("engine", "sqlite"),
                 "native_acceleration": native_metrics.get("available", False),
                 "native": native_metrics,
             },
         }
+        if "routing" in payload:
+            response["engine"]["routing"] = payload["routing"]
+        for key in ("approximation", "materialized_view", "federation", "parallel", "group_commit", "statement_cache", "batch", "downsampling"):
+            if key in payload:
+                response[key] = payload[key]
+        yield response
 
-    def explain(self, *, connection: DatabaseConnection, sql: str):
+    def explain(self, *, connection: DatabaseConnection, sql: str, parameters=None):
         statement = self._normalize_statement(sql)
+        bound = self._bind_parameters(parameters)
+        db_path = self._validate_sqlite(connection)
+        self.schedule_statistics_refresh(connection=connection)
+
+        # Plans are cached per statement template and bound values until the file is next written.
+        plan_key = "infradb:plan:{}:{}".format(
+            connection.pk,
+            hashlib.sha1(
+                json.dumps([self.data_version(connection=connection), statement, parameters], sort_keys=True).encode()
+            ).hexdigest(),
+        )
+        cached = cache.get(plan_key)
+        if cached is not None:
+            return {**cached, "cached": True}
 
         try:
-            with self._connect_sqlite(connection) as db:
-                cursor = db.execute(f"EXPLAIN QUERY PLAN {statement}")
-                rows = cursor.fetchall()
+            with self.connection_pool.connection(db_path) as db:
+                rows = db.execute(f"EXPLAIN QUERY PLAN {statement}", () if bound is None else bound).fetchall()
+                stats = load_statistics(db)
         except sqlite3.Error as exc:
             raise QueryExecutionError(str(exc)) from exc
 
@@ -91,11 +298,145 @@ class QueryExecutionService:
             }
             for row in rows
         ]
-        return {
-            "plan": plan,
+        estimate = estimate_plan(plan, stats, extract_shape(statement).tables)
+        payload = {
+            "plan": estimate["plan"],
             "explanation": "SQLite execution plan generated from the current connection.",
-            "estimated_cost": len(plan),
+            "estimated_cost": estimate["estimated_cost"],
+            "estimated_rows": estimate["estimated_rows"],
+            "statistics_source": estimate["statistics_source"],
         }
+        cache.set(plan_key, payload, timeout=PLAN_CACHE_TIMEOUT_SECONDS)
+        return {**payload, "cached": False}
+
+    def schedule_statistics_refresh(self, *, connection: DatabaseConnection):
+        """Re-analyze drifted tables in the background, at most once per check interval per connection."""
+        if connection.engine != "SQLITE":
+            return False
+        if not cache.add(f"infradb:statistics:{connection.pk}:checked", True, timeout=STATISTICS_CHECK_INTERVAL_SECONDS):
+            return False
+        return background_runner.submit(f"statistics:{connection.pk}", self.refresh_statistics, connection=connection)
+
+    def refresh_statistics(self, *, connection: DatabaseConnection, tables=None):
+        try:
+            with closing(self._connect_sqlite(connection)) as db:
+                return self.statistics_manager.refresh(db, tables=tables)
+        except (sqlite3.Error, ValueError) as exc:
+            raise QueryExecutionError(str(exc)) from exc
+
+    def create_materialized_view(self, *, connection: DatabaseConnection, name: str, sql: str, refresh_interval_seconds=None):
+        statement = self._normalize_statement(sql)
+        try:
+            table_name = materialized_table_name(name)
+            with closing(self._connect_sqlite(connection)) as db:
+                plan = self.materialized_views.plan(db, statement, table_name)
+                started_ns = perf_counter_ns()
+                row_count = self.materialized_views.create(db, plan)
+                refresh_time_ms = round((perf_counter_ns() - started_ns) / 1_000_000, 3)
+        except (MaterializedViewError, sqlite3.Error) as exc:
+            raise QueryExecutionError(str(exc)) from exc
+
+        view = MaterializedView(
+            connection=connection,
+            name=name,
+            table_name=table_name,
+            definition=plan.definition,
+            canonical_sql=canonical_sql(plan.definition),
+            source_table=plan.source_table,
+            read_sql=plan.read_sql,
+            strategy=plan.strategy,
+            row_count=row_count,
+            refresh_time_ms=refresh_time_ms,
+            data_version=self.data_version(connection=connection),
+            refreshed_at=timezone.now(),
+        )
+        if refresh_interval_seconds is not None:
+            view.refresh_interval_seconds = int(refresh_interval_seconds)
+        view.save()
+        return self.describe_materialized_view(view=view, reason=plan.reason)
+
+    def refresh_materialized_view(self, *, view: MaterializedView):
+        started_ns = perf_counter_ns()
+        try:
+            with closing(self._connect_sqlite(view.connection)) as db:
+                plan = self.materialized_views.plan(db, view.definition, view.table_name)
+                view.row_count = self.materialized_views.refresh(db, plan)
+        except (MaterializedViewError, sqlite3.Error) as exc:
+            view.status = "FAILED"
+            view.error_message = str(exc)
+            view.save(update_fields=["status", "error_message"])
+            raise QueryExecutionError(str(exc)) from exc
+
+        view.status = "ACTIVE"
+        view.error_message = None
+        view.refresh_time_ms = round((perf_counter_ns() - started_ns) / 1_000_000, 3)
+        view.data_version = self.data_version(connection=view.connection)
+        view.refreshed_at = timezone.now()
+        view.save(update_fields=["status", "error_message", "row_count", "refresh_time_ms", "data_version", "refreshed_at"])
+        return self.describe_materialized_view(view=view)
+
+    def refresh_stale_materialized_views(self, *, connection: DatabaseConnection):
+        """Rebuild every full-refresh view behind the file, then stamp them all with the final version."""
+        current = self.data_version(connection=connection)
+        stale = list(
+            connection.materialized_views.filter(strategy="FULL").exclude(status="FAILED").exclude(data_version=current)
+        )
+        for view in stale:
+            self.refresh_materialized_view(view=view)
+        if stale:
+            connection.materialized_views.filter(pk__in=[view.pk for view in stale], status="ACTIVE").update(
+                data_version=self.data_version(connection=connection)
+            )
+        return len(stale)
+
+    def drop_materialized_view(self, *, view: MaterializedView):
+        try:
+            with closing(self._connect_sqlite(view.connection)) as db:
+                self.materialized_views.drop(db, view.table_name)
+        except sqlite3.Error as exc:
+            raise QueryExecutionError(str(exc)) from exc
+        view.delete()
+
+    def describe_materialized_view(self, *, view: MaterializedView, reason=None):
+        payload = {
+            "id": view.id,
+            "name": view.name,
+            "table": view.table_name,
+            "sql": view.definition,
+            "strategy": view.strategy,
+            "status": view.status,
+            "source_table": view.source_table or None,
+            "refresh_interval_seconds": view.refresh_interval_seconds,
+            "row_count": view.row_count,
+            "refresh_time_ms": view.refresh_time_ms,
+            "error_message": view.error_message,
+            "refreshed_at": view.refreshed_at.isoformat() if view.refreshed_at else None,
+        }
+        if reason:
+            payload["full_refresh_reason"] = reason
+        return payload
+
+    def _matching_materialized_view(self, connection: DatabaseConnection, statement: str):
+        if fingerprint(statement).query_type not in {"SELECT", "WITH"}:
+            return None
+        view = (
+            connection.materialized_views.filter(canonical_sql=canonical_sql(statement))
+            .exclude(status="FAILED")
+            .first()
+        )
+        if view is None or view.strategy == "INCREMENTAL":
+            return view
+
+        # Full-refresh views are only served while no write has landed since they were rebuilt.
+        if view.data_version == self.data_version(connection=connection):
+            return view
+        if view.status == "ACTIVE":
+            connection.materialized_views.filter(pk=view.pk).update(status="STALE")
+        if cache.add(f"infradb:materialized:{connection.pk}:scheduled", True, timeout=view.refresh_interval_seconds):
+            background_runner.submit(
+                f"materialized:{connection.pk}", self.refresh_stale_materialized_views, connection=connection
+            )
+        return None
 
     def history(self, *, actor, limit=50):
         queryset = (
@@ -103,18 +444,121 @@ class QueryExecutionService:
             .select_related("connection")
             .order_by("-created_at")[:limit]
         )
-        return [
-            {
-                "id": str(job.id),
-                "sql": job.sql_query,
-                "status": "SUCCESS" if job.status == "COMPLETED" else job.status,
-                "duration_ms": job.execution_time_ms or 0,
-                "timestamp": job.created_at.isoformat(),
-                "connection_name": job.connection.name,
-                "error_message": job.error_message,
-            }
-            for job in queryset
-        ]
+        return [self._history_item(job) for job in queryset]
+
+    def search_history(self, *, actor, query, connection_id=None, status=None, since=None, until=None, limit=50):
+        """Jobs whose statement or error matches ``query``, best match first, through the FTS5 index.
+
+        Without the index (another database backend, or SQLite built without FTS5) every word must
+        appear in the statement or error, newest first, which costs a scan of the user's jobs.
+        """
+        started_ns = perf_counter_ns()
+        if connection_id is not None:
+            try:
+                connection_id = uuid.UUID(str(connection_id))
+            except ValueError as exc:
+                raise QueryExecutionError("connection_id must be a UUID.") from exc
+        if status is not None:
+            status = "COMPLETED" if status.upper() == "SUCCESS" else status.upper()
+            if status not in {choice for choice, _ in QueryJob.STATUS_CHOICES}:
+                raise QueryExecutionError(f"Unknown job status: {status}.")
+        match = fts_query(query)
+        if match is None:
+            raise QueryExecutionError("Search text must contain at least one word.")
+
+        if search_index_ready():
+            with span("history_search", engine="fts5"):
+                try:
+                    ranked = search_jobs(
+                        match,
+                        user_id=actor.pk,
+                        connection_id=connection_id.hex if connection_id else None,
+                        status=status,
+                        since=since,
+                        until=until,
+                        limit=limit,
+                    )
+                except ValueError as exc:
+                    raise QueryExecutionError(str(exc)) from exc
+                ranked = [(uuid.UUID(job_id), score, snippet) for job_id, score, snippet in ranked]
+                jobs = QueryJob.objects.select_related("connection").in_bulk([row[0] for row in ranked])
+            items = [
+                {**self._history_item(jobs[job_id]), "score": round(-score, 4), "snippet": snippet}
+                for job_id, score, snippet in ranked
+                if job_id in jobs
+            ]
+            engine = "fts5"
+        else:
+            queryset = QueryJob.objects.filter(user=actor).select_related("connection")
+            for word in fts_words(query):
+                queryset = queryset.filter(Q(sql_query__icontains=word) | Q(error_message__icontains=word))
+            if connection_id is not None:
+                queryset = queryset.filter(connection_id=connection_id)
+            if status is not None:
+                queryset = queryset.filter(status=status)
+            if since is not None:
+                queryset = queryset.filter(created_at__gte=since)
+            if until is not None:
+                queryset = queryset.filter(created_at__lt=until)
+            with span("history_search", engine="scan"):
+                items = [self._history_item(job) for job in queryset.order_by("-created_at")[:limit]]
+            engine = "scan"
+        return {
+            "items": items,
+            "engine": engine,
+            "duration_ms": round((perf_counter_ns() - started_ns) / 1_000_000, 3),
+        }
+
+    def _history_item(self, job: QueryJob):
+        return {
+            "id": str(job.id),
+            "sql": job.sql_query,
+            "parameters": job.parameters,
+            "status": "SUCCESS" if job.status == "COMPLETED" else job.status,
+            "duration_ms": job.execution_time_ms or 0,
+            "timestamp": job.created_at.isoformat(),
+            "connection_name": job.connection.name,
+            "error_message": job.error_message,
+        }
+
+    def workload_statistics(self, *, connections, order_by="total_time", limit=50):
+        """Per-fingerprint workload summary, heaviest first, in the spirit of pg_stat_statements."""
+        statement_statistics.flush()
+        queryset = StatementStatistics.objects.filter(connection__in=connections).select_related("connection")
+        items = []
+        for stats in queryset:
+            mean_ms = stats.total_time_ms / stats.calls if stats.calls else None
+            items.append(
+                {
+                    "connection_id": str(stats.connection_id),
+                    "connection_name": stats.connection.name,
+                    "fingerprint_id": stats.fingerprint_id,
+                    "fingerprint": stats.fingerprint,
+                    "query_type": stats.query_type,
+                    "sample_sql": stats.sample_sql,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "total_time_ms": round(stats.total_time_ms, 3),
+                    "mean_time_ms": round(mean_ms, 3) if mean_ms is not None else None,
+                    "min_time_ms": stats.min_time_ms,
+                    "max_time_ms": stats.max_time_ms,
+                    "p95_time_ms": histogram_percentile(stats.latency_histogram, 0.95, stats.max_time_ms),
+                    "rows": stats.rows,
+                    "rows_per_call": round(stats.rows / stats.calls, 3) if stats.calls else None,
+                    "cache_hits": stats.cache_hits,
+                    "cache_hit_ratio": round(stats.cache_hits / stats.calls, 4) if stats.calls else None,
+                    "first_seen": stats.first_seen.isoformat(),
+                    "last_seen": stats.last_seen.isoformat() if stats.last_seen else None,
+                }
+            )
+        key = STATEMENT_ORDERINGS[order_by]
+        items.sort(key=lambda item: item[key] if item[key] is not None else -1, reverse=True)
+        return items[:limit]
+
+    def reset_workload_statistics(self, *, connections):
+        statement_statistics.discard(connection.pk for connection in connections)
+        deleted, _ = StatementStatistics.objects.filter(connection__in=connections).delete()
+        return deleted
 
     def job_status(self, *, job: QueryJob):
         return {
@@ -123,65 +567,374 @@ class QueryExecutionService:
             "execution_time_ms": job.execution_time_ms,
             "rows_affected": job.rows_affected,
             "error_message": job.error_message,
+            "priority": job.priority,
+            "admission": job.admission,
+            "queue_time_ms": job.queue_time_ms,
             "created_at": job.created_at.isoformat(),
             "started_at": job.started_at.isoformat() if job.started_at else None,
             "finished_at": job.finished_at.isoformat() if job.finished_at else None,
         }
 
-    def _execute_sqlite(self, connection: DatabaseConnection, statement: str):
-        query_type = statement.split(None, 1)[0].upper()
-        truncated = False
+    def _execute_approximate(self, connection: DatabaseConnection, statement: str, options: dict):
+        try:
+            plan = plan_aggregate(statement)
+        except ApproximationUnsupported as exc:
+            payload = self._execute_sqlite(connection, statement)
+            payload["approximation"] = {"applied": False, "reason": str(exc)}
+            yield payload
+            return
+
+        engine = ApproximateQueryEngine()
+        columns = [{"name": item.name, "type": "text"} for item in plan.items]
+        try:
+            with closing(self._connect_sqlite(connection)) as db:
+                low, high = engine.population(db, plan)
+                if high - low + 1 < APPROX_MIN_POPULATION_ROWS:
+                    payload = self._execute_sqlite(connection, statement)
+                    payload["approximation"] = {"applied": False, "reason": "Table is small enough to answer exactly."}
+                    yield payload
+                    return
+
+                for snapshot in engine.refine(db, plan, **options):
+                    rows = snapshot.pop("rows")
+                    yield {
+                        "query_type": "SELECT",
+                        "columns": columns,
+                        "rows": rows,
+                        "rows_affected": len(rows),
+                        "truncated": False,
+                        "approximation": {"applied": True, **snapshot},
+                    }
+        except sqlite3.Error as exc:
+            raise QueryExecutionError(str(exc)) from exc
+
+    def data_version(self, *, connection: DatabaseConnection):
+        """Token that changes whenever the SQLite file or its WAL is written, without opening the database."""
+        db_path = Path(connection.file_path)
+        parts = []
+        for path in (db_path, db_path.with_name(f"{db_path.name}-wal")):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                parts.append("0-0")
+            else:
+                parts.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+        return ":".join(parts)
+
+    def schema_version(self, *, connection: DatabaseConnection):
+        """SQLite's schema cookie, read through the pool so it also sees schema changes still in the WAL."""
+        db_path = Path(connection.file_path)
+        if not db_path.is_file():
+            raise FileNotFoundError(f"SQLite database not found: {db_path}")
+        # Opening and closing the file directly would drop this process's POSIX locks on it while
+        # pooled connections still rely on them, letting another process delete a live WAL.
+        try:
+            with self.connection_pool.connection(db_path) as db:
+                return str(db.execute("PRAGMA schema_version").fetchone()[0])
+        except sqlite3.DatabaseError as exc:
+            raise QueryExecutionError(f"Not a SQLite database: {db_path}") from exc
+
+    def history_version(self, *, actor):
+        """Summary that changes whenever a job is added, finishes, is deleted, or its connection is renamed."""
+        summary = QueryJob.objects.filter(user=actor).aggregate(
+            jobs=Count("id"),
+            created=Max("created_at"),
+            finished=Max("finished_at"),
+            connections=Max("connection__updated_at"),
+        )
+        stamps = [stamp for stamp in (summary["created"], summary["finished"], summary["connections"]) if stamp]
+        return summary, max(stamps) if stamps else None
+
+    def _execute_routed(self, connection: DatabaseConnection, statement: str, engine: str, parameters=None, many=False):
+        if engine not in EXECUTION_ENGINES:
+            raise QueryExecutionError(f"Unknown execution engine: {engine}.")
+
+        decision = RouteDecision("sqlite", "SQLite was requested.")
+        columns = None
+        if parameters is not None:
+            # Decided before opening a routing connection, so bound point lookups go straight to the pool.
+            decision = RouteDecision("sqlite", "Bound parameters run on SQLite.")
+        elif engine != "sqlite" and fingerprint(statement).query_type in {"SELECT", "WITH"}:
+            if not self.analytics_pool.available:
+                decision = RouteDecision("sqlite", self.analytics_pool.unavailable_reason)
+            else:
+                self._validate_sqlite(connection)
+                # Routing costs an EXPLAIN and a statistics read, so decisions are reused until the file changes.
+                route_key = "route:" + hashlib.sha1(
+                    json.dumps([self.data_version(connection=connection), fingerprint(statement).id]).encode()
+                ).hexdigest()
+                cached = cache.get(route_key) if engine == "auto" else None
+                with span("route", cached=cached is not None), self.connection_pool.connection(connection.file_path) as db:
+                    try:
+                        if cached is not None:
+                            decision = RouteDecision(**cached)
+                        elif engine == "auto":
+                            decision = route_statement(db, statement)
+                            cache.set(route_key, decision.as_dict(), ROUTE_CACHE_TIMEOUT_SECONDS)
+                        else:
+                            decision = RouteDecision("duckdb", "DuckDB was requested.")
+                        if decision.engine == "duckdb":
+                            # LIMIT 0 stops before the first row, so this only prepares the statement
+                            # to borrow SQLite's result column names.
+                            cursor = db.execute(f"SELECT * FROM ({statement.rstrip(';')}) LIMIT 0")
+                            columns = [item[0] for item in cursor.description or []]
+                    except sqlite3.Error as exc:
+                        raise QueryExecutionError(str(exc)) from exc
+
+        if decision.engine == "duckdb":
+            try:
+                with span("duckdb"):
+                    rows = self.analytics_pool.execute(connection.file_path, statement.rstrip(";"), ROW_PREVIEW_LIMIT)
+            except AnalyticsEngineError as exc:
+                decision = RouteDecision("sqlite", f"DuckDB could not run the statement: {exc}", decision.scanned_rows)
+            else:
+                truncated = len(rows) > ROW_PREVIEW_LIMIT
+                rows = [dict(zip(columns, row)) for row in rows[:ROW_PREVIEW_LIMIT]]
+                return {
+                    "query_type": fingerprint(statement).query_type,
+                    "columns": [{"name": name, "type": "text"} for name in columns],
+                    "rows": rows,
+                    "rows_affected": len(rows),
+                    "truncated": truncated,
+                    "engine": "duckdb",
+                    "routing": decision.as_dict(),
+                }
+
+        payload = self._execute_sqlite(connection, statement, parameters, many)
+        payload["engine"] = "sqlite"
+        payload["routing"] = decision.as_dict()
+        return payload
+
+    def _execute_parallel(self, connection: DatabaseConnection, statement: str, parallelism: int):
+        """Scan rowid partitions of a single-table aggregate on the process pool and merge the partials."""
+        try:
+            plan = plan_aggregate(statement, extrema=True)
+        except ApproximationUnsupported as exc:
+            payload = self._execute_sqlite(connection, statement)
+            payload["parallel"] = {"applied": False, "reason": str(exc)}
+            return payload
+
+        try:
+            with closing(self._connect_sqlite(connection)) as db:
+                low, high = ApproximateQueryEngine().population(db, plan)
+        except sqlite3.Error as exc:
+            raise QueryExecutionError(str(exc)) from exc
+        if high - low + 1 < PARALLEL_MIN_ROWS:
+            payload = self._execute_sqlite(connection, statement)
+            payload["parallel"] = {"applied": False, "reason": "Table is too small to benefit from parallel scans."}
+            return payload
+
+        try:
+            with span("parallel_scan", parallelism=parallelism):
+                rows, report = self.parallel_executor.execute(connection.file_path, plan, low, high, parallelism)
+        except (ParallelExecutionError, sqlite3.Error) as exc:
+            raise QueryExecutionError(str(exc)) from exc
+
+        return {
+            "query_type": "SELECT",
+            "columns": [{"name": item.name, "type": "text"} for item in plan.items],
+            "rows": rows[:ROW_PREVIEW_LIMIT],
+            "rows_affected": min(len(rows), ROW_PREVIEW_LIMIT),
+            "truncated": len(rows) > ROW_PREVIEW_LIMIT,
+            "parallel": {"applied": True, "max_parallelism": MAX_PARALLELISM, **report},
+        }
+
+    def _execute_federated(self, connection: DatabaseConnection, statement: str, attachments: dict, parameters=None):
+        """Run a read query with other workspace connections attached read-only under their aliases."""
+        query_type = fingerprint(statement).query_type
+        if query_type not in READ_QUERY_PREFIXES:
+            raise QueryExecutionError("Federated queries are read-only.")
+        for attached in [connection, *attachments.values()]:
+            if attached.engine != "SQLITE":
+                raise QueryExecutionError(f"{attached.name}: {attached.engine} connections cannot be attached.")
+            if not Path(attached.file_path).exists():
+                raise QueryExecutionError(f"SQLite database not found: {attached.file_path}")
+
+        paths = {alias: attached.file_path for alias, attached in attachments.items()}
+        try:
+            with self.federated_pool.session(connection.file_path, paths) as (db, session):
+                with span("execute", query_type=query_type):
+                    cursor = db.execute(statement, () if parameters is None else parameters)
+                payload = self._read_payload(cursor, query_type)
+        except (FederationError, sqlite3.Error) as exc:
+            raise QueryExecutionError(str(exc)) from exc
+
+        payload["federation"] = {
+            "attached": {
+                alias: {"connection_id": str(attached.id), "name": attached.name}
+                for alias, attached in attachments.items()
+            },
+            **session,
+        }
+        return payload
+
+    def _execute_sqlite(self, connection: DatabaseConnection, statement: str, parameters=None, many=False):
+        query_type = fingerprint(statement).query_type
 
-        with self._connect_sqlite(connection) as db:
+        self._validate_sqlite(connection)
+        if query_type in GROUP_COMMIT_STATEMENTS and self.group_committer.enabled and not many:
             try:
-                cursor = db.cursor()
-                cursor.execute(statement)
+                with span("group_commit"):
+                    write = self.group_committer.execute(connection.file_path, statement, parameters or ())
             except sqlite3.Error as exc:
                 raise QueryExecutionError(str(exc)) from exc
+            return {
+                "query_type": query_type,
+                "columns": [],
+                "rows": [],
+                "rows_affected": write.rowcount,
+                "truncated": False,
+                "group_commit": write.as_dict(),
+            }
 
-            if query_type in READ_QUERY_PREFIXES:
-                columns = [{"name": item[0], "type": "text"} for item in (cursor.description or [])]
-                rows = [dict(row) for row in cursor.fetchmany(ROW_PREVIEW_LIMIT + 1)]
-                if len(rows) > ROW_PREVIEW_LIMIT:
-                    truncated = True
-                    rows = rows[:ROW_PREVIEW_LIMIT]
-                rows_affected = len(rows)
+        # PRAGMAs, ATTACH, TEMP objects and writes can leave state on the connection that would
+        # carry over to the next user of a pooled one, so only plain reads share connections.
+        reuse = query_type in SESSION_SAFE_STATEMENTS
+        with self.connection_pool.connection(connection.file_path, reuse=reuse) as db:
+            mark = db.statement_cache.mark()
+            if many and query_type in READ_QUERY_PREFIXES:
+                payload = self._read_batch(db, statement, parameters, query_type)
             else:
-                db.commit()
-                columns = []
-                rows = []
-                rows_affected = cursor.rowcount if cursor.rowcount != -1 else 0
+                try:
+                    with span("execute", query_type=query_type):
+                        if many:
+                            cursor = db.executemany(statement, parameters)
+                        else:
+                            cursor = db.execute(statement, () if parameters is None else parameters)
+                except sqlite3.Error as exc:
+                    raise QueryExecutionError(str(exc)) from exc
+
+                if query_type in READ_QUERY_PREFIXES:
+                    payload = self._read_payload(cursor, query_type)
+                else:
+                    with span("commit"):
+                        db.commit()
+                    payload = {
+                        "query_type": query_type,
+                        "columns": [],
+                        "rows": [],
+                        "rows_affected": cursor.rowcount if cursor.rowcount != -1 else 0,
+                        "truncated": False,
+                    }
+                    if many:
+                        payload["batch"] = {"parameter_sets": len(parameters)}
+            payload["statement_cache"] = db.statement_cache.since(mark)
+            return payload
+
+    def _execute_downsampled(self, connection: DatabaseConnection, statement: str, parameters, spec: DownsampleSpec):
+        """Stream a read statement's x/y series through a downsampler instead of truncating it at the preview limit."""
+        query_type = fingerprint(statement).query_type
+        if query_type not in {"SELECT", "WITH"}:
+            raise QueryExecutionError("Only SELECT statements can be downsampled.")
+
+        self._validate_sqlite(connection)
+        with self.connection_pool.connection(connection.file_path) as db:
+            try:
+                with span("downsample", method=spec.method, points=spec.points) as current:
+                    payload = downsample_query(db, statement, parameters, spec)
+                    if current is not None:
+                        current.attributes["source_rows"] = payload["downsampling"]["source_rows"]
+            except (sqlite3.Error, ValueError) as exc:
+                raise QueryExecutionError(str(exc)) from exc
+        return {
+            "query_type": query_type,
+            "rows_affected": len(payload["rows"]),
+            "truncated": False,
+            **payload,
+        }
+
+    def _read_batch(self, db, statement: str, parameter_sets, query_type: str):
+        """Run one read statement per parameter set on a single connection, reusing its compiled form."""
+        results = []
+        for parameters in parameter_sets:
+            try:
+                with span("execute", query_type=query_type):
+                    cursor = db.execute(statement, parameters)
+            except sqlite3.Error as exc:
+                raise QueryExecutionError(f"Parameter set {len(results)}: {exc}") from exc
+            results.append(self._read_payload(cursor, query_type))
+        return {
+            "query_type": query_type,
+            "columns": results[0]["columns"],
+            "rows": [],
+            "rows_affected": sum(item["rows_affected"] for item in results),
+            "truncated": any(item["truncated"] for item in results),
+            "batch": {
+                "parameter_sets": len(results),
+                "results": [
+                    {"results": item["rows"], "rows_returned": len(item["rows"]), "truncated": item["truncated"]}
+                    for item in results
+                ],
+            },
+        }
 
+    def _read_payload(self, cursor, query_type: str):
+        columns = [{"name": item[0], "type": "text"} for item in (cursor.description or [])]
+        with span("materialize") as current:
+            rows = [dict(row) for row in cursor.fetchmany(ROW_PREVIEW_LIMIT + 1)]
+            # Closing resets the statement, so a pooled connection does not pin an old WAL snapshot.
+            cursor.close()
+            if current is not None:
+                current.attributes["rows"] = len(rows)
+        truncated = len(rows) > ROW_PREVIEW_LIMIT
+        rows = rows[:ROW_PREVIEW_LIMIT]
         return {
             "query_type": query_type,
             "columns": columns,
             "rows": rows,
-            "rows_affected": rows_affected,
+            "rows_affected": len(rows),
             "truncated": truncated,
         }
 
     def _connect_sqlite(self, connection: DatabaseConnection):
+        return configure_sqlite(sqlite3.connect(self._validate_sqlite(connection)))
+
+    def _validate_sqlite(self, connection: DatabaseConnection):
         if connection.engine != "SQLITE":
             raise QueryExecutionError(f"{connection.engine} execution is not configured in this deployment.")
 
         db_path = Path(connection.file_path)
         if not db_path.exists():
             raise QueryExecutionError(f"SQLite database not found: {db_path}")
+        return db_path
+
+    def _downsample_spec(self, visualization):
+        if visualization is None:
+            return None
+        try:
+            return DownsampleSpec.from_options(visualization)
+        except ValueError as exc:
+            raise QueryExecutionError(str(exc)) from exc
+
+    def _bind_parameters(self, parameters, many=False):
+        """Check JSON parameters and shape them for sqlite3: a tuple of positional or a dict of named values."""
+        if parameters is None:
+            return None
+        if many:
+            if not isinstance(parameters, list) or not parameters:
+                raise QueryExecutionError("A batch needs a non-empty list of parameter sets.")
+            if len(parameters) > MAX_BATCH_PARAMETER_SETS:
+                raise QueryExecutionError(f"A batch holds at most {MAX_BATCH_PARAMETER_SETS} parameter sets.")
+            return [self._bind_parameters(item) for item in parameters]
 
-        db = sqlite3.connect(db_path)
-        db.row_factory = sqlite3.Row
-        db.execute("PRAGMA journal_mode=WAL;")
-        db.execute("PRAGMA synchronous=NORMAL;")
-        db.execute("PRAGMA temp_store=MEMORY;")
-        db.execute("PRAGMA foreign_keys=ON;")
-        return db
+        if isinstance(parameters, dict):
+            values = parameters.values()
+            bound = dict(parameters)
+        elif isinstance(parameters, list):
+            values = bound = tuple(parameters)
+        else:
+            raise QueryExecutionError("parameters must be a list of positional values or an object of named values.")
+        if any(value is not None and not isinstance(value, (str, int, float)) for value in values):
+            raise QueryExecutionError("Parameter values must be strings, numbers, booleans or null.")
+        return bound
 
     def _normalize_statement(self, sql: str):
         statement = (sql or "").strip()
         if not statement:
             raise QueryExecutionError("SQL statement is empty.")
 
-        trimmed = statement[:-1] if statement.endswith(";") else statement
-        if ";" in trimmed:
+        separators = [token for token in tokenize(statement) if token.kind == "op" and token.value == ";"]
+        # Only a trailing separator is allowed; semicolons inside literals and comments are not separators.
+        if len(separators) > 1 or (separators and separators[-1].end < len(statement)):
             raise QueryExecutionError("Only a single SQL statement is supported per execution.")
         return statement
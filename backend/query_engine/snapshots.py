@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import gzip
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from urllib.parse import quote
+
+from django.conf import settings
+
+from .background import background_runner
+from .tracing import span
+
+
+SNAPSHOT_PAGES_PER_STEP = 256
+SNAPSHOT_MAX_PAGES_PER_STEP = 65_536
+# Pause between backup steps so writers and checkpoints get the file between page batches.
+SNAPSHOT_STEP_PAUSE_SECONDS = 0.002
+SNAPSHOT_BUSY_TIMEOUT_SECONDS = 5.0
+SNAPSHOT_COMPRESS_CHUNK_BYTES = 1024 * 1024
+# Pages compress well even at the fastest level, which keeps gzip from dwarfing the copy itself.
+SNAPSHOT_COMPRESS_LEVEL = 1
+SNAPSHOT_SUFFIXES = (".sqlite3", ".sqlite3.gz")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+@dataclass
+class BackupProgress:
+    pages_total: int = 0
+    pages_copied: int = 0
+    page_size: int = 0
+    steps: int = 0
+    restarts: int = 0
+    started: float = field(default_factory=perf_counter)
+    finished: float | None = None
+
+    @property
+    def duration_ms(self):
+        return round(((self.finished or perf_counter()) - self.started) * 1000, 3)
+
+    def as_dict(self):
+        seconds = self.duration_ms / 1000
+        copied_bytes = self.pages_copied * self.page_size
+        return {
+            "pages_total": self.pages_total,
+            "pages_copied": self.pages_copied,
+            "percent": round(100 * self.pages_copied / self.pages_total, 1) if self.pages_total else 0.0,
+            "bytes_copied": copied_bytes,
+            "steps": self.steps,
+            "restarts": self.restarts,
+            "duration_ms": self.duration_ms,
+            "throughput_mb_s": round(copied_bytes / seconds / 1_000_000, 2) if seconds else None,
+        }
+
+
+def backup_database(
+    source,
+    target,
+    *,
+    pages_per_step: int = SNAPSHOT_PAGES_PER_STEP,
+    pause: float = SNAPSHOT_STEP_PAUSE_SECONDS,
+    on_progress=None,
+):
+    """Copy a live SQLite file page batch by page batch with the online backup API.
+
+    A WAL source is copied inside one read transaction, so the copy is the state at its start and
+    concurrent commits neither block nor restart it. In rollback-journal mode a shared lock would
+    stall writers, so each step locks on its own and a commit in between restarts the copy.
+    """
+    progress = BackupProgress()
+    uri = f"file:{quote(str(Path(source).resolve()))}?mode=ro"
+    with closing(sqlite3.connect(uri, uri=True, timeout=SNAPSHOT_BUSY_TIMEOUT_SECONDS)) as src:
+        progress.page_size = src.execute("PRAGMA page_size").fetchone()[0]
+        if src.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+            src.execute("BEGIN")
+            src.execute("SELECT count(*) FROM sqlite_master").fetchone()
+
+        def step(status, remaining, total):
+            copied = total - remaining
+            if copied < progress.pages_copied:
+                progress.restarts += 1
+            progress.pages_total = total
+            progress.pages_copied = copied
+            progress.steps += 1
+            if on_progress is not None:
+                on_progress(progress)
+            if remaining and pause:
+                time.sleep(pause)
+
+        with closing(sqlite3.connect(target)) as dst:
+            src.backup(dst, pages=pages_per_step, progress=step)
+        if src.in_transaction:
+            src.rollback()
+    progress.finished = perf_counter()
+    return progress
+
+
+def compress_file(source: Path, target: Path):
+    with open(source, "rb") as raw, gzip.open(target, "wb", compresslevel=SNAPSHOT_COMPRESS_LEVEL) as packed:
+        shutil.copyfileobj(raw, packed, SNAPSHOT_COMPRESS_CHUNK_BYTES)
+
+
+@contextmanager
+def point_in_time_copy(source, **options):
+    """A private, writable copy of ``source`` in a temporary directory, removed on exit."""
+    with tempfile.TemporaryDirectory(prefix="infradb-copy-") as workdir:
+        copy_path = Path(workdir) / "copy.sqlite3"
+        backup_database(source, copy_path, **options)
+        yield copy_path
+
+
+class SnapshotService:
+    """Writes consistent snapshots of connection files to the snapshot directory in the background."""
+
+    def __init__(self):
+        self._progress = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        return Path(getattr(settings, "INFRADB_SNAPSHOT_DIR", Path(settings.BASE_DIR) / "user_databases" / "snapshots"))
+
+    def start(self, *, connection, compress: bool = False, pages_per_step=None, wait: bool = False):
+        source = Path(connection.file_path)
+        if connection.engine != "SQLITE":
+            raise SnapshotError(f"Snapshots are not configured for {connection.engine}.")
+        if not source.is_file():
+            raise SnapshotError(f"SQLite database not found: {source}")
+        try:
+            pages_per_step = int(pages_per_step or SNAPSHOT_PAGES_PER_STEP)
+        except (TypeError, ValueError) as exc:
+            raise SnapshotError("pages_per_step must be an integer.") from exc
+        pages_per_step = max(1, min(pages_per_step, SNAPSHOT_MAX_PAGES_PER_STEP))
+
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        target = self.directory / f"{connection.pk}-{stamp}{SNAPSHOT_SUFFIXES[1 if compress else 0]}"
+        key = self._job_key(connection)
+        if wait:
+            # Claimed like a background job, so a concurrent snapshot of this connection is turned away either way.
+            with background_runner.claim(key) as claimed:
+                if not claimed:
+                    raise SnapshotError("A snapshot of this connection is already running.")
+                self._take(connection.pk, source, target, compress, pages_per_step)
+        elif not background_runner.submit(key, self._take, connection.pk, source, target, compress, pages_per_step):
+            raise SnapshotError("A snapshot of this connection is already running.")
+        return self.status(connection=connection)
+
+    def status(self, *, connection):
+        with self._lock:
+            current = self._progress.get(connection.pk)
+            current = dict(current) if current else None
+        return {
+            "connection_id": str(connection.id),
+            "running": background_runner.is_running(self._job_key(connection)),
+            "current": current,
+            "snapshots": self.snapshots(connection=connection),
+        }
+
+    def snapshots(self, *, connection):
+        if not self.directory.is_dir():
+            return []
+        items = []
+        for path in sorted(self.directory.glob(f"{connection.pk}-*"), reverse=True):
+            if not path.name.endswith(SNAPSHOT_SUFFIXES):
+                continue
+            stat = path.stat()
+            items.append(
+                {
+                    "name": path.name,
+                    "path": str(path),
+                    "size_bytes": stat.st_size,
+                    "compressed": path.suffix == ".gz",
+                    "created_at": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+                }
+            )
+        return items
+
+    def _take(self, connection_id, source: Path, target: Path, compress: bool, pages_per_step: int):
+        state = {
+            "name": target.name,
+            "status": "running",
+            "compressed": compress,
+            "pages_per_step": pages_per_step,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self._publish(connection_id, state)
+        # Pages land in hidden partial files so listings never show a half-written snapshot.
+        partial = target.with_name(f".{target.name}.partial")
+        raw = target.with_name(f".{target.name}.raw") if compress else partial
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with span("snapshot", compress=compress):
+                progress = backup_database(
+                    source,
+                    raw,
+                    pages_per_step=pages_per_step,
+                    on_progress=lambda item: self._publish(connection_id, {**state, **item.as_dict()}),
+                )
+                state.update(progress.as_dict())
+                if compress:
+                    self._publish(connection_id, {**state, "status": "compressing"})
+                    started = perf_counter()
+                    compress_file(raw, partial)
+                    raw.unlink()
+                    state["compress_ms"] = round((perf_counter() - started) * 1000, 3)
+                size = partial.stat().st_size
+                partial.rename(target)
+        except (OSError, sqlite3.Error) as exc:
+            raw.unlink(missing_ok=True)
+            partial.unlink(missing_ok=True)
+            self._publish(connection_id, {**state, "status": "failed", "error": str(exc)})
+            raise SnapshotError(f"Snapshot failed: {exc}") from exc
+
+        state.update(status="completed", size_bytes=size, finished_at=datetime.now(timezone.utc).isoformat())
+        self._publish(connection_id, state)
+        return state
+
+    def _publish(self, connection_id, state):
+        with self._lock:
+            self._progress[connection_id] = state
+
+    def _job_key(self, connection):
+        return f"snapshot:{connection.pk}"
+
+
+snapshot_service = SnapshotService()
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?(?:\*/|$))
+    | (?P<blob>[xX]'[0-9a-fA-F]*')
+    | (?P<string>'(?:[^']|'')*')
+    | (?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\])
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|0[xX][0-9a-fA-F]+)
+    | (?P<param>\?\d*|[:@$][A-Za-z_][A-Za-z0-9_]*)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<op>\|\||<<|>>|<=|>=|==|!=|<>|[-+*/%&|~<>=(),.;])
+    | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+KEYWORDS = frozenset(
+    """
+    ABORT ALL ALTER ANALYZE AND AS ASC ATTACH BEGIN BETWEEN BY CASE CAST COLLATE COMMIT CREATE
+    CROSS CURRENT_DATE CURRENT_TIME CURRENT_TIMESTAMP DEFAULT DELETE DESC DETACH DISTINCT DROP
+    ELSE END ESCAPE EXCEPT EXISTS EXPLAIN FILTER FROM FULL GLOB GROUP HAVING IF IN INDEX INDEXED
+    INNER INSERT INTERSECT INTO IS ISNULL JOIN LEFT LIKE LIMIT MATCH NATURAL NOT NOTNULL NULL
+    OFFSET ON OR ORDER OUTER OVER PARTITION PLAN PRAGMA QUERY RECURSIVE REGEXP REINDEX RELEASE
+    RENAME REPLACE RETURNING RIGHT ROLLBACK SAVEPOINT SELECT SET TABLE THEN TO TRANSACTION TRIGGER
+    UNION UPDATE USING VACUUM VALUES VIEW WHEN WHERE WINDOW WITH WITHOUT
+    """.split()
+)
+
+CLAUSE_KEYWORDS = frozenset(
+    {"SELECT", "FROM", "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "OFFSET", "UNION", "EXCEPT",
+     "INTERSECT", "WINDOW", "RETURNING", "SET", "VALUES", "ON", "USING"}
+)
+JOIN_KEYWORDS = frozenset({"JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL", "OUTER"})
+EQUALITY_OPERATORS = frozenset({"=", "==", "IN", "IS"})
+RANGE_OPERATORS = frozenset({"<", ">", "<=", ">=", "BETWEEN", "LIKE", "GLOB"})
+LITERAL_KINDS = frozenset({"string", "number", "blob", "param"})
+FINGERPRINT_CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str
+    value: str
+    start: int = field(default=-1, compare=False)
+    end: int = field(default=-1, compare=False)
+
+    @property
+    def upper(self):
+        return self.value.upper()
+
+    def is_keyword(self, *names):
+        return self.kind == "keyword" and (not names or self.upper in names)
+
+
+@dataclass(frozen=True)
+class ColumnRef:
+    qualifier: str | None
+    column: str
+
+
+@dataclass
+class StatementShape:
+    tables: dict = field(default_factory=dict)
+    equality: list = field(default_factory=list)
+    ranges: list = field(default_factory=list)
+    joins: list = field(default_factory=list)
+    order_by: list = field(default_factory=list)
+    group_by: list = field(default_factory=list)
+
+    def resolve(self, ref: ColumnRef, columns_by_table: dict):
+        """Return the table a column reference belongs to, or None when it cannot be resolved."""
+        if ref.qualifier:
+            table = self.tables.get(ref.qualifier.lower())
+            return table if table in columns_by_table else None
+
+        candidates = [
+            table
+            for table in dict.fromkeys(self.tables.values())
+            if ref.column.lower() in columns_by_table.get(table, ())
+        ]
+        return candidates[0] if len(candidates) == 1 else None
+
+
+def tokenize(sql: str):
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(sql or ""):
+        kind = match.lastgroup
+        value = match.group()
+        if kind in {"ws", "comment"}:
+            continue
+        if kind == "word":
+            kind = "keyword" if value.upper() in KEYWORDS else "identifier"
+        elif kind == "quoted":
+            kind = "identifier"
+            value = value[1:-1]
+        tokens.append(Token(kind, value, match.start(), match.end()))
+    return tokens
+
+
+def canonical_sql(sql: str):
+    """Whitespace-, comment- and case-insensitive form of a statement; literals are kept verbatim."""
+    parts = []
+    for token in tokenize(sql):
+        if token.kind == "keyword":
+            parts.append(token.upper)
+        elif token.kind == "identifier":
+            parts.append(f'"{token.value.lower()}"')
+        else:
+            parts.append(token.value)
+    while parts and parts[-1] == ";":
+        parts.pop()
+    return " ".join(parts)
+
+
+@dataclass(frozen=True)
+class Fingerprint:
+    id: str
+    text: str
+    query_type: str
+
+
+@lru_cache(maxsize=FINGERPRINT_CACHE_SIZE)
+def fingerprint(sql: str):
+    """Literal-free form of a statement, so variants that differ only in constants group together."""
+    tokens = tokenize(sql)
+    parts = []
+    for index, token in enumerate(tokens):
+        if token.kind in LITERAL_KINDS:
+            signed = parts[-1:] in (["-"], ["+"])
+            if signed and (len(parts) < 2 or parts[-2] in {"(", ",", "="} or parts[-2].isupper()):
+                # A signed constant is one literal, not an operator applied to one.
+                parts.pop()
+            parts.append("?")
+        elif token.kind == "keyword":
+            parts.append(token.upper)
+        elif token.kind == "identifier":
+            parts.append(token.value.lower())
+        else:
+            parts.append(token.value)
+    while parts and parts[-1] == ";":
+        parts.pop()
+
+    text = " ".join(_collapse_lists(parts))
+    query_type = tokens[0].upper if tokens else ""
+    return Fingerprint(hashlib.sha1(text.encode()).hexdigest()[:16], text, query_type)
+
+
+def _collapse_lists(parts):
+    """Fold ``IN (?, ?, ...)`` and repeated ``VALUES (...), (...)`` rows to a single entry."""
+    collapsed = []
+    index = 0
+    while index < len(parts):
+        if parts[index] != "(" or not collapsed or collapsed[-1] not in {"IN", "VALUES"}:
+            collapsed.append(parts[index])
+            index += 1
+            continue
+
+        keyword = collapsed[-1]
+        end = _closing_paren(parts, index)
+        row = parts[index:end]
+        if keyword == "IN" and set(row[1:-1]) <= {"?", ","}:
+            collapsed += ["(", "?", "...", ")"]
+        elif row[-1] == ")":
+            collapsed += ["(", *_collapse_lists(row[1:-1]), ")"]
+        else:
+            collapsed += row
+        index = end
+        if keyword == "VALUES":
+            while parts[index : index + 1] == [","] and parts[index + 1 : index + 1 + len(row)] == row:
+                index += 1 + len(row)
+    return collapsed
+
+
+def _closing_paren(parts, index):
+    depth = 0
+    for position in range(index, len(parts)):
+        depth += {"(": 1, ")": -1}.get(parts[position], 0)
+        if depth == 0:
+            return position + 1
+    return len(parts)
+
+
+def extract_shape(sql: str):
+    """Collect the tables, filter, join, sort and grouping columns referenced by a statement."""
+    tokens = tokenize(sql)
+    shape = StatementShape()
+    clause = None
+    index = 0
+
+    while index < len(tokens):
+        token = tokens[index]
+
+        if token.is_keyword("FROM", "JOIN", "UPDATE", "INTO"):
+            clause = "from" if token.is_keyword("FROM", "JOIN") else None
+            index = _read_table(tokens, index + 1, shape)
+            continue
+        if token.is_keyword("GROUP", "ORDER") and _peek_keyword(tokens, index + 1, "BY"):
+            clause = token.upper.lower()
+            index += 2
+            continue
+        if token.is_keyword("WHERE", "ON", "HAVING"):
+            clause = "predicate"
+        elif token.is_keyword(*CLAUSE_KEYWORDS) or token.is_keyword(*JOIN_KEYWORDS):
+            clause = None
+        elif token.kind == "op" and token.value == "," and clause == "from":
+            index = _read_table(tokens, index + 1, shape)
+            continue
+        elif clause == "predicate":
+            index = _read_predicate(tokens, index, shape)
+            continue
+        elif clause in {"order", "group"}:
+            ref, next_index = _read_column(tokens, index)
+            if ref is not None:
+                (shape.order_by if clause == "order" else shape.group_by).append(ref)
+                index = next_index
+                continue
+
+        index += 1
+
+    return shape
+
+
+def _peek_keyword(tokens, index, name):
+    return index < len(tokens) and tokens[index].is_keyword(name)
+
+
+def _read_table(tokens, index, shape):
+    if index >= len(tokens) or tokens[index].kind != "identifier":
+        return index
+
+    name = tokens[index].value
+    index += 1
+    if index + 1 < len(tokens) and tokens[index].value == "." and tokens[index + 1].kind == "identifier":
+        name = tokens[index + 1].value
+        index += 2
+
+    alias = name
+    if _peek_keyword(tokens, index, "AS"):
+        index += 1
+    if index < len(tokens) and tokens[index].kind == "identifier":
+        alias = tokens[index].value
+        index += 1
+
+    shape.tables[name.lower()] = name.lower()
+    shape.tables[alias.lower()] = name.lower()
+    return index
+
+
+def _read_column(tokens, index):
+    if index >= len(tokens) or tokens[index].kind != "identifier":
+        return None, index
+    if index + 2 < len(tokens) and tokens[index + 1].value == "." and tokens[index + 2].kind == "identifier":
+        return ColumnRef(tokens[index].value.lower(), tokens[index + 2].value.lower()), index + 3
+    if index + 1 < len(tokens) and tokens[index + 1].value in {"(", "."}:
+        return None, index
+    return ColumnRef(None, tokens[index].value.lower()), index + 1
+
+
+def _read_operator(tokens, index):
+    if index >= len(tokens):
+        return None, index
+    token = tokens[index]
+    if token.is_keyword("NOT") and index + 1 < len(tokens):
+        # NOT IN / NOT LIKE cannot use an index seek, so they never become candidates.
+        return None, index + 1
+    if token.is_keyword("IS") and _peek_keyword(tokens, index + 1, "NOT"):
+        return None, index + 2
+    if token.kind == "op" and token.value in EQUALITY_OPERATORS | RANGE_OPERATORS:
+        return token.value, index + 1
+    if token.is_keyword(*(EQUALITY_OPERATORS | RANGE_OPERATORS)):
+        return token.upper, index + 1
+    return None, index
+
+
+def _read_predicate(tokens, index, shape):
+    left, after_left = _read_column(tokens, index)
+    if left is None:
+        return index + 1
+
+    operator, after_operator = _read_operator(tokens, after_left)
+    if operator is None:
+        return max(after_left, index + 1)
+
+    right, after_right = _read_column(tokens, after_operator)
+    if right is not None and operator in {"=", "=="}:
+        shape.joins.append((left, right))
+        return after_right
+
+    if operator in EQUALITY_OPERATORS:
+        shape.equality.append(left)
+    else:
+        shape.ranges.append(left)
+    return after_operator
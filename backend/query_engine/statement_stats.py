@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from time import monotonic
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .background import background_runner
+from .models import StatementStatistics
+from .sql_analysis import Fingerprint
+
+
+# Upper bounds of the latency histogram; the last bucket catches everything slower.
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 30_000)
+STATISTICS_FLUSH_SECONDS = 10
+
+
+def _bucket(duration_ms: float):
+    return bisect_left(LATENCY_BUCKETS_MS, duration_ms)
+
+
+def _merge_histograms(first, second):
+    width = len(LATENCY_BUCKETS_MS) + 1
+    first = list(first or []) + [0] * (width - len(first or []))
+    for index, count in enumerate(second or []):
+        first[index] += count
+    return first
+
+
+def _extreme(pick, *values):
+    present = [value for value in values if value is not None]
+    return pick(present) if present else None
+
+
+def histogram_percentile(histogram, fraction: float, max_ms: float | None = None):
+    """Upper bound of the bucket holding the given fraction of calls, capped at the slowest call seen."""
+    total = sum(histogram or [])
+    if not total:
+        return None
+    threshold = total * fraction
+    running = 0
+    for index, count in enumerate(histogram):
+        running += count
+        if running >= threshold:
+            bound = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else max_ms
+            return min(bound, max_ms) if max_ms is not None and bound is not None else bound
+    return max_ms
+
+
+@dataclass
+class PendingStatement:
+    fingerprint: Fingerprint
+    sample_sql: str
+    calls: int = 0
+    errors: int = 0
+    total_time_ms: float = 0.0
+    min_time_ms: float | None = None
+    max_time_ms: float | None = None
+    histogram: list = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    rows: int = 0
+    cache_hits: int = 0
+    last_seen: object = None
+
+
+class StatementStatisticsCollector:
+    """Accumulates per-(connection, fingerprint) counters in memory and merges them into the database in batches."""
+
+    def __init__(self, flush_interval: float = STATISTICS_FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = monotonic()
+
+    def record(
+        self,
+        *,
+        connection_id,
+        fingerprint: Fingerprint,
+        sql: str,
+        duration_ms: float,
+        rows: int = 0,
+        cache_hit: bool = False,
+        failed: bool = False,
+    ):
+        with self._lock:
+            entry = self._pending.get((connection_id, fingerprint.id))
+            if entry is None:
+                entry = self._pending[(connection_id, fingerprint.id)] = PendingStatement(fingerprint, sql)
+            entry.last_seen = timezone.now()
+            if failed:
+                entry.errors += 1
+            else:
+                entry.calls += 1
+                entry.total_time_ms += duration_ms
+                entry.min_time_ms = _extreme(min, entry.min_time_ms, duration_ms)
+                entry.max_time_ms = _extreme(max, entry.max_time_ms, duration_ms)
+                entry.histogram[_bucket(duration_ms)] += 1
+                entry.rows += rows or 0
+                entry.cache_hits += int(cache_hit)
+            due = monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                self._last_flush = monotonic()
+        if due:
+            background_runner.submit("statement-statistics", self.flush)
+
+    def flush(self):
+        """Merge everything recorded so far into StatementStatistics rows."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._last_flush = monotonic()
+            for index, ((connection_id, fingerprint_id), entry) in enumerate(pending.items()):
+                try:
+                    self._merge(connection_id, fingerprint_id, entry)
+                except IntegrityError:
+                    # The connection was deleted after these calls were recorded.
+                    continue
+                except Exception:
+                    # Keep unsaved counters for the next flush rather than losing them.
+                    with self._lock:
+                        for key, item in list(pending.items())[index:]:
+                            self._requeue(key, item)
+                    raise
+        return len(pending)
+
+    def discard(self, connection_ids=None):
+        with self._lock:
+            if connection_ids is None:
+                self._pending.clear()
+            else:
+                wanted = {str(connection_id) for connection_id in connection_ids}
+                for key in [key for key in self._pending if str(key[0]) in wanted]:
+                    del self._pending[key]
+
+    def _merge(self, connection_id, fingerprint_id, entry: PendingStatement):
+        with transaction.atomic():
+            stats, _ = StatementStatistics.objects.select_for_update().get_or_create(
+                connection_id=connection_id,
+                fingerprint_id=fingerprint_id,
+                defaults={
+                    "fingerprint": entry.fingerprint.text,
+                    "query_type": entry.fingerprint.query_type,
+                },
+            )
+            stats.sample_sql = entry.sample_sql
+            stats.calls += entry.calls
+            stats.errors += entry.errors
+            stats.total_time_ms += entry.total_time_ms
+            stats.rows += entry.rows
+            stats.cache_hits += entry.cache_hits
+            stats.min_time_ms = _extreme(min, stats.min_time_ms, entry.min_time_ms)
+            stats.max_time_ms = _extreme(max, stats.max_time_ms, entry.max_time_ms)
+            stats.latency_histogram = _merge_histograms(stats.latency_histogram, entry.histogram)
+            stats.last_seen = entry.last_seen
+            stats.save()
+
+    def _requeue(self, key, item: PendingStatement):
+        current = self._pending.get(key)
+        if current is None:
+            self._pending[key] = item
+            return
+        current.calls += item.calls
+        current.errors += item.errors
+        current.total_time_ms += item.total_time_ms
+        current.rows += item.rows
+        current.cache_hits += item.cache_hits
+        current.histogram = _merge_histograms(current.histogram, item.histogram)
+        current.min_time_ms = _extreme(min, current.min_time_ms, item.min_time_ms)
+        current.max_time_ms = _extreme(max, current.max_time_ms, item.max_time_ms)
+
+
+statement_statistics = StatementStatisticsCollector()
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import math
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from time import perf_counter_ns
+
+
+DEFAULT_TABLE_ROWS = 1_000_000
+DEFAULT_SEARCH_ROWS = 10
+# SQLite's own planner assumes each range bound cuts the candidate rows by about 4x.
+RANGE_SELECTIVITY = 0.25
+NON_COVERING_LOOKUP_FACTOR = 2.0
+COVERING_SCAN_FACTOR = 0.5
+
+STATISTICS_DRIFT_THRESHOLD = 0.2
+STATISTICS_ANALYSIS_LIMIT = 1000
+# Time allowed per table to count its rows; a table that takes longer is left alone this pass.
+ROW_COUNT_BUDGET_MS = 50
+
+ACCESS_PATTERN = re.compile(
+    r"^(?P<op>SCAN|SEARCH) (?:TABLE )?(?P<table>[^\s(]+)(?: AS \S+)?"
+    r"(?: USING (?P<covering>COVERING |AUTOMATIC COVERING |AUTOMATIC PARTIAL COVERING |AUTOMATIC )?"
+    r"(?P<kind>INDEX|INTEGER PRIMARY KEY|PRIMARY KEY)(?: (?P<index>[^\s(]+))?)?"
+    r"(?: \((?P<terms>[^)]*)\))?"
+)
+
+
+@dataclass
+class DatabaseStatistics:
+    source: str = "estimate"
+    table_rows: dict = field(default_factory=dict)
+    index_stats: dict = field(default_factory=dict)
+
+    def rows_for(self, table: str):
+        return self.table_rows.get(table.lower(), DEFAULT_TABLE_ROWS)
+
+
+def load_statistics(db: sqlite3.Connection):
+    """Read ``sqlite_stat1`` (and note ``sqlite_stat4``) into row counts and per-index selectivity."""
+    stats = DatabaseStatistics()
+    stat_tables = {
+        row[0]
+        for row in db.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name IN ('sqlite_stat1', 'sqlite_stat4')"
+        ).fetchall()
+    }
+
+    if "sqlite_stat1" in stat_tables:
+        stats.source = "sqlite_stat4" if "sqlite_stat4" in stat_tables else "sqlite_stat1"
+        for table, index, stat in db.execute("SELECT tbl, idx, stat FROM sqlite_stat1").fetchall():
+            numbers = [int(part) for part in (stat or "").split() if part.isdigit()]
+            if not numbers:
+                continue
+            stats.table_rows[table.lower()] = max(stats.table_rows.get(table.lower(), 0), numbers[0])
+            if index:
+                stats.index_stats[index.lower()] = numbers
+
+    tables = db.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    for (table,) in tables:
+        if table.lower() not in stats.table_rows:
+            estimate = current_row_estimate(db, table)
+            if estimate is not None:
+                stats.table_rows[table.lower()] = estimate
+    return stats
+
+
+def quote_identifier(name: str):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def current_row_estimate(db: sqlite3.Connection, table: str, budget_ms: float = ROW_COUNT_BUDGET_MS):
+    """The table's row count from ``count(*)``; None when it cannot finish within ``budget_ms``.
+
+    SQLite counts a whole B-tree in one VDBE step, so a progress handler never fires; the
+    count is cut short with ``interrupt()`` from a timer instead.
+    """
+    timer = threading.Timer(max(budget_ms, 0) / 1000, db.interrupt)
+    timer.start()
+    try:
+        row = db.execute(f"SELECT count(*) FROM {quote_identifier(table)}").fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        timer.cancel()
+    return int(row[0])
+
+
+def rowid_upper_bound(db: sqlite3.Connection, table: str):
+    """O(log n) upper bound on the row count from the rowid B-tree; None for WITHOUT ROWID tables.
+
+    Deleted rows leave it unchanged, so it must not stand in for the count when judging drift.
+    """
+    try:
+        row = db.execute(f"SELECT max(rowid) FROM {quote_identifier(table)}").fetchone()
+    except sqlite3.Error:
+        return None
+    return int(row[0] or 0)
+
+
+def estimate_plan(plan, stats: DatabaseStatistics, tables: dict | None = None):
+    """Annotate EXPLAIN QUERY PLAN nodes with rows touched per loop, loop counts and cost."""
+    tables = tables or {}
+    nodes = []
+    loops_by_id = {}
+    sibling_rows = {}
+
+    for step in plan:
+        node = dict(step)
+        parent = step["order"]
+        parent_loops = loops_by_id.get(parent, 1)
+        preceding_rows = sibling_rows.get(parent, 1)
+        detail = step["detail"]
+
+        access = ACCESS_PATTERN.match(detail)
+        rows = None
+        if access:
+            table = tables.get(access.group("table").lower(), access.group("table").lower())
+            rows, unit_cost = _estimate_access(access, table, stats)
+            loops = parent_loops * preceding_rows
+            sibling_rows[parent] = preceding_rows * max(rows, 1)
+            cost = loops * unit_cost
+        elif detail.startswith("USE TEMP B-TREE"):
+            loops = parent_loops
+            sorted_rows = max(preceding_rows, 1)
+            cost = parent_loops * sorted_rows * math.log2(sorted_rows + 1)
+        elif detail.startswith("CORRELATED"):
+            loops = parent_loops * preceding_rows
+            cost = 0.0
+        else:
+            loops = parent_loops
+            cost = 0.0
+
+        loops_by_id[step["select_id"]] = loops
+        node["estimated_rows"] = None if rows is None else int(round(rows))
+        node["loops"] = int(round(loops))
+        node["estimated_cost"] = round(cost, 2)
+        nodes.append(node)
+
+    output_rows = sibling_rows.get(0, 1) if sibling_rows else 0
+    return {
+        "plan": nodes,
+        "estimated_cost": round(sum(node["estimated_cost"] for node in nodes), 2),
+        "estimated_rows": int(round(output_rows)),
+        "statistics_source": stats.source,
+    }
+
+
+def _estimate_access(access, table: str, stats: DatabaseStatistics):
+    table_rows = max(stats.rows_for(table), 1)
+    covering = (access.group("covering") or "").strip()
+    kind = access.group("kind")
+    terms = [term.strip() for term in (access.group("terms") or "").split(" AND ") if term.strip()]
+    equality_terms = sum(1 for term in terms if term.endswith("=?") and "<" not in term and ">" not in term)
+    range_terms = len(terms) - equality_terms
+    seek_cost = math.log2(table_rows + 1)
+
+    if access.group("op") == "SCAN":
+        if kind == "INDEX":
+            factor = COVERING_SCAN_FACTOR if covering == "COVERING" else NON_COVERING_LOOKUP_FACTOR
+            return table_rows, table_rows * factor
+        return table_rows, table_rows
+
+    if kind in {"INTEGER PRIMARY KEY", "PRIMARY KEY"} and range_terms == 0 and equality_terms:
+        return 1, seek_cost + 1
+
+    if covering.startswith("AUTOMATIC"):
+        # The automatic index is built once, then probed per loop like a regular index.
+        rows = DEFAULT_SEARCH_ROWS * (RANGE_SELECTIVITY ** range_terms)
+        return rows, seek_cost + rows
+
+    index_stat = stats.index_stats.get((access.group("index") or "").lower())
+    if index_stat and equality_terms and equality_terms < len(index_stat):
+        rows = float(index_stat[equality_terms])
+    elif equality_terms:
+        rows = min(DEFAULT_SEARCH_ROWS, table_rows)
+    else:
+        rows = float(table_rows)
+    rows *= RANGE_SELECTIVITY ** range_terms
+
+    lookup_factor = 1.0 if covering == "COVERING" or kind != "INDEX" else NON_COVERING_LOOKUP_FACTOR
+    return rows, seek_cost + rows * lookup_factor
+
+
+class StatisticsManager:
+    """Keeps ``sqlite_stat1`` close to reality by re-analyzing only tables whose row counts drifted."""
+
+    def stale_tables(self, db: sqlite3.Connection):
+        stats = load_statistics(db)
+        analyzed = set()
+        if stats.source != "estimate":
+            analyzed = {row[0].lower() for row in db.execute("SELECT DISTINCT tbl FROM sqlite_stat1").fetchall()}
+
+        stale = []
+        tables = db.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        for (table,) in tables:
+            current = current_row_estimate(db, table)
+            if table.lower() not in analyzed:
+                if current:
+                    stale.append(table)
+                continue
+            recorded = stats.table_rows.get(table.lower(), 0)
+            if current is not None and abs(current - recorded) > STATISTICS_DRIFT_THRESHOLD * max(recorded, 1):
+                stale.append(table)
+        return stale
+
+    def refresh(self, db: sqlite3.Connection, tables=None):
+        tables = self.stale_tables(db) if tables is None else self._resolve(db, tables)
+        report = {"analyzed": [], "duration_ms": 0.0}
+        started_ns = perf_counter_ns()
+
+        db.execute(f"PRAGMA analysis_limit={STATISTICS_ANALYSIS_LIMIT};")
+        for table in tables:
+            table_started_ns = perf_counter_ns()
+            db.execute(f"ANALYZE {quote_identifier(table)}")
+            report["analyzed"].append(
+                {"table": table, "duration_ms": round((perf_counter_ns() - table_started_ns) / 1_000_000, 3)}
+            )
+        db.execute("PRAGMA optimize;")
+        for entry in report["analyzed"]:
+            self._record_row_count(db, entry["table"])
+        db.commit()
+
+        report["duration_ms"] = round((perf_counter_ns() - started_ns) / 1_000_000, 3)
+        return report
+
+    @staticmethod
+    def _record_row_count(db: sqlite3.Connection, table: str):
+        """Replace the row count a limited ANALYZE estimated with the real one, so drift compares like with like.
+
+        SQLite documents sqlite_stat1 as writable; only the leading row-count field changes.
+        """
+        count = current_row_estimate(db, table)
+        if count is None:
+            return
+        rows = db.execute("SELECT rowid, stat FROM sqlite_stat1 WHERE tbl = ?", (table,)).fetchall()
+        for rowid, stat in rows:
+            parts = (stat or "").split(" ")
+            if parts and parts[0].isdigit():
+                db.execute("UPDATE sqlite_stat1 SET stat = ? WHERE rowid = ?", (" ".join([str(count), *parts[1:]]), rowid))
+
+    @staticmethod
+    def _resolve(db: sqlite3.Connection, tables):
+        """Map requested names onto the database's own table names; unknown names raise ValueError."""
+        known = {
+            row[0].lower(): row[0]
+            for row in db.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
+            ).fetchall()
+        }
+        unknown = [table for table in tables if table.lower() not in known]
+        if unknown:
+            raise ValueError(f"Unknown table(s): {', '.join(unknown)}")
+        return list(dict.fromkeys(known[table.lower()] for table in tables))
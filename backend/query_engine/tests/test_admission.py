@@ -0,0 +1,164 @@
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from query_engine.admission import AdmissionController, AdmissionRejected, HostActivity
+
+
+class AdmissionTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.activity_dir = Path(directory.name) / "activity"
+        settings_override = override_settings(INFRADB_ACTIVITY_DIR=str(self.activity_dir))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def controller(self, **options):
+        options.setdefault("queue_timeout", {"interactive": 5.0, "batch": 5.0})
+        return AdmissionController(**options)
+
+    def acquire_in_thread(self, controller, *args):
+        """Start an acquire on another thread; returns a dict that receives its ticket or error."""
+        outcome = {}
+
+        def run():
+            try:
+                outcome["ticket"] = controller.acquire(*args)
+            except AdmissionRejected as exc:
+                outcome["error"] = exc
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        outcome["thread"] = thread
+        return outcome
+
+    def wait_for_queue(self, controller, priority, length):
+        deadline = time.monotonic() + 5
+        while controller.stats()["queued"][priority] < length:
+            self.assertLess(time.monotonic(), deadline, "waiter never queued")
+            time.sleep(0.005)
+
+
+class AdmissionLimitTests(AdmissionTestCase):
+    def test_connection_limit_queues_the_next_statement_until_a_release(self):
+        controller = self.controller(connection_limit=2, workspace_limit=10)
+        held = [controller.acquire("c1", "w1"), controller.acquire("c1", "w1")]
+        self.assertEqual(held[1].decision, "ADMITTED")
+
+        waiter = self.acquire_in_thread(controller, "c1", "w1")
+        self.wait_for_queue(controller, "interactive", 1)
+        self.assertNotIn("ticket", waiter)
+        # Another connection in the same workspace is not held back.
+        other = controller.acquire("c2", "w1")
+
+        controller.release(held[0])
+        waiter["thread"].join(5)
+        self.assertEqual(waiter["ticket"].decision, "QUEUED")
+        self.assertGreater(waiter["ticket"].queue_time_ms, 0)
+        for ticket in (held[1], other, waiter["ticket"]):
+            controller.release(ticket)
+        self.assertEqual(controller.stats()["running"], 0)
+
+    def test_workspace_limit_spans_its_connections(self):
+        controller = self.controller(connection_limit=5, workspace_limit=2)
+        first = controller.acquire("c1", "w1")
+        controller.acquire("c2", "w1")
+        waiter = self.acquire_in_thread(controller, "c3", "w1")
+        self.wait_for_queue(controller, "interactive", 1)
+        controller.acquire("c3", "w2")
+        self.assertNotIn("ticket", waiter)
+
+        controller.release(first)
+        waiter["thread"].join(5)
+        self.assertIn("ticket", waiter)
+
+    def test_full_queue_rejects_immediately(self):
+        controller = self.controller(connection_limit=1, workspace_limit=10, queue_depth={"interactive": 0, "batch": 0})
+        controller.acquire("c1", "w1")
+        with self.assertRaises(AdmissionRejected) as raised:
+            controller.acquire("c1", "w1")
+        self.assertEqual(raised.exception.ticket.decision, "REJECTED")
+
+    def test_waiting_past_the_timeout_rejects_with_retry_after(self):
+        controller = self.controller(
+            connection_limit=1, workspace_limit=10, queue_timeout={"interactive": 0.05, "batch": 0.05}
+        )
+        controller.acquire("c1", "w1")
+        with self.assertRaises(AdmissionRejected) as raised:
+            controller.acquire("c1", "w1")
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        self.assertEqual(controller.stats()["queued"], {"interactive": 0, "batch": 0})
+
+    def test_interactive_waiters_go_before_earlier_batch_waiters(self):
+        controller = self.controller(connection_limit=1, workspace_limit=10)
+        held = controller.acquire("c1", "w1")
+        batch = self.acquire_in_thread(controller, "c1", "w1", "batch")
+        self.wait_for_queue(controller, "batch", 1)
+        interactive = self.acquire_in_thread(controller, "c1", "w1", "interactive")
+        self.wait_for_queue(controller, "interactive", 1)
+        self.assertNotIn("ticket", interactive)
+
+        controller.release(held)
+        interactive["thread"].join(5)
+        self.assertIn("ticket", interactive)
+        self.assertNotIn("ticket", batch)
+        controller.release(interactive["ticket"])
+        batch["thread"].join(5)
+        self.assertIn("ticket", batch)
+        controller.release(batch["ticket"])
+
+    def test_unknown_priority_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.controller().acquire("c1", "w1", "urgent")
+
+    @override_settings(
+        WEB_CONCURRENCY=3, INFRADB_ADMISSION_CONNECTION_CONCURRENCY=4, INFRADB_ADMISSION_WORKSPACE_CONCURRENCY=8
+    )
+    def test_host_limits_are_split_across_workers(self):
+        controller = self.controller()
+        self.assertEqual((controller.connection_limit, controller.workspace_limit), (1, 2))
+        self.assertEqual(controller.stats()["limits"], {"connection": 1, "workspace": 2})
+
+    @override_settings(WEB_CONCURRENCY=16, INFRADB_ADMISSION_CONNECTION_CONCURRENCY=4)
+    def test_each_worker_keeps_at_least_one_slot(self):
+        self.assertEqual(self.controller().connection_limit, 1)
+
+
+class HostActivityTests(AdmissionTestCase):
+    def test_busy_marker_lives_while_statements_run(self):
+        controller = self.controller(connection_limit=2, workspace_limit=2)
+        marker = self.activity_dir / f"{os.getpid()}.busy"
+        first = controller.acquire("c1", "w1")
+        second = controller.acquire("c1", "w1")
+        self.assertTrue(marker.exists())
+        self.assertEqual(controller.host_idle_seconds(), 0.0)
+
+        controller.release(first)
+        self.assertTrue(marker.exists())
+        controller.release(second)
+        self.assertFalse(marker.exists())
+        self.assertTrue((self.activity_dir / "last_release").exists())
+
+    def test_another_live_process_keeps_the_host_busy(self):
+        activity = HostActivity()
+        self.activity_dir.mkdir(parents=True)
+        (self.activity_dir / f"{os.getppid()}.busy").touch()
+        self.assertEqual(activity.idle_seconds(), 0.0)
+
+    def test_markers_of_dead_processes_are_cleared(self):
+        activity = HostActivity()
+        self.activity_dir.mkdir(parents=True)
+        stale = self.activity_dir / "999999999.busy"
+        stale.touch()
+        (self.activity_dir / "last_release").touch()
+        self.assertGreaterEqual(activity.idle_seconds(), 0.0)
+        self.assertFalse(stale.exists())
+
+    def test_missing_directory_means_never_busy(self):
+        self.assertEqual(HostActivity().idle_seconds(), float("inf"))
@@ -0,0 +1,93 @@
+import threading
+import time
+import types
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from query_engine.analytics import DUCKDB_PREPARE_JOB, AnalyticsEngineError, DuckDBAttachmentPool
+from query_engine.background import background_runner
+
+
+class FakeDuckDB(types.ModuleType):
+    """Stands in for duckdb: INSTALL blocks until released, then succeeds or fails as configured."""
+
+    class Error(Exception):
+        pass
+
+    def __init__(self, failure=None):
+        super().__init__("duckdb")
+        self.release = threading.Event()
+        self.failure = failure
+        self.statements = []
+
+    def connect(self, *args, **kwargs):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, module):
+        self.module = module
+
+    def execute(self, statement):
+        self.module.statements.append(statement)
+        if statement == "INSTALL sqlite":
+            self.module.release.wait(5)
+            if self.module.failure:
+                raise self.module.Error(self.module.failure)
+
+    def close(self):
+        pass
+
+
+class ExtensionPreparationTests(SimpleTestCase):
+    def pool_with(self, module):
+        patcher = mock.patch.dict("sys.modules", {"duckdb": module})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Cleanups run last-in first-out: release the blocked INSTALL, then wait for the job to end.
+        self.addCleanup(self.wait_for_prepare)
+        self.addCleanup(module.release.set)
+        return DuckDBAttachmentPool()
+
+    def wait_for_prepare(self):
+        deadline = time.monotonic() + 5
+        while background_runner.is_running(DUCKDB_PREPARE_JOB):
+            self.assertLess(time.monotonic(), deadline, "prepare never finished")
+            time.sleep(0.005)
+
+    def test_checks_do_not_wait_for_the_extension(self):
+        module = FakeDuckDB()
+        pool = self.pool_with(module)
+
+        started = time.monotonic()
+        self.assertFalse(pool.available)
+        self.assertFalse(pool.available)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(pool.unavailable_reason, "DuckDB's sqlite extension is still loading.")
+        with self.assertRaises(AnalyticsEngineError):
+            pool.execute("/tmp/unused.sqlite3", "SELECT 1", 10)
+
+        module.release.set()
+        self.wait_for_prepare()
+        self.assertTrue(pool.available)
+        self.assertIsNone(pool.unavailable_reason)
+        self.assertEqual(module.statements, ["INSTALL sqlite", "LOAD sqlite"])
+
+    def test_a_failed_install_is_recorded_once(self):
+        module = FakeDuckDB(failure="Failed to download extension\nHTTP 404")
+        module.release.set()
+        pool = self.pool_with(module)
+
+        self.assertEqual(pool.prepare(), {
+            "available": False, "error": "DuckDB sqlite extension unavailable: Failed to download extension",
+        })
+        self.assertFalse(pool.available)
+        self.assertFalse(background_runner.is_running(DUCKDB_PREPARE_JOB))
+        self.assertEqual(module.statements, ["INSTALL sqlite"])
+
+    def test_missing_duckdb_is_reported(self):
+        with mock.patch.dict("sys.modules", {"duckdb": None}):
+            pool = DuckDBAttachmentPool()
+            self.assertFalse(pool.available)
+            self.assertEqual(pool.unavailable_reason, "duckdb is not installed.")
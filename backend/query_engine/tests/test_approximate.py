@@ -0,0 +1,125 @@
+import sqlite3
+import tempfile
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from query_engine.approximate import ApproximateQueryEngine, ApproximationUnsupported, plan_aggregate
+
+
+def _final(engine, db, sql, **options):
+    snapshots = list(engine.refine(db, plan_aggregate(sql), **options))
+    return snapshots[-1]
+
+
+class PlanAggregateTests(SimpleTestCase):
+    def test_splits_groups_filter_and_aggregates(self):
+        plan = plan_aggregate("SELECT region, count(*) AS n, avg(amount) FROM sales s WHERE amount > 0 GROUP BY region")
+        self.assertEqual((plan.table, plan.alias, plan.where, plan.group_by), ("sales", "s", "amount > 0", ["region"]))
+        self.assertEqual([(item.kind, item.name, item.argument) for item in plan.aggregates],
+                         [("count", "n", None), ("avg", "avg(amount)", "amount")])
+
+    def test_rejects_statements_without_an_error_bound(self):
+        for sql in (
+            "SELECT count(*) FROM a JOIN b ON a.id = b.id",
+            "SELECT count(*) FROM (SELECT * FROM a)",
+            "SELECT region FROM sales",
+            "SELECT region, count(*) FROM sales",
+            "SELECT max(amount) FROM sales",
+            "SELECT count(*) FROM sales ORDER BY 1",
+        ):
+            with self.subTest(sql=sql), self.assertRaises(ApproximationUnsupported):
+                plan_aggregate(sql)
+
+    def test_extrema_are_only_planned_on_request(self):
+        plan = plan_aggregate("SELECT min(amount), max(amount) FROM sales", extrema=True)
+        self.assertEqual([item.kind for item in plan.aggregates], ["min", "max"])
+
+
+class ApproximateEstimateTests(SimpleTestCase):
+    """Estimates from a seeded sample must bracket SQLite's exact answer."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = Path(cls.directory.name) / "sales.sqlite3"
+        rng = np.random.default_rng(7)
+        rows = []
+        for index in range(60_000):
+            amount = None if index % 10 == 0 else float(rng.gamma(2.0, 50.0))
+            rows.append((["north", "south", "east"][index % 3], amount, f"{index % 7}kg"))
+        with closing(sqlite3.connect(cls.path)) as db:
+            db.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, region TEXT, amount REAL, weight TEXT)")
+            db.executemany("INSERT INTO sales (region, amount, weight) VALUES (?, ?, ?)", rows)
+            # Holes in the rowid space are probes that miss; the estimators must account for them.
+            db.execute("DELETE FROM sales WHERE id % 5 = 0")
+            db.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.db = sqlite3.connect(self.path)
+        self.engine = ApproximateQueryEngine(seed=11)
+
+    def tearDown(self):
+        self.db.close()
+
+    def assertBrackets(self, bounds, exact):
+        low, high = bounds
+        self.assertLessEqual(low, exact)
+        self.assertGreaterEqual(high, exact)
+
+    def test_ungrouped_aggregates_bracket_the_exact_values(self):
+        sql = "SELECT count(*) AS n, count(amount) AS present, sum(amount) AS total, avg(amount) AS mean FROM sales"
+        exact = dict(zip(("n", "present", "total", "mean"), self.db.execute(sql).fetchone()))
+        snapshot = _final(self.engine, self.db, sql, confidence=0.999, target_relative_error=0.02)
+
+        self.assertTrue(snapshot["final"])
+        (row,), (bounds,) = snapshot["rows"], snapshot["bounds"]
+        for name, value in exact.items():
+            with self.subTest(aggregate=name):
+                self.assertBrackets(bounds[name], value)
+                self.assertAlmostEqual(row[name], value, delta=0.05 * value)
+
+    def test_groups_come_back_in_sqlite_order_and_bracket_each_group(self):
+        sql = "SELECT region, count(*) AS n, avg(amount) AS mean FROM sales WHERE amount > 20 GROUP BY region"
+        exact = {region: (n, mean) for region, n, mean in self.db.execute(sql).fetchall()}
+        snapshot = _final(self.engine, self.db, sql, confidence=0.999, target_relative_error=0.02)
+
+        self.assertEqual([row["region"] for row in snapshot["rows"]], list(exact))
+        for row, bounds in zip(snapshot["rows"], snapshot["bounds"]):
+            n, mean = exact[row["region"]]
+            with self.subTest(region=row["region"]):
+                self.assertBrackets(bounds["n"], n)
+                self.assertBrackets(bounds["mean"], mean)
+
+    def test_text_columns_follow_sqlite_coercion(self):
+        # COUNT only checks for presence; SUM/AVG read the numeric prefix, as SQLite does.
+        sql = "SELECT count(weight) AS present, avg(weight) AS mean FROM sales"
+        present, mean = self.db.execute(sql).fetchone()
+        snapshot = _final(self.engine, self.db, sql, confidence=0.999, target_relative_error=0.02)
+        row, bounds = snapshot["rows"][0], snapshot["bounds"][0]
+
+        self.assertBrackets(bounds["present"], present)
+        self.assertBrackets(bounds["mean"], mean)
+        self.assertAlmostEqual(row["mean"], mean, delta=0.1)
+
+    def test_snapshots_tighten_until_final(self):
+        snapshots = list(
+            self.engine.refine(self.db, plan_aggregate("SELECT avg(amount) FROM sales"), target_relative_error=0.001)
+        )
+        self.assertEqual([snapshot["final"] for snapshot in snapshots], [False] * (len(snapshots) - 1) + [True])
+        probes = [snapshot["probes"] for snapshot in snapshots]
+        self.assertEqual(probes, sorted(probes))
+
+    def test_empty_groups_report_no_mean(self):
+        sql = "SELECT count(*) AS n, avg(amount) AS mean FROM sales WHERE amount < 0"
+        snapshot = _final(self.engine, self.db, sql)
+        self.assertEqual(snapshot["rows"], [{"n": 0, "mean": None}])
+        self.assertIsNone(snapshot["bounds"][0]["mean"])
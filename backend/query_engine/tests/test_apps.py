@@ -0,0 +1,39 @@
+import os
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from query_engine.apps import _serving_process
+
+
+class ServingProcessTests(SimpleTestCase):
+    def serving(self, argv, **environ):
+        base = {key: value for key, value in os.environ.items() if key != "RUN_MAIN"}
+        with mock.patch("sys.argv", argv), mock.patch.dict("os.environ", {**base, **environ}, clear=True):
+            return _serving_process()
+
+    def test_known_servers_start_background_work(self):
+        for argv in (
+            ["/usr/bin/gunicorn", "backend.wsgi"],
+            ["/venv/bin/uvicorn", "backend.asgi:application"],
+            ["/venv/lib/python3.11/site-packages/gunicorn/__main__.py", "backend.wsgi"],
+            ["manage.py", "runserver", "--noreload"],
+        ):
+            with self.subTest(argv=argv):
+                self.assertTrue(self.serving(argv))
+        self.assertTrue(self.serving(["manage.py", "runserver"], RUN_MAIN="true"))
+
+    def test_everything_else_stays_quiet(self):
+        for argv in (
+            [],
+            [""],
+            ["manage.py", "runserver"],
+            ["manage.py", "migrate"],
+            ["manage.py", "shell"],
+            ["manage.py", "test"],
+            ["/venv/bin/celery", "-A", "backend", "worker"],
+            ["/venv/bin/pytest"],
+            ["-c"],
+        ):
+            with self.subTest(argv=argv):
+                self.assertFalse(self.serving(argv))
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.http import http_date
+
+from query_engine.conditional import CONDITIONAL_CACHE_CONTROL, not_modified, version_etag, with_validators
+
+
+class ConditionalResponseTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.etag = version_etag("schema", 7, "2024-01-01T00:00:00", 12)
+        self.modified = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+    def test_etag_tracks_every_version_part(self):
+        self.assertEqual(self.etag, version_etag("schema", 7, "2024-01-01T00:00:00", 12))
+        self.assertNotEqual(self.etag, version_etag("schema", 7, "2024-01-01T00:00:00", 13))
+        self.assertTrue(self.etag.startswith('"') and self.etag.endswith('"'))
+
+    def test_matching_etag_returns_304_with_validators(self):
+        for header in (self.etag, f"W/{self.etag}", f'"other", {self.etag}', "*"):
+            with self.subTest(header=header):
+                response = not_modified(self.factory.get("/", HTTP_IF_NONE_MATCH=header), self.etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], self.etag)
+                self.assertEqual(response["Cache-Control"], CONDITIONAL_CACHE_CONTROL)
+
+    def test_changed_or_missing_etag_recomputes(self):
+        self.assertIsNone(not_modified(self.factory.get("/"), self.etag))
+        stale = version_etag("schema", 7, "2024-01-01T00:00:00", 11)
+        self.assertIsNone(not_modified(self.factory.get("/", HTTP_IF_NONE_MATCH=stale), self.etag))
+
+    def test_if_modified_since_applies_without_an_etag_header(self):
+        since = http_date(self.modified.timestamp())
+        request = self.factory.get("/", HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(not_modified(request, self.etag, self.modified).status_code, 304)
+        later = self.modified + timedelta(seconds=5)
+        self.assertIsNone(not_modified(request, self.etag, later))
+
+    def test_if_none_match_wins_over_if_modified_since(self):
+        request = self.factory.get(
+            "/", HTTP_IF_NONE_MATCH='"stale"', HTTP_IF_MODIFIED_SINCE=http_date(self.modified.timestamp())
+        )
+        self.assertIsNone(not_modified(request, self.etag, self.modified))
+
+    def test_full_responses_carry_the_same_validators(self):
+        response = with_validators(HttpResponse("{}"), self.etag, self.modified)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Last-Modified"], http_date(self.modified.timestamp()))
+        self.assertEqual(response["Cache-Control"], CONDITIONAL_CACHE_CONTROL)
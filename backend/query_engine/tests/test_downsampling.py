@@ -0,0 +1,135 @@
+import math
+import sqlite3
+from fractions import Fraction
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from query_engine.downsampling import DownsampleSpec, LTTBDownsampler, MinMaxDownsampler, downsample_query
+
+
+def reference_lttb(xs, ys, threshold):
+    """Steinarsson's Largest-Triangle-Three-Buckets, written the plain way over the whole series."""
+    n = len(xs)
+    if threshold >= n:
+        return list(xs), list(ys)
+    # Bucket edges are floor(i * every) + 1 with every = (n - 2) / (threshold - 2), taken exactly.
+    every = Fraction(n - 2, threshold - 2)
+    kept = [0]
+    a = 0
+    for i in range(threshold - 2):
+        average_start = math.floor((i + 1) * every) + 1
+        average_end = min(math.floor((i + 2) * every) + 1, n)
+        average_x = sum(xs[average_start:average_end]) / (average_end - average_start)
+        average_y = sum(ys[average_start:average_end]) / (average_end - average_start)
+
+        best_area, best = -1.0, None
+        for j in range(math.floor(i * every) + 1, math.floor((i + 1) * every) + 1):
+            area = abs((xs[a] - average_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (average_y - ys[a]))
+            if area > best_area:
+                best_area, best = area, j
+        kept.append(best)
+        a = best
+    kept.append(n - 1)
+    return [xs[index] for index in kept], [ys[index] for index in kept]
+
+
+def stream(sampler, x, y, chunk):
+    steps = [sampler.measure, sampler.add] if sampler.passes == 2 else [sampler.add]
+    for step in steps:
+        for start in range(0, x.size, chunk):
+            step(x[start:start + chunk], y[start:start + chunk])
+    return sampler.finish()
+
+
+class LTTBTests(SimpleTestCase):
+    def series(self, n, seed=5):
+        rng = np.random.default_rng(seed)
+        # Integer values keep every centroid exact, so the comparison can be exact too.
+        x = np.cumsum(rng.integers(1, 4, n)).astype(np.float64)
+        y = rng.integers(-500, 500, n).astype(np.float64)
+        return x, y
+
+    def test_matches_the_reference_implementation(self):
+        for n, points in ((1_000, 50), (997, 3), (5_000, 333), (101, 100)):
+            x, y = self.series(n)
+            expected_x, expected_y = reference_lttb(x.tolist(), y.tolist(), points)
+            for chunk in (1, 7, 256, n):
+                with self.subTest(n=n, points=points, chunk=chunk):
+                    got_x, got_y = stream(LTTBDownsampler(n, points), x, y, chunk)
+                    self.assertEqual(got_x.tolist(), expected_x)
+                    self.assertEqual(got_y.tolist(), expected_y)
+
+    def test_short_series_pass_through(self):
+        x, y = self.series(40)
+        got_x, got_y = stream(LTTBDownsampler(40, 40), x, y, 16)
+        self.assertEqual((got_x.tolist(), got_y.tolist()), (x.tolist(), y.tolist()))
+
+    def test_unsorted_input_is_reported(self):
+        x, y = self.series(500)
+        sampler = LTTBDownsampler(500, 20)
+        stream(sampler, x[::-1].copy(), y, 100)
+        self.assertFalse(sampler.sorted)
+
+
+class MinMaxTests(SimpleTestCase):
+    def test_keeps_each_buckets_extremes_in_x_order(self):
+        rng = np.random.default_rng(9)
+        x = rng.uniform(0, 1_000, 20_000)
+        y = rng.normal(size=20_000)
+        got_x, got_y = stream(MinMaxDownsampler(x.min(), x.max(), 100), x, y, 3_000)
+
+        self.assertEqual(got_x.tolist(), sorted(got_x.tolist()))
+        self.assertLessEqual(got_x.size, 100)
+        bucket = np.clip(((x - x.min()) / ((x.max() - x.min()) / 50)).astype(np.int64), 0, 49)
+        for index in range(50):
+            inside = bucket == index
+            with self.subTest(bucket=index):
+                self.assertIn(y[inside].min(), got_y)
+                self.assertIn(y[inside].max(), got_y)
+        self.assertEqual({got_y.min(), got_y.max()}, {y.min(), y.max()})
+
+
+class DownsampleQueryTests(SimpleTestCase):
+    def setUp(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.execute("CREATE TABLE readings (ts TEXT, value REAL)")
+        rows = [(f"2024-01-01T00:{minute // 60:02d}:{minute % 60:02d}", float(minute % 17)) for minute in range(3_000)]
+        rows.append(("2024-01-01T01:00:00.250", 99.0))
+        rows.append((None, 1.0))
+        self.db.executemany("INSERT INTO readings VALUES (?, ?)", rows)
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_lttb_over_timestamps_uses_one_unit_per_response(self):
+        result = downsample_query(
+            self.db, "SELECT ts, value FROM readings ORDER BY ts", (), DownsampleSpec("ts", "value", 200)
+        )
+        meta = result["downsampling"]
+        self.assertEqual((meta["source_rows"], meta["points"], meta["x_kind"]), (3_001, 200, "timestamp"))
+        self.assertTrue(meta["x_sorted"])
+        stamps = [row["ts"] for row in result["rows"]]
+        self.assertEqual(stamps[0], "2024-01-01T00:00:00.000")
+        self.assertEqual(stamps[-1], "2024-01-01T01:00:00.250")
+        self.assertEqual({len(stamp) for stamp in stamps}, {23})
+
+    def test_whole_second_series_use_second_precision(self):
+        result = downsample_query(
+            self.db,
+            "SELECT ts, value FROM readings WHERE value < ? ORDER BY ts",
+            (50,),
+            DownsampleSpec("ts", "value", 100, "minmax"),
+        )
+        self.assertEqual({len(row["ts"]) for row in result["rows"]}, {19})
+        self.assertEqual(result["downsampling"]["source_rows"], 3_000)
+
+    def test_unknown_columns_are_refused(self):
+        with self.assertRaises(ValueError):
+            downsample_query(self.db, "SELECT ts, value FROM readings", (), DownsampleSpec("ts", "missing"))
+
+    def test_spec_validates_its_options(self):
+        for options in ({"x": "ts"}, {"x": "ts", "y": "v", "method": "mean"}, {"x": "ts", "y": "v", "points": 2}):
+            with self.subTest(options=options), self.assertRaises(ValueError):
+                DownsampleSpec.from_options(options)
@@ -0,0 +1,38 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from query_engine.engine_client import NativeEngineClient
+
+
+class LoadEngineTests(SimpleTestCase):
+    def test_concurrent_callers_wait_for_the_single_import(self):
+        client = NativeEngineClient(mode="inprocess")
+        module = object()
+        calls = []
+
+        def slow_import():
+            calls.append(threading.get_ident())
+            time.sleep(0.1)
+            client._engine_module = module
+            client._import_attempted = True
+
+        results = []
+        with mock.patch.object(client, "_import_engine", side_effect=slow_import):
+            threads = [threading.Thread(target=lambda: results.append(client._load_engine())) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [module] * 4)
+
+    def test_a_missing_module_is_remembered(self):
+        client = NativeEngineClient(mode="inprocess")
+        with mock.patch.dict("sys.modules", {"infradb_core": None}):
+            self.assertIsNone(client._load_engine())
+        self.assertTrue(client._import_attempted)
+        self.assertIn("import_ms", client.timings)
@@ -0,0 +1,85 @@
+import sqlite3
+import tempfile
+import threading
+from contextlib import closing
+from pathlib import Path
+
+from django.test import SimpleTestCase, override_settings
+
+from query_engine.group_commit import GroupCommitter, PendingWrite
+from query_engine.pool import SQLiteConnectionPool
+
+
+class GroupCommitTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = str(Path(directory.name) / "writes.sqlite3")
+        with closing(sqlite3.connect(self.path)) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, code INTEGER UNIQUE, note TEXT)")
+            db.execute("INSERT INTO items (code, note) VALUES (1, 'seed')")
+            db.commit()
+        self.committer = GroupCommitter(pool=SQLiteConnectionPool())
+
+    def codes(self):
+        with closing(sqlite3.connect(self.path)) as db:
+            return [row[0] for row in db.execute("SELECT code FROM items ORDER BY code")]
+
+
+class SavepointIsolationTests(GroupCommitTestCase):
+    def run_batch(self, *statements):
+        batch = [PendingWrite(sql, parameters) for sql, parameters in statements]
+        self.committer._commit(self.path, batch)
+        return batch
+
+    def test_a_failed_follower_is_rolled_back_alone(self):
+        batch = self.run_batch(
+            ("INSERT INTO items (code) VALUES (?)", (2,)),
+            ("INSERT INTO items (code) VALUES (?)", (1,)),
+            ("UPDATE items SET note = 'updated' WHERE code = ?", (2,)),
+        )
+        self.assertEqual([write.error is None for write in batch], [True, False, True])
+        self.assertIsInstance(batch[1].error, sqlite3.IntegrityError)
+        self.assertEqual([write.rowcount for write in (batch[0], batch[2])], [1, 1])
+        self.assertEqual(self.codes(), [1, 2])
+        self.assertEqual({write.batch_size for write in batch}, {3})
+
+    def test_partial_effects_of_a_failed_statement_are_undone(self):
+        # OR FAIL keeps the rows a statement inserted before its error; the savepoint must not.
+        batch = self.run_batch(
+            ("INSERT INTO items (code) VALUES (5)", ()),
+            ("INSERT OR FAIL INTO items (code) VALUES (10), (11), (1)", ()),
+            ("INSERT INTO items (code) VALUES (6)", ()),
+        )
+        self.assertIsNotNone(batch[1].error)
+        self.assertEqual(self.codes(), [1, 5, 6])
+
+
+@override_settings(INFRADB_GROUP_COMMIT_WINDOW_MS=200, INFRADB_GROUP_COMMIT_MAX_BATCH=4)
+class ConcurrentGroupCommitTests(GroupCommitTestCase):
+    def test_concurrent_writers_share_one_batch_and_see_only_their_own_error(self):
+        # A file whose last batch held several writes makes the next leader wait for followers.
+        self.committer._last_batch_size[self.path] = 2
+        outcomes = {}
+
+        def write(code):
+            try:
+                outcomes[code] = self.committer.execute(self.path, "INSERT INTO items (code) VALUES (?)", (code,))
+            except sqlite3.Error as exc:
+                outcomes[code] = exc
+
+        threads = [threading.Thread(target=write, args=(code,)) for code in (20, 1, 21, 22)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertIsInstance(outcomes[1], sqlite3.IntegrityError)
+        self.assertEqual({outcomes[code].batch_size for code in (20, 21, 22)}, {4})
+        self.assertEqual(self.codes(), [1, 20, 21, 22])
+
+    def test_a_lone_writer_skips_the_window(self):
+        write = self.committer.execute(self.path, "INSERT INTO items (code) VALUES (30)")
+        self.assertEqual(write.batch_size, 1)
+        self.assertLess(write.wait_ms, 200)
@@ -0,0 +1,80 @@
+import sqlite3
+
+from django.test import SimpleTestCase
+
+from query_engine.history_search import (
+    CREATE_SEARCH_SQL,
+    JOB_TABLE,
+    MAX_SEARCH_TERMS,
+    SEARCH_TABLE,
+    fts_query,
+    fts_words,
+)
+
+
+class FtsQueryTests(SimpleTestCase):
+    def test_bare_words_become_quoted_prefixes(self):
+        self.assertEqual(fts_query("customer orders"), '"customer"* "orders"*')
+
+    def test_quoted_text_stays_a_phrase(self):
+        self.assertEqual(fts_query('"order by" total'), '"order by" "total"*')
+
+    def test_operators_and_punctuation_never_reach_fts5(self):
+        self.assertEqual(
+            fts_query('SELECT * FROM t WHERE a = "x" OR NOT b NEAR(c)'),
+            '"SELECT"* "FROM"* "t"* "WHERE"* "a"* "x" "OR"* "NOT"* "b"* "NEAR"* "c"*',
+        )
+        self.assertEqual(fts_query("customer_id:5 col^1 -x +y"), '"customer_id"* "5"* "col"* "1"* "x"* "y"*')
+
+    def test_unbalanced_quotes_fall_back_to_words(self):
+        self.assertEqual(fts_query('"open phrase'), '"open"* "phrase"*')
+
+    def test_text_without_words_gives_no_query(self):
+        for text in (None, "", "   ", '"" * () -- ;', '""'):
+            with self.subTest(text=text):
+                self.assertIsNone(fts_query(text))
+
+    def test_terms_are_capped(self):
+        words = [f"w{index}" for index in range(MAX_SEARCH_TERMS + 5)]
+        self.assertEqual(fts_query(" ".join(words)).count("*"), MAX_SEARCH_TERMS)
+        self.assertEqual(fts_words(" ".join(words)), words[:MAX_SEARCH_TERMS])
+
+
+class SearchIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.execute(f"CREATE TABLE {JOB_TABLE} (id TEXT PRIMARY KEY, sql_query TEXT, error_message TEXT)")
+        for statement in CREATE_SEARCH_SQL:
+            self.db.execute(statement)
+
+    def tearDown(self):
+        self.db.close()
+
+    def search(self, text):
+        rows = self.db.execute(
+            f"SELECT job_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ? ORDER BY job_id", (fts_query(text),)
+        )
+        return [row[0] for row in rows]
+
+    def add(self, job_id, sql, error=None):
+        self.db.execute(f"INSERT INTO {JOB_TABLE} VALUES (?, ?, ?)", (job_id, sql, error))
+
+    def test_generated_queries_parse_and_match(self):
+        self.add("a", "SELECT customer_id, sum(total) FROM orders GROUP BY customer_id")
+        self.add("b", "SELECT * FROM customers WHERE name = 'x' OR id = 1", "no such column: name")
+        self.assertEqual(self.search("cust"), ["a", "b"])
+        self.assertEqual(self.search("customer_id"), ["a"])
+        self.assertEqual(self.search('"no such column"'), ["b"])
+        self.assertEqual(self.search("WHERE name = 'x' OR (id"), ["b"])
+        self.assertEqual(self.search('"group customer_id"'), [])
+
+    def test_triggers_follow_updates_and_deletes(self):
+        self.add("a", "SELECT 1 FROM invoices")
+        self.db.execute(f"UPDATE {JOB_TABLE} SET sql_query = 'SELECT 1 FROM payments' WHERE id = 'a'")
+        self.assertEqual(self.search("invoices"), [])
+        self.assertEqual(self.search("payments"), ["a"])
+        self.db.execute(f"UPDATE {JOB_TABLE} SET error_message = 'database is locked' WHERE id = 'a'")
+        self.assertEqual(self.search("locked"), ["a"])
+        self.db.execute(f"DELETE FROM {JOB_TABLE} WHERE id = 'a'")
+        self.assertEqual(self.search("payments"), [])
+        self.assertEqual(self.db.execute(f"SELECT count(*) FROM {SEARCH_TABLE}").fetchone(), (0,))
@@ -0,0 +1,104 @@
+import sqlite3
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from query_engine import kernels
+
+
+class KernelTests(SimpleTestCase):
+    """Each kernel must agree with SQLite's NULL semantics over the same column."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(13)
+        size = 4_000
+        cls.keys = rng.integers(-3, 12, size)
+        cls.key_nulls = rng.random(size) < 0.05
+        cls.values = rng.integers(-50, 50, size).astype(np.int64)
+        cls.value_nulls = rng.random(size) < 0.1
+        cls.db = sqlite3.connect(":memory:")
+        cls.db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, k INTEGER, v INTEGER)")
+        cls.db.executemany(
+            "INSERT INTO t VALUES (?, ?, ?)",
+            [
+                (index, None if key_null else int(key), None if value_null else int(value))
+                for index, (key, key_null, value, value_null) in enumerate(
+                    zip(cls.keys, cls.key_nulls, cls.values, cls.value_nulls)
+                )
+            ],
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        super().tearDownClass()
+
+    def positions(self, where, *parameters):
+        return [row[0] for row in self.db.execute(f"SELECT id FROM t WHERE {where} ORDER BY id", parameters)]
+
+    def test_compare_skips_nulls_for_every_operator(self):
+        for op in ("=", "!=", "<>", "<", "<=", ">", ">="):
+            with self.subTest(op=op):
+                got = kernels.compare(self.values, op, 7, self.value_nulls)
+                self.assertEqual(got.tolist(), self.positions(f"v {op} ?", 7))
+        with self.assertRaises(ValueError):
+            kernels.compare(self.values, "LIKE", 7)
+
+    def test_between_and_in_list(self):
+        self.assertEqual(
+            kernels.between(self.values, -5, 5, self.value_nulls).tolist(), self.positions("v BETWEEN -5 AND 5")
+        )
+        # None of 2.5, 2**63 or 1e30 can equal an int64; they must not be truncated or wrapped into matches.
+        for members in ([3, 2.5, -7, 2 ** 70], [2 ** 63, 3, -7], [1e30, -7.0, 3]):
+            with self.subTest(members=members):
+                got = kernels.in_list(self.values, members, self.value_nulls)
+                self.assertEqual(got.tolist(), self.positions("v IN (3, -7)"))
+        minimum = np.array([np.iinfo(np.int64).min, 1])
+        self.assertEqual(kernels.in_list(minimum, [2 ** 63]).tolist(), [])
+        self.assertEqual(kernels.in_list(self.values, []).tolist(), [])
+
+    def test_compact_carries_null_flags(self):
+        selection = kernels.compare(self.keys, ">", 5, self.key_nulls)
+        values, nulls = kernels.compact(self.values, selection, self.value_nulls)
+        self.assertEqual(values.tolist(), self.values[selection].tolist())
+        self.assertEqual(nulls.tolist(), self.value_nulls[selection].tolist())
+
+    def test_group_by_matches_sqlite_including_the_null_key(self):
+        result = kernels.group_by(self.keys, self.values, self.key_nulls, self.value_nulls)
+        got = {
+            (None if is_null else int(key)): (
+                int(rows), int(present), None if present == 0 else int(total),
+                None if present == 0 else int(low), None if present == 0 else int(high),
+            )
+            for is_null, key, rows, present, total, low, high in zip(
+                result["key_is_null"], result["keys"], result["row_counts"], result["value_counts"],
+                result["sums"], result["mins"], result["maxs"],
+            )
+        }
+        expected = {
+            key: (rows, present, total, low, high)
+            for key, rows, present, total, low, high in self.db.execute(
+                "SELECT k, count(*), count(v), sum(v), min(v), max(v) FROM t GROUP BY k"
+            )
+        }
+        self.assertEqual(got, expected)
+        first_seen = [row[0] for row in self.db.execute("SELECT k FROM t GROUP BY k ORDER BY min(id)")]
+        self.assertEqual([None if n else int(k) for n, k in zip(result["key_is_null"], result["keys"])], first_seen)
+
+    def test_top_k_orders_ties_by_row(self):
+        for largest, direction in ((True, "DESC"), (False, "ASC")):
+            with self.subTest(largest=largest):
+                got = kernels.top_k(self.values, 25, largest=largest, null_mask=self.value_nulls)
+                expected = [
+                    row[0]
+                    for row in self.db.execute(f"SELECT id FROM t WHERE v IS NOT NULL ORDER BY v {direction}, id LIMIT 25")
+                ]
+                self.assertEqual(got.tolist(), expected)
+
+    def test_top_k_handles_the_integer_extremes_and_nan(self):
+        values = np.array([np.iinfo(np.int64).min, 0, np.iinfo(np.int64).max, np.iinfo(np.int64).min])
+        self.assertEqual(kernels.top_k(values, 4).tolist(), [2, 1, 0, 3])
+        floats = np.array([1.0, np.nan, 3.0, 2.0])
+        self.assertEqual(kernels.top_k(floats, 5, largest=False).tolist(), [0, 3, 2])
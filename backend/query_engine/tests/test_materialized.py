@@ -0,0 +1,129 @@
+import random
+import sqlite3
+
+from django.test import SimpleTestCase
+
+from query_engine.materialized import MaterializedViewError, MaterializedViewManager, materialized_table_name
+
+
+class MaterializedViewTriggerTests(SimpleTestCase):
+    """After any mix of writes, an incremental view must read exactly like its definition run fresh."""
+
+    def setUp(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, region TEXT, status TEXT, amount INTEGER)")
+        self.db.executemany(
+            "INSERT INTO orders (region, status, amount) VALUES (?, ?, ?)",
+            [("north", "paid", 10), ("north", "open", None), ("south", "paid", 5), (None, "paid", 7)],
+        )
+        self.db.commit()
+        self.manager = MaterializedViewManager()
+
+    def tearDown(self):
+        self.db.close()
+
+    def create(self, name, sql):
+        plan = self.manager.plan(self.db, sql, materialized_table_name(name))
+        self.manager.create(self.db, plan)
+        return plan
+
+    def assertMatchesDefinition(self, plan):
+        expected = self.db.execute(plan.definition).fetchall()
+        actual = self.db.execute(plan.read_sql).fetchall()
+        self.assertEqual(sorted(actual, key=repr), sorted(expected, key=repr))
+
+    def test_grouped_sums_and_counts_are_incremental(self):
+        plan = self.create(
+            "by_region",
+            "SELECT region, count(*) AS n, count(amount) AS priced, sum(amount) AS total, total(amount) AS t "
+            "FROM orders GROUP BY region",
+        )
+        self.assertEqual(plan.strategy, "INCREMENTAL")
+        self.assertMatchesDefinition(plan)
+
+        with self.db:
+            self.db.execute("INSERT INTO orders (region, status, amount) VALUES ('east', 'paid', 3)")
+        self.assertMatchesDefinition(plan)
+        with self.db:
+            self.db.execute("UPDATE orders SET region = 'south' WHERE region = 'north'")
+        self.assertMatchesDefinition(plan)
+        with self.db:
+            self.db.execute("DELETE FROM orders WHERE region = 'east'")
+        self.assertMatchesDefinition(plan)
+
+    def test_sum_returns_to_null_when_a_group_loses_its_last_value(self):
+        plan = self.create("sums", "SELECT region, sum(amount) AS total FROM orders GROUP BY region")
+        with self.db:
+            self.db.execute("UPDATE orders SET amount = NULL WHERE region = 'south'")
+        self.assertMatchesDefinition(plan)
+        self.assertIn(("south", None), self.db.execute(plan.read_sql).fetchall())
+        with self.db:
+            self.db.execute("UPDATE orders SET amount = 4 WHERE region = 'south'")
+        self.assertMatchesDefinition(plan)
+
+    def test_null_group_keys_are_one_group(self):
+        plan = self.create("nulls", "SELECT region, count(*) AS n FROM orders GROUP BY region")
+        with self.db:
+            self.db.execute("INSERT INTO orders (region, status, amount) VALUES (NULL, 'open', 1)")
+            self.db.execute("INSERT INTO orders (region, status, amount) VALUES (NULL, 'open', 2)")
+        self.assertMatchesDefinition(plan)
+        with self.db:
+            self.db.execute("DELETE FROM orders WHERE region IS NULL")
+        self.assertMatchesDefinition(plan)
+        self.assertNotIn(None, [row[0] for row in self.db.execute(plan.read_sql)])
+
+    def test_updates_move_rows_across_the_filter(self):
+        plan = self.create("paid", "SELECT region, sum(amount) AS total FROM orders WHERE status = 'paid' GROUP BY region")
+        with self.db:
+            self.db.execute("UPDATE orders SET status = 'paid' WHERE status = 'open'")
+        self.assertMatchesDefinition(plan)
+        with self.db:
+            self.db.execute("UPDATE orders SET status = 'refunded' WHERE region = 'south'")
+        self.assertMatchesDefinition(plan)
+
+    def test_ungrouped_view_keeps_its_single_row(self):
+        plan = self.create("everything", "SELECT count(*) AS n, sum(amount) AS total FROM orders")
+        with self.db:
+            self.db.execute("DELETE FROM orders")
+        self.assertMatchesDefinition(plan)
+        self.assertEqual(self.db.execute(plan.read_sql).fetchall(), [(0, None)])
+
+    def test_random_writes_keep_the_view_exact(self):
+        plan = self.create(
+            "random",
+            "SELECT region, status, count(*) AS n, count(amount) AS priced, sum(amount) AS total FROM orders "
+            "WHERE amount IS NULL OR amount > 2 GROUP BY region, status",
+        )
+        rng = random.Random(3)
+        regions, statuses = ["north", "south", "east", None], ["paid", "open", None]
+        for _ in range(300):
+            choice = rng.random()
+            with self.db:
+                if choice < 0.4:
+                    self.db.execute(
+                        "INSERT INTO orders (region, status, amount) VALUES (?, ?, ?)",
+                        (rng.choice(regions), rng.choice(statuses), rng.choice([None, 0, 1, 3, 8, 20])),
+                    )
+                elif choice < 0.8:
+                    column, values = rng.choice([("region", regions), ("status", statuses), ("amount", [None, 1, 5, 9])])
+                    self.db.execute(
+                        f"UPDATE orders SET {column} = ? WHERE id % 4 = ?", (rng.choice(values), rng.randrange(4))
+                    )
+                else:
+                    self.db.execute("DELETE FROM orders WHERE id % 7 = ?", (rng.randrange(7),))
+        self.assertMatchesDefinition(plan)
+
+    def test_unsupported_definitions_fall_back_to_full_refresh(self):
+        plan = self.create("averages", "SELECT region, avg(amount) AS mean FROM orders GROUP BY region")
+        self.assertEqual(plan.strategy, "FULL")
+        self.assertIn("AVG", plan.reason)
+        with self.db:
+            self.db.execute("INSERT INTO orders (region, status, amount) VALUES ('north', 'paid', 100)")
+        self.manager.refresh(self.db, plan)
+        self.assertMatchesDefinition(plan)
+
+    def test_rejects_bad_names_and_parameters(self):
+        with self.assertRaises(MaterializedViewError):
+            materialized_table_name("bad name")
+        with self.assertRaises(MaterializedViewError):
+            self.manager.plan(self.db, "SELECT count(*) FROM orders WHERE region = ?", "infradb_mv_x")
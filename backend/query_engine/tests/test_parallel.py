@@ -0,0 +1,107 @@
+import sqlite3
+import tempfile
+from contextlib import closing
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from query_engine.approximate import plan_aggregate
+from query_engine.parallel import (
+    ParallelScanExecutor,
+    merge_partials,
+    partial_sql,
+    rowid_partitions,
+    scan_partition,
+)
+
+
+class RowidPartitionTests(SimpleTestCase):
+    def test_partitions_cover_the_range_without_overlap(self):
+        for low, high, parts in ((1, 100, 4), (1, 10, 3), (5, 7, 8), (0, 0, 2)):
+            with self.subTest(low=low, high=high, parts=parts):
+                partitions = rowid_partitions(low, high, parts)
+                covered = [rowid for first, last in partitions for rowid in range(first, last + 1)]
+                self.assertEqual(covered, list(range(low, high + 1)))
+                self.assertLessEqual(len(partitions), parts)
+
+
+class MergePartialsTests(SimpleTestCase):
+    """Merged partition results must equal what SQLite returns for the whole table."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = str(Path(cls.directory.name) / "events.sqlite3")
+        rows = []
+        for index in range(5_000):
+            value = None if index % 11 == 0 else (index * 37) % 1000
+            # Mixed types exercise SQLite's cross-type ordering for min/max: NULL < numbers < text < blobs.
+            label = [None, index % 13, f"v{index % 17}", bytes([index % 5])][index % 4]
+            rows.append((f"k{index % 6}" if index % 50 else None, value, label))
+        with closing(sqlite3.connect(cls.path)) as db:
+            db.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, value INTEGER, label)")
+            db.executemany("INSERT INTO events (kind, value, label) VALUES (?, ?, ?)", rows)
+            db.execute("DELETE FROM events WHERE id BETWEEN 1200 AND 1800")
+            db.commit()
+            cls.low, cls.high = db.execute("SELECT min(rowid), max(rowid) FROM events").fetchone()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def exact(self, sql):
+        with closing(sqlite3.connect(self.path)) as db:
+            cursor = db.execute(sql)
+            names = [item[0] for item in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def merged(self, sql, parts):
+        plan = plan_aggregate(sql, extrema=True)
+        partials = [
+            scan_partition(self.path, partial_sql(plan), first, last)[0]
+            for first, last in rowid_partitions(self.low, self.high, parts)
+        ]
+        return merge_partials(plan, partials)
+
+    def assertRowsEqual(self, merged, exact):
+        self.assertEqual(len(merged), len(exact))
+        for merged_row, exact_row in zip(merged, exact):
+            self.assertEqual(merged_row.keys(), exact_row.keys())
+            for name, value in exact_row.items():
+                if isinstance(value, float):
+                    self.assertAlmostEqual(merged_row[name], value, places=9)
+                else:
+                    self.assertEqual(merged_row[name], value)
+
+    def test_ungrouped_aggregates_match(self):
+        sql = (
+            "SELECT count(*) AS n, count(value) AS present, sum(value) AS total, total(value) AS t, "
+            "avg(value) AS mean, min(value) AS low, max(value) AS high FROM events"
+        )
+        for parts in (1, 3, 8):
+            with self.subTest(parts=parts):
+                self.assertRowsEqual(self.merged(sql, parts), self.exact(sql))
+
+    def test_grouped_aggregates_match_including_the_null_group(self):
+        sql = "SELECT kind, count(*) AS n, sum(value) AS total, avg(value) AS mean FROM events GROUP BY kind"
+        self.assertRowsEqual(self.merged(sql, 5), self.exact(sql))
+
+    def test_min_max_follow_sqlite_cross_type_ordering(self):
+        sql = "SELECT kind, min(label) AS low, max(label) AS high FROM events WHERE value > 100 GROUP BY kind"
+        self.assertRowsEqual(self.merged(sql, 7), self.exact(sql))
+
+    def test_empty_input_still_returns_one_ungrouped_row(self):
+        sql = "SELECT count(*) AS n, sum(value) AS total, total(value) AS t, avg(value) AS mean FROM events WHERE value < 0"
+        self.assertRowsEqual(self.merged(sql, 4), self.exact(sql))
+        grouped = "SELECT kind, count(*) AS n FROM events WHERE value < 0 GROUP BY kind"
+        self.assertEqual(self.merged(grouped, 4), self.exact(grouped))
+
+    def test_executor_scans_partitions_on_worker_processes(self):
+        executor = ParallelScanExecutor(max_workers=2)
+        self.addCleanup(executor.shutdown)
+        sql = "SELECT kind, count(*) AS n, max(value) AS high FROM events GROUP BY kind"
+        rows, report = executor.execute(self.path, plan_aggregate(sql, extrema=True), self.low, self.high, 2)
+        self.assertEqual(report["parallelism"], 2)
+        self.assertRowsEqual(rows, self.exact(sql))
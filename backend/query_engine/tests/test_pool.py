@@ -0,0 +1,89 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from query_engine.pool import SQLiteConnectionPool, StatementCacheMirror
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.path = str(self.directory / "pool.sqlite3")
+        self.pool = SQLiteConnectionPool(idle_per_file=2, max_files=2)
+        with self.pool.connection(self.path, reuse=False) as db:
+            db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+            db.commit()
+
+    def test_read_only_use_returns_the_same_connection(self):
+        with self.pool.connection(self.path) as first:
+            first.execute("SELECT count(*) FROM items").fetchone()
+        with self.pool.connection(self.path) as second:
+            self.assertIs(second, first)
+        self.assertEqual(self.pool.stats()["idle_connections"], 1)
+
+    def test_session_state_never_leaks_to_the_next_caller(self):
+        # A pooled connection that wrote anything, even to a TEMP table, is retired rather than shared.
+        with self.pool.connection(self.path) as db:
+            db.execute("CREATE TEMP TABLE scratch (value)")
+            db.execute("INSERT INTO scratch VALUES (1)")
+        with self.pool.connection(self.path) as other:
+            self.assertIsNot(other, db)
+            self.assertEqual(other.execute("SELECT count(*) FROM temp.sqlite_master").fetchone()[0], 0)
+
+        with self.pool.connection(self.path, reuse=False) as private:
+            private.execute("PRAGMA foreign_keys=OFF")
+        with self.pool.connection(self.path) as shared:
+            self.assertIsNot(shared, private)
+            self.assertEqual(shared.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+
+    def test_open_transactions_are_rolled_back_before_checkin(self):
+        with self.pool.connection(self.path) as db:
+            db.execute("BEGIN")
+            db.execute("SELECT count(*) FROM items").fetchone()
+        self.assertFalse(db.in_transaction)
+
+    def test_statement_errors_keep_the_connection_but_corruption_retires_it(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            with self.pool.connection(self.path) as db:
+                db.execute("SELECT missing FROM items")
+        with self.pool.connection(self.path) as again:
+            self.assertIs(again, db)
+
+        with self.assertRaises(RuntimeError):
+            with self.pool.connection(self.path) as db:
+                try:
+                    raise sqlite3.DatabaseError("file is not a database")
+                except sqlite3.DatabaseError as exc:
+                    raise RuntimeError("query failed") from exc
+        with self.pool.connection(self.path) as fresh:
+            self.assertIsNot(fresh, db)
+
+    def test_least_recently_used_files_are_evicted(self):
+        paths = [str(self.directory / f"f{index}.sqlite3") for index in range(3)]
+        for path in paths:
+            with self.pool.connection(path):
+                pass
+        self.assertEqual(self.pool.stats()["files"], 2)
+        self.assertEqual(list(self.pool._idle), paths[1:])
+
+    def test_statement_cache_hits_are_counted(self):
+        before = self.pool.stats()["statement_cache"]
+        for _ in range(3):
+            with self.pool.connection(self.path) as db:
+                db.execute("SELECT count(*) FROM items").fetchone()
+        after = self.pool.stats()["statement_cache"]
+        self.assertEqual((after["hits"] - before["hits"], after["misses"] - before["misses"]), (2, 1))
+
+
+class StatementCacheMirrorTests(SimpleTestCase):
+    def test_mirrors_an_lru_of_the_same_capacity(self):
+        mirror = StatementCacheMirror(2)
+        self.assertEqual([mirror.touch(sql) for sql in ("a", "b", "a", "c", "b", "a")],
+                         [False, False, True, False, False, False])
+        mark = mirror.mark()
+        mirror.touch("a")
+        self.assertEqual(mirror.since(mark), {"hits": 1, "misses": 0})
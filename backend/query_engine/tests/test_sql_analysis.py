@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+
+from query_engine.sql_analysis import canonical_sql, fingerprint, tokenize
+
+
+class TokenizeTests(SimpleTestCase):
+    def test_skips_whitespace_and_comments(self):
+        tokens = tokenize("SELECT a -- trailing\nFROM t /* block */ WHERE b = 1")
+        self.assertEqual([token.value for token in tokens], ["SELECT", "a", "FROM", "t", "WHERE", "b", "=", "1"])
+
+    def test_classifies_literals_keywords_and_identifiers(self):
+        kinds = [token.kind for token in tokenize("select x, 'it''s', X'AB', 1.5e3, :name from [t]")]
+        self.assertEqual(
+            kinds,
+            ["keyword", "identifier", "op", "string", "op", "blob", "op", "number", "op", "param", "keyword", "identifier"],
+        )
+
+    def test_quoted_identifiers_lose_their_quotes(self):
+        values = [token.value for token in tokenize('SELECT "a", [b], `c` FROM t')]
+        self.assertEqual(values, ["SELECT", "a", ",", "b", ",", "c", "FROM", "t"])
+
+    def test_canonical_sql_ignores_case_whitespace_and_trailing_semicolons(self):
+        self.assertEqual(canonical_sql('select  A from  "T" ; '), canonical_sql("SELECT a FROM t"))
+        self.assertNotEqual(canonical_sql("SELECT a FROM t WHERE b = 1"), canonical_sql("SELECT a FROM t WHERE b = 2"))
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_strips_literals_of_every_kind(self):
+        text = fingerprint("SELECT * FROM t WHERE a = 1 AND b = 'it''s' AND c = X'AB' AND d = :name AND e = ?2").text
+        self.assertEqual(text, "SELECT * FROM t WHERE a = ? AND b = ? AND c = ? AND d = ? AND e = ?")
+
+    def test_statements_differing_only_in_constants_share_an_id(self):
+        first = fingerprint("SELECT * FROM t WHERE a = 1 AND b = 'x'")
+        second = fingerprint("select *  from T where A=2 and b='y';")
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(first.query_type, "SELECT")
+
+    def test_signed_constants_are_one_literal_but_subtraction_stays(self):
+        self.assertEqual(fingerprint("UPDATE t SET a = -5 WHERE id = 3").text, "UPDATE t SET a = ? WHERE id = ?")
+        self.assertEqual(fingerprint("SELECT a - 1 FROM t").text, "SELECT a - ? FROM t")
+
+    def test_in_lists_collapse_regardless_of_length(self):
+        short = fingerprint("SELECT * FROM t WHERE a IN (1)")
+        long = fingerprint("SELECT * FROM t WHERE a IN (1, 2, 3, 4)")
+        self.assertEqual(short.id, long.id)
+        self.assertEqual(long.text, "SELECT * FROM t WHERE a IN ( ? ... )")
+
+    def test_in_subqueries_are_kept(self):
+        text = fingerprint("SELECT * FROM t WHERE a IN (SELECT b FROM u WHERE c = 1)").text
+        self.assertEqual(text, "SELECT * FROM t WHERE a IN ( SELECT b FROM u WHERE c = ? )")
+
+    def test_repeated_values_rows_collapse_to_one(self):
+        single = fingerprint("INSERT INTO t VALUES (1, 'a')")
+        many = fingerprint("INSERT INTO t VALUES (1, 'a'), (2, 'b'), (3, 'c')")
+        self.assertEqual(single.id, many.id)
+        self.assertEqual(many.text, "INSERT INTO t VALUES ( ? , ? )")
+
+    def test_values_rows_of_different_shapes_stay_apart(self):
+        self.assertNotEqual(
+            fingerprint("INSERT INTO t VALUES (1, 2)").id, fingerprint("INSERT INTO t VALUES (1, 2), (3, 4, 5)").id
+        )
@@ -0,0 +1,76 @@
+import sqlite3
+import time
+
+from django.test import SimpleTestCase
+
+from query_engine.statistics import StatisticsManager, current_row_estimate, load_statistics, rowid_upper_bound
+
+
+class StatisticsDriftTests(SimpleTestCase):
+    def setUp(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, value INTEGER)")
+        self.db.execute("CREATE INDEX events_kind ON events (kind)")
+        self.db.executemany(
+            "INSERT INTO events (kind, value) VALUES (?, ?)", [(f"k{index % 9}", index) for index in range(4_000)]
+        )
+        self.db.commit()
+        self.manager = StatisticsManager()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_unanalyzed_tables_with_rows_are_stale(self):
+        self.db.execute("CREATE TABLE empty (id INTEGER PRIMARY KEY)")
+        self.assertEqual(self.manager.stale_tables(self.db), ["events"])
+
+    def test_refresh_records_the_real_row_count(self):
+        # A limited ANALYZE extrapolates its row count; drift must compare against the real one.
+        report = self.manager.refresh(self.db)
+        self.assertEqual([entry["table"] for entry in report["analyzed"]], ["events"])
+        self.assertEqual(load_statistics(self.db).rows_for("events"), 4_000)
+        self.assertEqual(self.manager.stale_tables(self.db), [])
+
+    def test_deletes_are_detected_even_though_max_rowid_does_not_move(self):
+        self.manager.refresh(self.db)
+        self.db.execute("DELETE FROM events WHERE id % 5 <> 0")
+        self.db.commit()
+        self.assertEqual(rowid_upper_bound(self.db, "events"), 4_000)
+        self.assertEqual(self.manager.stale_tables(self.db), ["events"])
+
+        self.manager.refresh(self.db)
+        self.assertEqual(load_statistics(self.db).rows_for("events"), 800)
+        self.assertEqual(self.manager.stale_tables(self.db), [])
+
+    def test_growth_within_the_threshold_is_not_stale(self):
+        self.manager.refresh(self.db)
+        self.db.executemany("INSERT INTO events (kind, value) VALUES ('k0', ?)", [(index,) for index in range(500)])
+        self.assertEqual(self.manager.stale_tables(self.db), [])
+        self.db.executemany("INSERT INTO events (kind, value) VALUES ('k0', ?)", [(index,) for index in range(500)])
+        self.assertEqual(self.manager.stale_tables(self.db), ["events"])
+
+    def test_explicit_tables_are_matched_case_insensitively_and_quoted(self):
+        self.db.execute('CREATE TABLE "odd ""name""; x" (id INTEGER PRIMARY KEY)')
+        self.db.execute('INSERT INTO "odd ""name""; x" DEFAULT VALUES')
+        report = self.manager.refresh(self.db, ["EVENTS", 'odd "name"; x', "events"])
+        self.assertEqual([entry["table"] for entry in report["analyzed"]], ["events", 'odd "name"; x'])
+        self.assertEqual(load_statistics(self.db).rows_for('odd "name"; x'), 1)
+
+    def test_unknown_tables_are_refused_before_anything_runs(self):
+        for tables in (["missing"], ["events", "events; DROP TABLE events"], ["sqlite_stat1"]):
+            with self.subTest(tables=tables), self.assertRaises(ValueError):
+                self.manager.refresh(self.db, tables)
+        self.assertEqual(self.db.execute("SELECT count(*) FROM events").fetchone(), (4_000,))
+        self.assertEqual(self.manager.stale_tables(self.db), ["events"])
+
+    def test_row_count_gives_up_past_its_budget(self):
+        self.assertEqual(current_row_estimate(self.db, "events"), 4_000)
+        self.assertIsNone(current_row_estimate(self.db, "missing"))
+        self.db.execute(
+            "CREATE VIEW endless AS WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n) SELECT x FROM n"
+        )
+        started = time.perf_counter()
+        self.assertIsNone(current_row_estimate(self.db, "endless", budget_ms=20))
+        self.assertLess(time.perf_counter() - started, 2)
+        # The interrupt must not leak into the next statement.
+        self.assertEqual(self.db.execute("SELECT count(*) FROM events").fetchone(), (4_000,))
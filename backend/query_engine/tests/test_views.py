@@ -0,0 +1,71 @@
+import sqlite3
+import tempfile
+from contextlib import closing
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from databases.models import DatabaseConnection, Workspace
+
+
+RUN_URL = "/api/v1/query/jobs/run/"
+
+
+class ProgressiveRunTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        path = Path(cls.directory.name) / "sales.sqlite3"
+        with closing(sqlite3.connect(path)) as db:
+            db.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, amount REAL)")
+            db.commit()
+        cls.user = get_user_model().objects.create_user("analyst", password="unused")
+        workspace = Workspace.objects.create(name="Analytics", owner=cls.user)
+        cls.connection = DatabaseConnection.objects.create(
+            workspace=workspace, name="Sales", engine="SQLITE", database_name="sales", file_path=str(path)
+        )
+        cls.other = DatabaseConnection.objects.create(
+            workspace=workspace, name="Archive", engine="SQLITE", database_name="archive", file_path=str(path)
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def run_progressive(self, **options):
+        payload = {
+            "sql": "SELECT avg(amount) FROM sales",
+            "connection_id": str(self.connection.pk),
+            "approximate": True,
+            "progressive": True,
+            **options,
+        }
+        return self.client.post(RUN_URL, payload, format="json")
+
+    def test_options_progressive_runs_cannot_honour_are_refused(self):
+        cases = {
+            "engine": {"engine": "duckdb"},
+            "attachments": {"attachments": {"archive": str(self.other.pk)}},
+            "parallelism": {"parallelism": "2"},
+            "visualization": {"visualization": {"x": "id", "y": "amount"}},
+        }
+        for option, extra in cases.items():
+            with self.subTest(option=option):
+                response = self.run_progressive(**extra)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(option, response.json()["error"])
+
+        response = self.run_progressive(engine="duckdb", parallelism="auto")
+        self.assertEqual(response.json()["error"], "progressive cannot be combined with engine, parallelism.")
+
+    def test_sqlite_engine_is_compatible(self):
+        for engine in ("auto", "sqlite", "SQLite"):
+            with self.subTest(engine=engine):
+                self.assertNotEqual(self.run_progressive(engine=engine).status_code, 400)
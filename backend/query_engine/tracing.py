@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import json
+import logging
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter_ns
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+TRACED_PATH_PREFIX = "/api/"
+SERVICE_NAME = "infradb-backend"
+
+_active_trace = ContextVar("infradb_trace", default=None)
+_active_span = ContextVar("infradb_span", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int = field(default_factory=perf_counter_ns)
+    end_ns: int | None = None
+    attributes: dict = field(default_factory=dict)
+
+    @property
+    def duration_ms(self):
+        return round(((self.end_ns or perf_counter_ns()) - self.start_ns) / 1_000_000, 3)
+
+
+class Trace:
+    """The spans recorded while serving one request; the root span covers the whole request."""
+
+    def __init__(self, name: str, **attributes):
+        self.trace_id = secrets.token_hex(16)
+        # Wall-clock anchor so exported spans carry absolute timestamps.
+        self.epoch_ns = time.time_ns() - perf_counter_ns()
+        self.root = Span(name, secrets.token_hex(8), None, attributes=attributes)
+        self.spans = []
+
+    def phases(self):
+        """Total time per span name in first-seen order, for the ``timings`` block of a response."""
+        phases = {}
+        for item in self.spans:
+            entry = phases.setdefault(item.name, {"name": item.name, "duration_ms": 0.0, "count": 0})
+            entry["duration_ms"] = round(entry["duration_ms"] + item.duration_ms, 3)
+            entry["count"] += 1
+        return [*phases.values(), {"name": "total", "duration_ms": self.root.duration_ms, "count": 1}]
+
+    def server_timing(self):
+        return ", ".join(f"{phase['name']};dur={phase['duration_ms']}" for phase in self.phases())
+
+    def as_otlp(self):
+        """The trace as an OTLP/JSON ExportTraceServiceRequest."""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [self._otlp_span(item) for item in [self.root, *self.spans]],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def _otlp_span(self, item: Span):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": item.span_id,
+            "name": item.name,
+            "kind": 2 if item is self.root else 1,
+            "startTimeUnixNano": str(self.epoch_ns + item.start_ns),
+            "endTimeUnixNano": str(self.epoch_ns + (item.end_ns or perf_counter_ns())),
+            "attributes": [_otlp_attribute(key, value) for key, value in item.attributes.items()],
+        }
+        if item.parent_id:
+            span["parentSpanId"] = item.parent_id
+        if "error" in item.attributes:
+            span["status"] = {"code": 2, "message": str(item.attributes["error"])}
+        return span
+
+
+def _otlp_attribute(key: str, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def current_trace():
+    return _active_trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the enclosed block as a child of the active span; a no-op outside a traced request."""
+    trace = _active_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _active_span.get() or trace.root
+    item = Span(name, secrets.token_hex(8), parent.span_id, attributes=attributes)
+    token = _active_span.set(item)
+    try:
+        yield item
+    except BaseException as exc:
+        item.attributes["error"] = type(exc).__name__
+        raise
+    finally:
+        item.end_ns = perf_counter_ns()
+        _active_span.reset(token)
+        trace.spans.append(item)
+
+
+class TraceFileExporter:
+    """Appends each finished trace to a file as one line of OTLP/JSON, ready for a collector's file receiver."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return getattr(settings, "INFRADB_TRACE_FILE", "")
+
+    def export(self, trace: Trace):
+        path = self.path
+        if not path:
+            return False
+        line = json.dumps(trace.as_otlp(), separators=(",", ":"))
+        try:
+            with self._lock, open(path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+        except OSError:
+            logger.exception("Could not export trace %s to %s", trace.trace_id, path)
+            return False
+        return True
+
+
+trace_exporter = TraceFileExporter()
+
+
+class ServerTimingMiddleware:
+    """Traces API requests and reports each phase's duration in a Server-Timing header."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "INFRADB_TRACING", True) or not request.path.startswith(TRACED_PATH_PREFIX):
+            return self.get_response(request)
+
+        trace = Trace(f"{request.method} {request.path}", **{"http.method": request.method})
+        trace_token = _active_trace.set(trace)
+        span_token = _active_span.set(trace.root)
+        try:
+            response = self.get_response(request)
+        finally:
+            trace.root.end_ns = perf_counter_ns()
+            _active_span.reset(span_token)
+            _active_trace.reset(trace_token)
+
+        trace.root.attributes["http.status_code"] = response.status_code
+        response["Server-Timing"] = trace.server_timing()
+        if getattr(settings, "CORS_ALLOW_ALL_ORIGINS", False):
+            # Lets the console read the breakdown from another origin.
+            response["Timing-Allow-Origin"] = "*"
+        trace_exporter.export(trace)
+        return response
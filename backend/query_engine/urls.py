@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import QueryViewSet
+from .views import QueryViewSet, system_info
 
 router = DefaultRouter()
 router.register(r'jobs', QueryViewSet)
 
 urlpatterns = [
+    path('system/info/', system_info, name='system_info'),
     path('', include(router.urls)),
 ]
@@ -1,15 +1,38 @@
+import itertools
+import json
+from datetime import datetime, time
 from pathlib import Path
 
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import permissions, status, viewsets
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 
 from databases.models import DatabaseConnection
 from databases.services import ConsoleBootstrapService
 
+from .admission import PRIORITIES, AdmissionRejected, admission_controller
+from .approximate import APPROX_DEFAULT_CONFIDENCE
+from .conditional import not_modified, version_etag, with_validators
+from .maintenance import maintenance_scheduler
 from .models import QueryJob
+from .parallel import MAX_PARALLELISM
+from .pool import sqlite_pool
 from .serializers import QueryJobSerializer
-from .services import QueryExecutionError, QueryExecutionService
+from .services import STATEMENT_ORDERINGS, QueryExecutionError, QueryExecutionService
+from .tracing import current_trace
+from .warmup import startup_report
+
+
+APPROXIMATE_OPTIONS = {
+    "confidence": "confidence",
+    "max_relative_error": "target_relative_error",
+    "time_budget_ms": "time_budget_ms",
+}
 
 
 class QueryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -37,8 +60,149 @@ class QueryViewSet(viewsets.ReadOnlyModelViewSet):
         except DatabaseConnection.DoesNotExist:
             return Response({"error": "Connection not found."}, status=status.HTTP_404_NOT_FOUND)
 
+        attachments = request.data.get("attachments") or {}
+        if not isinstance(attachments, dict):
+            return Response({"error": "attachments must map aliases to connection ids."}, status=status.HTTP_400_BAD_REQUEST)
+        if attachments:
+            try:
+                attached = {
+                    str(item.pk): item
+                    for item in DatabaseConnection.objects.filter(pk__in=attachments.values(), workspace__owner=actor)
+                }
+            except ValidationError:
+                attached = {}
+            missing = [alias for alias, pk in attachments.items() if str(pk).lower() not in attached]
+            if missing:
+                return Response(
+                    {"error": f"Connection not found for {', '.join(missing)}."}, status=status.HTTP_404_NOT_FOUND
+                )
+            attachments = {alias: attached[str(pk).lower()] for alias, pk in attachments.items()}
+
+        parallelism = request.data.get("parallelism")
+        if parallelism is not None:
+            if str(parallelism).lower() == "auto":
+                parallelism = MAX_PARALLELISM
+            elif not str(parallelism).isdigit() or int(parallelism) < 1:
+                return Response({"error": "parallelism must be a positive integer or auto."}, status=status.HTTP_400_BAD_REQUEST)
+            parallelism = int(parallelism)
+
+        priority = str(request.data.get("priority") or "interactive").lower()
+        if priority not in PRIORITIES:
+            return Response({"error": "priority must be interactive or batch."}, status=status.HTTP_400_BAD_REQUEST)
+
+        approximate = None
+        if str(request.data.get("approximate", "")).lower() in {"1", "true", "yes"}:
+            try:
+                approximate = {
+                    option: float(request.data[field])
+                    for field, option in APPROXIMATE_OPTIONS.items()
+                    if request.data.get(field) is not None
+                }
+            except (TypeError, ValueError):
+                return Response(
+                    {"error": f"{', '.join(APPROXIMATE_OPTIONS)} must be numbers."}, status=status.HTTP_400_BAD_REQUEST
+                )
+            if not 0 < approximate.get("confidence", APPROX_DEFAULT_CONFIDENCE) < 1:
+                return Response({"error": "confidence must be between 0 and 1."}, status=status.HTTP_400_BAD_REQUEST)
+            if any(approximate.get(option, 1) <= 0 for option in ("target_relative_error", "time_budget_ms")):
+                return Response(
+                    {"error": "max_relative_error and time_budget_ms must be positive."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if str(request.data.get("progressive", "")).lower() in {"1", "true", "yes"}:
+                # Progressive results come from sampling SQLite directly; say so instead of dropping options.
+                conflicting = [
+                    option
+                    for option, used in (
+                        ("engine", str(request.data.get("engine") or "auto").lower() not in {"auto", "sqlite"}),
+                        ("attachments", bool(attachments)),
+                        ("parallelism", parallelism is not None),
+                        ("visualization", request.data.get("visualization") is not None),
+                    )
+                    if used
+                ]
+                if conflicting:
+                    return Response(
+                        {"error": f"progressive cannot be combined with {', '.join(conflicting)}."},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                stream = self.execution_service.stream_execute(
+                    connection=connection,
+                    sql=sql_query,
+                    actor=actor,
+                    approximate=approximate,
+                    priority=priority,
+                    parameters=request.data.get("parameters"),
+                )
+                # Admission happens before the first item, so a full queue can still answer 429.
+                try:
+                    head = [next(stream)]
+                except AdmissionRejected as exc:
+                    return self._rejected(exc)
+                except StopIteration:
+                    head = []
+                except Exception as exc:
+                    head = [{"status": "FAILED", "error": str(exc)}]
+                return StreamingHttpResponse(
+                    self._ndjson(itertools.chain(head, stream)), content_type="application/x-ndjson"
+                )
+
+        try:
+            result = self.execution_service.execute(
+                connection=connection,
+                sql=sql_query,
+                actor=actor,
+                approximate=approximate,
+                engine=str(request.data.get("engine") or "auto").lower(),
+                attachments=attachments or None,
+                parallelism=parallelism,
+                priority=priority,
+                parameters=request.data.get("parameters"),
+                visualization=request.data.get("visualization"),
+            )
+        except AdmissionRejected as exc:
+            return self._rejected(exc)
+        except QueryExecutionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        trace = current_trace()
+        if trace is not None and str(request.data.get("timings", "")).lower() in {"1", "true", "yes"}:
+            result["timings"] = trace.phases()
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """Run one statement once per parameter set in ``parameters``; writes share a single transaction."""
+        sql_query = request.data.get("sql")
+        connection_id = request.data.get("connection_id")
+
+        if not sql_query or not connection_id:
+            return Response({"error": "Missing sql or connection_id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        actor = self.bootstrap.get_actor(getattr(request, "user", None))
+        try:
+            connection = DatabaseConnection.objects.get(pk=connection_id, workspace__owner=actor)
+        except DatabaseConnection.DoesNotExist:
+            return Response({"error": "Connection not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        priority = str(request.data.get("priority") or "interactive").lower()
+        if priority not in PRIORITIES:
+            return Response({"error": "priority must be interactive or batch."}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            result = self.execution_service.execute(connection=connection, sql=sql_query, actor=actor)
+            result = self.execution_service.execute(
+                connection=connection,
+                sql=sql_query,
+                actor=actor,
+                engine="sqlite",
+                priority=priority,
+                parameters=request.data.get("parameters"),
+                many=True,
+            )
+        except AdmissionRejected as exc:
+            return self._rejected(exc)
         except QueryExecutionError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as exc:
@@ -46,11 +210,90 @@ class QueryViewSet(viewsets.ReadOnlyModelViewSet):
 
         return Response(result, status=status.HTTP_200_OK)
 
+    def _rejected(self, exc: AdmissionRejected):
+        return Response(
+            {"error": str(exc), "job_id": exc.job_id, "admission": exc.ticket.as_dict()},
+            status=status.HTTP_429_TOO_MANY_REQUESTS,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    def _ndjson(self, stream):
+        try:
+            for item in stream:
+                yield json.dumps(item, cls=DjangoJSONEncoder) + "\n"
+        except Exception as exc:
+            yield json.dumps({"status": "FAILED", "error": str(exc)}) + "\n"
+
     @action(detail=False, methods=["get"])
     def history(self, request):
         actor = self.bootstrap.get_actor(getattr(request, "user", None))
-        limit = int(request.query_params.get("limit", 50))
-        return Response({"items": self.execution_service.history(actor=actor, limit=min(limit, 200))})
+        limit = min(int(request.query_params.get("limit", 50)), 200)
+
+        summary, last_modified = self.execution_service.history_version(actor=actor)
+        etag = version_etag("history", actor.pk, limit, *summary.values())
+        cached = not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
+        response = Response({"items": self.execution_service.history(actor=actor, limit=limit)})
+        return with_validators(response, etag, last_modified)
+
+    @action(detail=False, methods=["get"])
+    def search(self, request):
+        """Ranked search over the user's statements and error messages, filtered by connection, status and time."""
+        actor = self.bootstrap.get_actor(getattr(request, "user", None))
+        limit = min(int(request.query_params.get("limit", 50)), 200)
+        try:
+            bounds = {name: self._parse_moment(request.query_params.get(name)) for name in ("since", "until")}
+            result = self.execution_service.search_history(
+                actor=actor,
+                query=request.query_params.get("q", ""),
+                connection_id=request.query_params.get("connection_id") or None,
+                status=request.query_params.get("status") or None,
+                limit=limit,
+                **bounds,
+            )
+        except QueryExecutionError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+    def _parse_moment(self, value):
+        if not value:
+            return None
+        try:
+            moment = parse_datetime(value)
+            day = None if moment is not None else parse_date(value)
+        except ValueError:
+            moment = day = None
+        if moment is None and day is None:
+            raise QueryExecutionError(f"Not an ISO 8601 date or time: {value}")
+        moment = moment or datetime.combine(day, time.min)
+        return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+    @action(detail=False, methods=["get", "delete"])
+    def statements(self, request):
+        actor = self.bootstrap.get_actor(getattr(request, "user", None))
+        connections = DatabaseConnection.objects.filter(workspace__owner=actor)
+        connection_id = request.query_params.get("connection_id")
+        if connection_id:
+            try:
+                connections = connections.filter(pk=connection_id)
+            except ValidationError:
+                connections = connections.none()
+
+        if request.method == "DELETE":
+            deleted = self.execution_service.reset_workload_statistics(connections=list(connections))
+            return Response({"deleted": deleted})
+
+        order_by = request.query_params.get("order_by", "total_time")
+        if order_by not in STATEMENT_ORDERINGS:
+            return Response(
+                {"error": f"order_by must be one of {', '.join(STATEMENT_ORDERINGS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = min(int(request.query_params.get("limit", 50)), 200)
+        items = self.execution_service.workload_statistics(connections=connections, order_by=order_by, limit=limit)
+        return Response({"order_by": order_by, "items": items})
 
     @action(detail=True, methods=["get"])
     def status(self, request, pk=None):
@@ -72,10 +315,28 @@ class QueryViewSet(viewsets.ReadOnlyModelViewSet):
             return Response({"error": "Connection not found."}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            payload = self.execution_service.explain(connection=connection, sql=sql_query)
+            payload = self.execution_service.explain(
+                connection=connection, sql=sql_query, parameters=request.data.get("parameters")
+            )
         except QueryExecutionError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as exc:
             return Response({"error": str(exc)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         return Response(payload)
+
+
+@api_view(["GET"])
+@permission_classes([permissions.AllowAny])
+def system_info(request):
+    warmup = startup_report["warmup"]
+    return Response(
+        {
+            "status": "Degraded" if warmup.get("status") == "degraded" else "Healthy",
+            "engine": "Infra-Native" if QueryViewSet.execution_service.native_client.available else "SQLite",
+            "startup": startup_report,
+            "pools": {"sqlite": sqlite_pool.stats()},
+            "admission": admission_controller.stats(),
+            "maintenance": {"enabled": maintenance_scheduler.enabled, "last_pass": maintenance_scheduler.last_pass},
+        }
+    )
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.utils import timezone
+
+from .analytics import analytics_pool
+from .engine_client import native_client
+from .pool import sqlite_pool
+
+
+logger = logging.getLogger(__name__)
+
+WARMUP_STAGES = ("native", "connections", "schema", "analytics")
+DEFAULT_WARMUP_MAX_CONNECTIONS = 16
+
+# Filled in by QueryEngineConfig.ready() and run_warmup(); served by the system info endpoint.
+startup_report = {"imports_ms": {}, "warmup": {"status": "disabled", "stages": {}}}
+_report_lock = threading.Lock()
+
+
+def enabled_stages():
+    configured = getattr(settings, "INFRADB_WARMUP", ",".join(WARMUP_STAGES))
+    requested = {stage.strip().lower() for stage in configured.split(",") if stage.strip()}
+    return [stage for stage in WARMUP_STAGES if stage in requested]
+
+
+def _warm_connections():
+    from databases.models import DatabaseConnection
+
+    limit = getattr(settings, "INFRADB_WARMUP_MAX_CONNECTIONS", DEFAULT_WARMUP_MAX_CONNECTIONS)
+    connections = DatabaseConnection.objects.filter(is_active=True, engine="SQLITE").order_by("-updated_at")
+    warmed, skipped = [], []
+    for connection in connections[:limit]:
+        if not connection.file_path or not Path(connection.file_path).exists():
+            skipped.append(str(connection.pk))
+            continue
+        sqlite_pool.warm(connection.file_path)
+        warmed.append(connection)
+    return warmed, {"warmed": len(warmed), "skipped": len(skipped)}
+
+
+def _prime_schemas(connections):
+    from databases.services import sqlite_schema
+
+    from .services import QueryExecutionError, QueryExecutionService
+
+    service = QueryExecutionService()
+    primed = 0
+    for connection in connections:
+        try:
+            version = service.schema_version(connection=connection)
+            sqlite_schema(connection.file_path, cache_key=f"{connection.pk}:{version}")
+        except (OSError, QueryExecutionError) as exc:
+            logger.warning("Schema warm-up skipped for %s: %s", connection.pk, exc)
+            continue
+        primed += 1
+    return {"primed": primed}
+
+
+def run_warmup(stages=None):
+    """Pay first-request costs up front: native import, pooled connections, schema caches and DuckDB's extension."""
+    stages = enabled_stages() if stages is None else list(stages)
+    report = {"status": "running", "started_at": timezone.now().isoformat(), "stages": {}}
+    with _report_lock:
+        startup_report["warmup"] = report
+
+    connections = []
+    failed = False
+    for stage in stages:
+        started = perf_counter()
+        try:
+            if stage == "native":
+                detail = native_client.load()
+            elif stage == "connections":
+                connections, detail = _warm_connections()
+            elif stage == "schema":
+                if not connections and "connections" not in stages:
+                    connections, _ = _warm_connections()
+                detail = _prime_schemas(connections)
+            elif stage == "analytics":
+                # Installing DuckDB's sqlite extension may download it; routed reads stay on SQLite until then.
+                detail = analytics_pool.prepare()
+            else:
+                continue
+            detail["status"] = "ok"
+        except Exception as exc:
+            # Warm-up is an optimisation; a failure only means the first request pays the cost instead.
+            logger.exception("Warm-up stage %s failed", stage)
+            detail = {"status": "failed", "error": str(exc)}
+            failed = True
+        detail["duration_ms"] = round((perf_counter() - started) * 1000, 3)
+        report["stages"][stage] = detail
+
+    report["finished_at"] = timezone.now().isoformat()
+    report["status"] = "degraded" if failed else "ready"
+    return report
@@ -48,6 +48,13 @@ export const fetchSchema = async (connectionId) => {
   return response.data;
 };
 
+export const fetchCompletions = async (connectionId, prefix, { table, limit = 20 } = {}) => {
+  const response = await api.get(`/databases/connections/${connectionId}/autocomplete/`, {
+    params: { prefix, table, limit },
+  });
+  return response.data;
+};
+
 export const getJobStatus = async (jobId) => {
   const response = await api.get(`/query/jobs/${jobId}/status/`);
   return response.data;
@@ -72,6 +72,11 @@ export const AISidebar = () => {
             {aiResponse ? (
               <div className="space-y-4">
                 <div className="text-brand/80"># Response from AI Agent:</div>
+                {Array.isArray(aiResponse.index_statements) && aiResponse.index_statements.length > 0 && (
+                   <div className="bg-background/80 p-2 rounded border border-brand/20 text-foreground whitespace-pre-wrap">
+                     {aiResponse.index_statements.join('\n')}
+                   </div>
+                )}
                 {aiResponse.optimized_sql && (
                    <div className="bg-background/80 p-2 rounded border border-brand/20 text-foreground whitespace-pre-wrap">
                      {aiResponse.optimized_sql}
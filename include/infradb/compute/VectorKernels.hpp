@@ -1,13 +1,116 @@
 #pragma once
+#include <algorithm>
 #include <cstdint>
-#include <vector>
 #include <cstddef>
+#include <limits>
+#include <thread>
+#include <type_traits>
+#include <unordered_map>
+#include <unordered_set>
+#include <vector>
 
 namespace infradb::compute {
 
+/**
+ * Comparison operators understood by VectorizedKernels::compare.
+ */
+enum class CompareOp : uint8_t { EQ, NE, LT, LE, GT, GE };
+
+/**
+ * Row positions that passed a filter, in ascending order.
+ * Signed 64-bit so they hand over to NumPy as intp without conversion.
+ */
+using SelectionVector = std::vector<int64_t>;
+
+/**
+ * Output of hash_group_by: one slot per group, in order of first appearance.
+ * A NULL key forms its own group (SQL semantics), flagged in key_is_null.
+ */
+template <typename K>
+struct GroupByResult {
+    std::vector<K> keys;
+    std::vector<bool> key_is_null;
+    std::vector<int64_t> row_counts;    // COUNT(*)
+    std::vector<int64_t> value_counts;  // COUNT(value), NULLs excluded
+    std::vector<double> sums;
+    std::vector<double> mins;           // NaN when the group has no non-NULL value
+    std::vector<double> maxs;
+
+    size_t size() const { return keys.size(); }
+};
+
+namespace detail {
+
+// Below this many rows per worker, thread start-up costs more than it saves.
+constexpr size_t kMinRowsPerWorker = 1 << 16;
+
+inline size_t worker_count(size_t size) {
+    const size_t hardware = std::max<size_t>(std::thread::hardware_concurrency(), 1);
+    return std::clamp<size_t>(size / kMinRowsPerWorker, 1, hardware);
+}
+
+/**
+ * Splits [0, size) into contiguous chunks and runs fn(chunk, begin, end) on each,
+ * on the calling thread alone when the input is small.
+ */
+template <typename Fn>
+void parallel_chunks(size_t size, size_t workers, Fn&& fn) {
+    if (workers <= 1) {
+        fn(size_t{0}, size_t{0}, size);
+        return;
+    }
+    std::vector<std::thread> threads;
+    threads.reserve(workers - 1);
+    for (size_t chunk = 1; chunk < workers; ++chunk) {
+        threads.emplace_back([&, chunk]() {
+            fn(chunk, size * chunk / workers, size * (chunk + 1) / workers);
+        });
+    }
+    fn(size_t{0}, size_t{0}, size / workers);
+    for (auto& thread : threads) thread.join();
+}
+
+inline bool is_null(const bool* null_mask, size_t i) {
+    return null_mask != nullptr && null_mask[i];
+}
+
+/**
+ * Branchless selection: every position is written, only matches advance the cursor.
+ * Chunks are filtered independently and concatenated, so the result stays ordered.
+ */
+template <typename Predicate>
+SelectionVector select(size_t size, const bool* null_mask, Predicate&& predicate) {
+    const size_t workers = worker_count(size);
+    std::vector<SelectionVector> parts(workers);
+    parallel_chunks(size, workers, [&](size_t chunk, size_t begin, size_t end) {
+        auto& out = parts[chunk];
+        out.resize(end - begin);
+        size_t count = 0;
+        for (size_t i = begin; i < end; ++i) {
+            out[count] = static_cast<int64_t>(i);
+            count += static_cast<size_t>(predicate(i) & !is_null(null_mask, i));
+        }
+        out.resize(count);
+    });
+    if (workers == 1) return std::move(parts[0]);
+
+    size_t total = 0;
+    for (const auto& part : parts) total += part.size();
+    SelectionVector selection;
+    selection.reserve(total);
+    for (const auto& part : parts) selection.insert(selection.end(), part.begin(), part.end());
+    return selection;
+}
+
+}  // namespace detail
+
 /**
  * Vectorized Filter: Processes blocks of values using branchless logic.
  * Designed to utilize SIMD (Single Instruction, Multiple Data) on modern CPUs.
+ *
+ * Kernels take an optional null mask (true marks NULL, as in execution::Column);
+ * a NULL never satisfies a predicate and is skipped by aggregates. Inputs larger
+ * than a few worker-sized chunks are split across threads.
  */
 struct VectorizedKernels {
     /**
@@ -15,10 +118,10 @@ struct VectorizedKernels {
      * This avoids CPU branch misprediction, keeping the instruction pipeline full.
      */
     static size_t filter_greater_than(
-        const int32_t* __restrict__ input, 
-        size_t size, 
-        int32_t threshold, 
-        int32_t* __restrict__ output) 
+        const int32_t* __restrict__ input,
+        size_t size,
+        int32_t threshold,
+        int32_t* __restrict__ output)
     {
         size_t count = 0;
         // Compiler will auto-vectorize this loop given AVX2/AVX512 flags.
@@ -42,6 +145,206 @@ struct VectorizedKernels {
         }
         return total;
     }
+
+    /**
+     * Positions where `values[i] <op> operand`.
+     * The operator is resolved once, outside the loop, so each variant vectorizes on its own.
+     */
+    template <typename T>
+    static SelectionVector compare(
+        const T* __restrict__ values, const bool* null_mask, size_t size, CompareOp op, T operand)
+    {
+        switch (op) {
+            case CompareOp::EQ: return detail::select(size, null_mask, [&](size_t i) { return values[i] == operand; });
+            case CompareOp::NE: return detail::select(size, null_mask, [&](size_t i) { return values[i] != operand; });
+            case CompareOp::LT: return detail::select(size, null_mask, [&](size_t i) { return values[i] < operand; });
+            case CompareOp::LE: return detail::select(size, null_mask, [&](size_t i) { return values[i] <= operand; });
+            case CompareOp::GT: return detail::select(size, null_mask, [&](size_t i) { return values[i] > operand; });
+            case CompareOp::GE: return detail::select(size, null_mask, [&](size_t i) { return values[i] >= operand; });
+        }
+        return {};
+    }
+
+    /**
+     * Positions where `low <= values[i] <= high`, inclusive on both ends like SQL BETWEEN.
+     */
+    template <typename T>
+    static SelectionVector between(const T* __restrict__ values, const bool* null_mask, size_t size, T low, T high) {
+        return detail::select(size, null_mask, [&](size_t i) { return (values[i] >= low) & (values[i] <= high); });
+    }
+
+    /**
+     * Positions whose value appears in `list`. Short lists are probed with a branchless
+     * scan that stays in registers; longer ones go through a hash set.
+     */
+    template <typename T>
+    static SelectionVector in_list(
+        const T* __restrict__ values, const bool* null_mask, size_t size, const T* list, size_t list_size)
+    {
+        constexpr size_t kLinearProbeLimit = 16;
+        if (list_size <= kLinearProbeLimit) {
+            return detail::select(size, null_mask, [&](size_t i) {
+                bool found = false;
+                for (size_t j = 0; j < list_size; ++j) found |= values[i] == list[j];
+                return found;
+            });
+        }
+        const std::unordered_set<T> members(list, list + list_size);
+        return detail::select(size, null_mask, [&](size_t i) { return members.count(values[i]) != 0; });
+    }
+
+    /**
+     * Gathers `values[selection[i]]` into `out`, and the matching null flags into `out_nulls`
+     * when both masks are given. `out` must hold `count` elements.
+     */
+    template <typename T>
+    static void compact(
+        const T* __restrict__ values,
+        const bool* null_mask,
+        const int64_t* __restrict__ selection,
+        size_t count,
+        T* __restrict__ out,
+        bool* out_nulls)
+    {
+        detail::parallel_chunks(count, detail::worker_count(count), [&](size_t, size_t begin, size_t end) {
+            for (size_t i = begin; i < end; ++i) out[i] = values[selection[i]];
+            if (null_mask != nullptr && out_nulls != nullptr) {
+                for (size_t i = begin; i < end; ++i) out_nulls[i] = null_mask[selection[i]];
+            }
+        });
+    }
+
+    /**
+     * Hash group-by computing COUNT(*), COUNT/SUM/MIN/MAX of `values` per key.
+     * Each worker aggregates its chunk into a private table; the partials are then
+     * merged in chunk order, which keeps groups in order of first appearance.
+     */
+    template <typename K, typename V>
+    static GroupByResult<K> hash_group_by(
+        const K* __restrict__ keys,
+        const bool* key_nulls,
+        const V* __restrict__ values,
+        const bool* value_nulls,
+        size_t size)
+    {
+        static_assert(std::is_integral_v<K>, "group-by keys must be integers");
+        const size_t workers = detail::worker_count(size);
+        std::vector<GroupByResult<K>> partials(workers);
+        detail::parallel_chunks(size, workers, [&](size_t chunk, size_t begin, size_t end) {
+            auto& local = partials[chunk];
+            std::unordered_map<K, size_t> slots;
+            size_t null_slot = std::numeric_limits<size_t>::max();
+            for (size_t i = begin; i < end; ++i) {
+                size_t slot;
+                if (detail::is_null(key_nulls, i)) {
+                    if (null_slot == std::numeric_limits<size_t>::max()) null_slot = add_group(local, K{}, true);
+                    slot = null_slot;
+                } else {
+                    auto [it, inserted] = slots.try_emplace(keys[i], local.size());
+                    if (inserted) add_group(local, keys[i], false);
+                    slot = it->second;
+                }
+                local.row_counts[slot] += 1;
+                if (!detail::is_null(value_nulls, i)) {
+                    accumulate(local, slot, 1, static_cast<double>(values[i]), static_cast<double>(values[i]),
+                               static_cast<double>(values[i]));
+                }
+            }
+        });
+        if (workers == 1) return std::move(partials[0]);
+
+        GroupByResult<K> merged = std::move(partials[0]);
+        std::unordered_map<K, size_t> slots;
+        size_t null_slot = std::numeric_limits<size_t>::max();
+        for (size_t slot = 0; slot < merged.size(); ++slot) {
+            if (merged.key_is_null[slot]) null_slot = slot;
+            else slots.emplace(merged.keys[slot], slot);
+        }
+        for (size_t chunk = 1; chunk < workers; ++chunk) {
+            const auto& part = partials[chunk];
+            for (size_t i = 0; i < part.size(); ++i) {
+                size_t slot;
+                if (part.key_is_null[i]) {
+                    if (null_slot == std::numeric_limits<size_t>::max()) null_slot = add_group(merged, K{}, true);
+                    slot = null_slot;
+                } else {
+                    auto [it, inserted] = slots.try_emplace(part.keys[i], merged.size());
+                    if (inserted) add_group(merged, part.keys[i], false);
+                    slot = it->second;
+                }
+                merged.row_counts[slot] += part.row_counts[i];
+                if (part.value_counts[i] > 0) {
+                    accumulate(merged, slot, part.value_counts[i], part.sums[i], part.mins[i], part.maxs[i]);
+                }
+            }
+        }
+        return merged;
+    }
+
+    /**
+     * Positions of the k largest (or smallest) non-NULL values, best first; ties keep row order.
+     * Workers keep a top-k of their own chunk and the candidates are reduced once more.
+     */
+    template <typename T>
+    static SelectionVector top_k(
+        const T* __restrict__ values, const bool* null_mask, size_t size, size_t k, bool largest = true)
+    {
+        auto better = [&](int64_t a, int64_t b) {
+            if (values[a] != values[b]) return largest ? values[a] > values[b] : values[a] < values[b];
+            return a < b;
+        };
+        auto keep_best = [&](SelectionVector& candidates) {
+            if (candidates.size() > k) {
+                std::nth_element(candidates.begin(), candidates.begin() + k, candidates.end(), better);
+                candidates.resize(k);
+            }
+        };
+        if (k == 0) return {};
+
+        const size_t workers = detail::worker_count(size);
+        std::vector<SelectionVector> parts(workers);
+        detail::parallel_chunks(size, workers, [&](size_t chunk, size_t begin, size_t end) {
+            auto& candidates = parts[chunk];
+            for (size_t i = begin; i < end; ++i) {
+                // NaN has no rank, so it is treated like NULL.
+                bool skip = detail::is_null(null_mask, i);
+                if constexpr (std::is_floating_point_v<T>) skip |= values[i] != values[i];
+                if (skip) continue;
+                candidates.push_back(static_cast<int64_t>(i));
+                // Trim in batches so memory stays O(k) without a heap operation per row.
+                if (candidates.size() >= 2 * k + 1024) keep_best(candidates);
+            }
+            keep_best(candidates);
+        });
+
+        SelectionVector result;
+        for (const auto& part : parts) result.insert(result.end(), part.begin(), part.end());
+        keep_best(result);
+        std::sort(result.begin(), result.end(), better);
+        return result;
+    }
+
+private:
+    template <typename K>
+    static size_t add_group(GroupByResult<K>& result, K key, bool is_null) {
+        result.keys.push_back(key);
+        result.key_is_null.push_back(is_null);
+        result.row_counts.push_back(0);
+        result.value_counts.push_back(0);
+        result.sums.push_back(0.0);
+        result.mins.push_back(std::numeric_limits<double>::quiet_NaN());
+        result.maxs.push_back(std::numeric_limits<double>::quiet_NaN());
+        return result.keys.size() - 1;
+    }
+
+    template <typename K>
+    static void accumulate(GroupByResult<K>& result, size_t slot, int64_t count, double sum, double low, double high) {
+        const bool first = result.value_counts[slot] == 0;
+        result.value_counts[slot] += count;
+        result.sums[slot] += sum;
+        result.mins[slot] = first ? low : std::min(result.mins[slot], low);
+        result.maxs[slot] = first ? high : std::max(result.maxs[slot], high);
+    }
 };
 
 } // namespace infradb::compute
@@ -1,9 +1,153 @@
 #include <pybind11/pybind11.h>
+#include <pybind11/numpy.h>
 #include <pybind11/stl.h>
+#include "infradb/compute/VectorKernels.hpp"
 #include "infradb/core/Engine.hpp"
 #include "infradb/execution/VectorBatch.hpp"
 
 namespace py = pybind11;
+using infradb::compute::CompareOp;
+using infradb::compute::VectorizedKernels;
+
+namespace {
+
+// Inputs are borrowed in place: a dtype or layout mismatch is rejected rather than copied.
+template <typename T>
+using InputArray = py::array_t<T, py::array::c_style>;
+
+/**
+ * Hands a kernel's result buffer to NumPy without copying; the capsule frees it with the array.
+ */
+template <typename T>
+py::array_t<T> to_numpy(std::vector<T>&& values) {
+    auto* owned = new std::vector<T>(std::move(values));
+    py::capsule release(owned, [](void* pointer) { delete static_cast<std::vector<T>*>(pointer); });
+    return py::array_t<T>(owned->size(), owned->data(), release);
+}
+
+py::array_t<bool> to_numpy(const std::vector<bool>& values) {
+    py::array_t<bool> out(values.size());
+    auto* data = out.mutable_data();
+    for (size_t i = 0; i < values.size(); ++i) data[i] = values[i];
+    return out;
+}
+
+const bool* null_mask_pointer(const py::object& mask, size_t size) {
+    if (mask.is_none()) return nullptr;
+    if (!py::isinstance<InputArray<bool>>(mask)) {
+        throw py::type_error("null_mask must be a C-contiguous numpy bool array");
+    }
+    auto array = mask.cast<InputArray<bool>>();
+    if (static_cast<size_t>(array.size()) != size) {
+        throw py::value_error("null_mask must have one entry per value");
+    }
+    return array.data();
+}
+
+CompareOp parse_op(const std::string& op) {
+    if (op == "==" || op == "=") return CompareOp::EQ;
+    if (op == "!=" || op == "<>") return CompareOp::NE;
+    if (op == "<") return CompareOp::LT;
+    if (op == "<=") return CompareOp::LE;
+    if (op == ">") return CompareOp::GT;
+    if (op == ">=") return CompareOp::GE;
+    throw py::value_error("unknown comparison operator: " + op);
+}
+
+template <typename T>
+void bind_value_kernels(py::module_& m) {
+    m.def("compare", [](InputArray<T> values, const std::string& op, T operand, const py::object& null_mask) {
+        const bool* mask = null_mask_pointer(null_mask, values.size());
+        const CompareOp parsed = parse_op(op);
+        std::vector<int64_t> selection;
+        {
+            py::gil_scoped_release release;
+            selection = VectorizedKernels::compare<T>(values.data(), mask, values.size(), parsed, operand);
+        }
+        return to_numpy(std::move(selection));
+    }, py::arg("values").noconvert(), py::arg("op"), py::arg("operand"), py::arg("null_mask") = py::none());
+
+    m.def("between", [](InputArray<T> values, T low, T high, const py::object& null_mask) {
+        const bool* mask = null_mask_pointer(null_mask, values.size());
+        std::vector<int64_t> selection;
+        {
+            py::gil_scoped_release release;
+            selection = VectorizedKernels::between<T>(values.data(), mask, values.size(), low, high);
+        }
+        return to_numpy(std::move(selection));
+    }, py::arg("values").noconvert(), py::arg("low"), py::arg("high"), py::arg("null_mask") = py::none());
+
+    m.def("in_list", [](InputArray<T> values, InputArray<T> members, const py::object& null_mask) {
+        const bool* mask = null_mask_pointer(null_mask, values.size());
+        std::vector<int64_t> selection;
+        {
+            py::gil_scoped_release release;
+            selection = VectorizedKernels::in_list<T>(
+                values.data(), mask, values.size(), members.data(), members.size());
+        }
+        return to_numpy(std::move(selection));
+    }, py::arg("values").noconvert(), py::arg("members").noconvert(), py::arg("null_mask") = py::none());
+
+    m.def("compact", [](InputArray<T> values, InputArray<int64_t> selection, const py::object& null_mask) {
+        const bool* mask = null_mask_pointer(null_mask, values.size());
+        const int64_t* positions = selection.data();
+        for (py::ssize_t i = 0; i < selection.size(); ++i) {
+            if (positions[i] < 0 || positions[i] >= values.size()) throw py::index_error("selection out of range");
+        }
+        py::array_t<T> out(selection.size());
+        py::object out_nulls = py::none();
+        bool* out_mask = nullptr;
+        if (mask != nullptr) {
+            py::array_t<bool> nulls(selection.size());
+            out_mask = nulls.mutable_data();
+            out_nulls = std::move(nulls);
+        }
+        T* out_data = out.mutable_data();
+        {
+            py::gil_scoped_release release;
+            VectorizedKernels::compact<T>(values.data(), mask, positions, selection.size(), out_data, out_mask);
+        }
+        return py::make_tuple(out, out_nulls);
+    }, py::arg("values").noconvert(), py::arg("selection").noconvert(), py::arg("null_mask") = py::none());
+
+    m.def("top_k", [](InputArray<T> values, size_t k, bool largest, const py::object& null_mask) {
+        const bool* mask = null_mask_pointer(null_mask, values.size());
+        std::vector<int64_t> selection;
+        {
+            py::gil_scoped_release release;
+            selection = VectorizedKernels::top_k<T>(values.data(), mask, values.size(), k, largest);
+        }
+        return to_numpy(std::move(selection));
+    }, py::arg("values").noconvert(), py::arg("k"), py::arg("largest") = true, py::arg("null_mask") = py::none());
+}
+
+template <typename K, typename V>
+void bind_group_by(py::module_& m) {
+    m.def("group_by", [](InputArray<K> keys, InputArray<V> values, const py::object& key_nulls,
+                         const py::object& value_nulls) {
+        if (keys.size() != values.size()) throw py::value_error("keys and values must have the same length");
+        const bool* key_mask = null_mask_pointer(key_nulls, keys.size());
+        const bool* value_mask = null_mask_pointer(value_nulls, values.size());
+        infradb::compute::GroupByResult<K> result;
+        {
+            py::gil_scoped_release release;
+            result = VectorizedKernels::hash_group_by<K, V>(
+                keys.data(), key_mask, values.data(), value_mask, keys.size());
+        }
+        py::dict out;
+        out["key_is_null"] = to_numpy(result.key_is_null);
+        out["keys"] = to_numpy(std::move(result.keys));
+        out["row_counts"] = to_numpy(std::move(result.row_counts));
+        out["value_counts"] = to_numpy(std::move(result.value_counts));
+        out["sums"] = to_numpy(std::move(result.sums));
+        out["mins"] = to_numpy(std::move(result.mins));
+        out["maxs"] = to_numpy(std::move(result.maxs));
+        return out;
+    }, py::arg("keys").noconvert(), py::arg("values").noconvert(), py::arg("key_nulls") = py::none(),
+       py::arg("value_nulls") = py::none());
+}
+
+}  // namespace
 
 /**
  * Pybind11 Python Bridge definition for InfraDB Core.
@@ -28,4 +172,14 @@ PYBIND11_MODULE(infradb_core, m) {
             return self.scan_file(path);
         }, py::arg("file_path"), "Parallel file scan with GIL release")
         .def("optimize_plan", &infradb::core::Engine::optimize_plan, py::arg("logical_plan"));
+
+    // Vectorized kernels over NumPy arrays; each overload takes its dtype exactly, so nothing is copied.
+    auto kernels = m.def_submodule("kernels", "Null-aware vectorized kernels over NumPy arrays");
+    bind_value_kernels<int32_t>(kernels);
+    bind_value_kernels<int64_t>(kernels);
+    bind_value_kernels<double>(kernels);
+    bind_group_by<int32_t, int64_t>(kernels);
+    bind_group_by<int32_t, double>(kernels);
+    bind_group_by<int64_t, int64_t>(kernels);
+    bind_group_by<int64_t, double>(kernels);
 }